@@ -0,0 +1,1005 @@
+"""
+In-memory stand-in for the parts of maya.cmds, maya.mel, maya.OpenMaya and
+maya.api.OpenMaya used by geo_shader_map.
+
+It only models what the package relies on: a DAG of named nodes, shading
+engine memberships down to face ranges, dynamic attributes, the selection,
+file references and the command trace file. Unknown commands raise
+AttributeError so missing coverage is obvious.
+
+Usage:
+    import fake_maya
+    cmds = fake_maya.install()
+    cmds.create_node('|pCube1', 'transform')
+    ...
+    from geo_shader_map import session
+"""
+import os
+import re
+import sys
+import time
+import types
+
+_FACE_PATTERN = re.compile(r'^f\[(\d+)(?::(\d+))?\]$')
+
+# abstract node types used in "ls -type"
+_ABSTRACT_TYPES = {
+    'animCurve': ('animCurveTL', 'animCurveTA', 'animCurveTU', 'animCurveTT',
+                  'animCurveUL', 'animCurveUA', 'animCurveUU'),
+    'shape': ('mesh', 'camera', 'nurbsSurface', 'nurbsCurve'),
+}
+
+# "getClassification" of the shading node types, none for the others
+_CLASSIFICATIONS = {
+    'lambert': ['drawdb/shader/surface/lambert:shader/surface'],
+    'blinn': ['drawdb/shader/surface/blinn:shader/surface'],
+    'file': ['drawdb/shader/texture/2d/file:texture/2d'],
+    'place2dTexture': ['drawdb/geometry/place2dTexture:utility/general'],
+}
+
+# stand-in for the static attributes of a shape, listAttr returns them all
+_STATIC_ATTRS = ['attr{:03d}'.format(i) for i in range(180)]
+
+
+def _flatten(items):
+    if items is None:
+        return []
+    if isinstance(items, (list, tuple, set)):
+        result = []
+        for item in items:
+            result.extend(_flatten(item))
+        return result
+    return [items]
+
+
+def _parse_faces(component):
+    matched = _FACE_PATTERN.match(component)
+    if not matched:
+        raise ValueError('Unsupported component "{}"'.format(component))
+    start = int(matched.group(1))
+    end = matched.group(2)
+    return start, int(end) if end is not None else start
+
+
+def _format_faces(interval):
+    start, end = interval
+    if start == end:
+        return 'f[{}]'.format(start)
+    return 'f[{}:{}]'.format(start, end)
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract(intervals, other):
+    result = []
+    for start, end in intervals:
+        for other_start, other_end in other:
+            if other_end < start or other_start > end:
+                continue
+            if other_start > start:
+                result.append((start, other_start - 1))
+            start = max(start, other_end + 1)
+            if start > end:
+                break
+        if start <= end:
+            result.append((start, end))
+    return result
+
+
+class FakeCmds(object):
+    """
+    The maya.cmds stand-in, see the module docstring.
+    Besides the cmds functions it has a small builder API (create_node,
+    assign, ...) used by the scene generator.
+    """
+
+    def __init__(self):
+        # seconds the viewport takes to redraw after an edit, kept by reset
+        self.redraw_cost = 0.0
+        # size in bytes of the written abc files and seconds an exported
+        # scene file takes to write, in native code without the GIL, kept
+        # by reset
+        self.abc_size = 0
+        self.export_cost = 0.0
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # builder API
+    # ------------------------------------------------------------------
+    def reset(self):
+        # {long name: node type}, insertion ordered through self.order
+        self.nodes = {}
+        self.order = []
+        self.children = {}
+        self.by_short = {}
+        self.intermediate = set()
+        self.face_counts = {}
+        # {shape: {shading engine: [(start, end), ...] or None}}
+        self.assignments = {}
+        # {shading engine: {shape: None}} used as an ordered set
+        self.sg_shapes = {}
+        # {node: {attr: {'value': ..., 'locked': bool}}}
+        self.attrs = {}
+        # {node: {attr: value}} for non string attributes
+        self.values = {}
+        # {source plug: [destination plug, ...]}
+        self.connections = {}
+        self.selection = []
+        self.scene_name = ''
+        self.references = {}
+        self.trace_path = ''
+        self.export_path = ''
+        self.import_path = ''
+        self.playback = (1, 1)
+        self.keys = {}
+        # {curve: (pre infinity, post infinity)}, "constant" if missing
+        self.infinities = {}
+        self.loaded_plugins = set()
+        self.dialogs = []
+        self.edits = 0
+        self.undo_queue = 0
+        self.undo_chunk = 0
+        self.refresh_suspended = False
+        # edits made while the viewport refreshes
+        self.refreshes = 0
+        self.written_files = []
+
+    def create_node(self, long_name, node_type, face_count=0,
+                    intermediate=False):
+        parent, short = long_name.rsplit('|', 1)
+        self.nodes[long_name] = node_type
+        self.order.append(long_name)
+        self.children.setdefault(parent, []).append(long_name)
+        self.by_short.setdefault(short, []).append(long_name)
+        if intermediate:
+            self.intermediate.add(long_name)
+        if node_type == 'mesh':
+            self.face_counts[long_name] = face_count
+        if node_type == 'shadingEngine':
+            self.sg_shapes.setdefault(short, {})
+        if node_type == 'renderGlobals':
+            self.values[long_name] = {'preMel': '', 'postMel': ''}
+        return long_name
+
+    def create_shading_engine(self, name):
+        return self.create_node('|' + name, 'shadingEngine')
+
+    def assign(self, shape, shading_engine, intervals=None):
+        """
+        Assign whole shape (intervals=None) or face ranges without going
+        through the command layer.
+        """
+        self._force(shape, shading_engine, intervals)
+
+    def connect(self, source, destination):
+        self.connections.setdefault(source, []).append(destination)
+
+    def animate(self, node, attr, keys, curve_type='animCurveTL',
+                infinity='constant'):
+        """
+        Drive `node.attr` by a new curve with keys [(time, value), ...].
+        """
+        name = '|{}_{}'.format(node.rsplit('|', 1)[-1], attr)
+        curve = self.create_node(name, curve_type)
+        self.keys[curve] = list(keys)
+        self.infinities[curve] = (infinity, infinity)
+        self.connect('{}.output'.format(curve), '{}.{}'.format(node, attr))
+        return curve
+
+    # ------------------------------------------------------------------
+    # name helpers
+    # ------------------------------------------------------------------
+    def _resolve(self, name):
+        # absolute namespace, e.g. ':ns:lambert2SG'
+        name = name.lstrip(':')
+        if name.startswith('|'):
+            if name in self.nodes:
+                return name
+            raise ValueError('No object matches name: {}'.format(name))
+        candidates = self.by_short.get(name.rsplit('|', 1)[-1], [])
+        if '|' in name:
+            candidates = [c for c in candidates if c.endswith('|' + name)]
+        if len(candidates) == 1:
+            return candidates[0]
+        if not candidates:
+            raise ValueError('No object matches name: {}'.format(name))
+        raise ValueError('More than one object matches name: {}'.format(name))
+
+    def _exists(self, name):
+        try:
+            self._resolve(name)
+        except ValueError:
+            return False
+        return True
+
+    def _short(self, long_name):
+        if '|' not in long_name:
+            return long_name
+        short = long_name.rsplit('|', 1)[1]
+        if len(self.by_short.get(short, ())) == 1:
+            return short
+        return long_name
+
+    def _name(self, long_name, long_names):
+        if long_names:
+            return long_name
+        return self._short(long_name)
+
+    def _type_matches(self, long_name, node_types):
+        node_type = self.nodes[long_name]
+        for wanted in node_types:
+            if node_type == wanted or \
+                    node_type in _ABSTRACT_TYPES.get(wanted, ()):
+                return True
+        return False
+
+    def _descendants(self, long_name):
+        result = [long_name]
+        stack = list(reversed(self.children.get(long_name, [])))
+        while stack:
+            node = stack.pop()
+            result.append(node)
+            stack.extend(reversed(self.children.get(node, [])))
+        return result
+
+    def _mesh_of(self, long_name):
+        if self.nodes[long_name] == 'mesh':
+            return long_name
+        for child in self.children.get(long_name, []):
+            if self.nodes[child] == 'mesh' and child not in self.intermediate:
+                return child
+        raise ValueError('"{}" has no mesh shape'.format(long_name))
+
+    def _has_attr(self, long_name, attr):
+        return attr in self.attrs.get(long_name, {}) or \
+            attr in self.values.get(long_name, {}) or attr in _STATIC_ATTRS
+
+    def _record_edit(self):
+        self.edits += 1
+        if not self.undo_chunk:
+            self.undo_queue += 1
+        if not self.refresh_suspended:
+            self.refreshes += 1
+            if self.redraw_cost:
+                end = time.time() + self.redraw_cost
+                while time.time() < end:
+                    pass
+
+    def _trace(self, *lines):
+        if not self.trace_path:
+            return
+        with open(self.trace_path, 'a') as f:
+            for line in lines:
+                f.write(line + '\n')
+
+    # ------------------------------------------------------------------
+    # queries
+    # ------------------------------------------------------------------
+    def ls(self, *args, **kwargs):
+        long_names = kwargs.get('long') or kwargs.get('l')
+        dag = kwargs.get('dag')
+        leaf = kwargs.get('leaf') or kwargs.get('lf')
+        show_type = kwargs.get('showType')
+        no_intermediate = kwargs.get('noIntermediate') or kwargs.get('ni')
+        node_types = kwargs.get('type') or kwargs.get('typ')
+        if node_types is not None:
+            node_types = _flatten(node_types)
+        if kwargs.get('shapes') or kwargs.get('s'):
+            node_types = (node_types or []) + ['shape']
+
+        if args and isinstance(args[0], str) and args[0].startswith('*.'):
+            # nodes with a dynamic attribute, e.g. "*.assigned_shader"
+            attr = args[0][2:]
+            names = [self._short(node) for node in self.order
+                     if attr in self.attrs.get(node, {})]
+            if kwargs.get('objectsOnly') or kwargs.get('o'):
+                return names
+            return ['{}.{}'.format(name, attr) for name in names]
+        if args:
+            objects = _flatten(args[0])
+        elif kwargs.get('sl') or kwargs.get('selection'):
+            objects = list(self.selection)
+        else:
+            objects = list(self.order)
+
+        result = []
+        seen = set()
+        for obj in objects:
+            node, _, rest = obj.partition('.')
+            try:
+                long_name = self._resolve(node)
+            except ValueError:
+                continue
+            if rest and not dag:
+                if rest.startswith('f[') or \
+                        self._has_attr(long_name, rest.split('[')[0]):
+                    name = '{}.{}'.format(
+                        self._name(long_name, long_names), rest)
+                    if name not in seen:
+                        seen.add(name)
+                        result.append((name, self.nodes[long_name]))
+                continue
+
+            candidates = self._descendants(long_name) if dag else [long_name]
+            for candidate in candidates:
+                if candidate in seen:
+                    continue
+                if leaf and self.children.get(candidate):
+                    continue
+                if no_intermediate and candidate in self.intermediate:
+                    continue
+                if node_types is not None and \
+                        not self._type_matches(candidate, node_types):
+                    continue
+                seen.add(candidate)
+                result.append((self._name(candidate, long_names),
+                               self.nodes[candidate]))
+
+        if show_type:
+            flat = []
+            for name, node_type in result:
+                flat.extend((name, node_type))
+            return flat
+        return [name for name, _ in result]
+
+    def listRelatives(self, *args, **kwargs):
+        full_path = kwargs.get('fullPath') or kwargs.get('f')
+        node_type = kwargs.get('type')
+        result = []
+        for obj in _flatten(args[0] if args else self.selection):
+            long_name = self._resolve(obj.split('.')[0])
+            if kwargs.get('parent') or kwargs.get('p'):
+                related = [long_name.rsplit('|', 1)[0]]
+                if not related[0]:
+                    related = []
+            elif kwargs.get('allDescendents') or kwargs.get('ad'):
+                related = self._descendants(long_name)[1:]
+            else:
+                related = list(self.children.get(long_name, []))
+            for node in related:
+                if node_type and not self._type_matches(node,
+                                                        _flatten(node_type)):
+                    continue
+                name = self._name(node, full_path)
+                if name not in result:
+                    result.append(name)
+        return result or None
+
+    def listConnections(self, *args, **kwargs):
+        node_type = kwargs.get('type')
+        destination = kwargs.get('destination', kwargs.get('d', True))
+        source = kwargs.get('source', kwargs.get('s', True))
+        connections = kwargs.get('connections') or kwargs.get('c')
+        plugs = kwargs.get('plugs') or kwargs.get('p')
+        # [(plug of the node, connected plug), ...]
+        pairs = []
+        for obj in _flatten(args[0] if args else self.selection):
+            long_name = self._resolve(obj.split('.')[0])
+            if destination:
+                for sg in self.assignments.get(long_name, {}):
+                    pairs.append(('{}.instObjGroups'.format(long_name),
+                                  '{}.dagSetMembers'.format(sg)))
+                for src, dsts in self.connections.items():
+                    if src.split('.')[0] == long_name:
+                        pairs.extend((src, dst) for dst in dsts)
+            if source:
+                for src, dsts in self.connections.items():
+                    for dst in dsts:
+                        if dst.split('.')[0] == long_name:
+                            pairs.append((dst, src))
+        if node_type:
+            pairs = [pair for pair in pairs if self._type_matches(
+                self._resolve(pair[1].split('.')[0]), _flatten(node_type))]
+        result = []
+        for own, other in pairs:
+            if connections:
+                result.append(self._plug_name(own, plugs=True))
+            result.append(self._plug_name(other, plugs))
+        return result or None
+
+    def _plug_name(self, plug, plugs):
+        node, _, attr = plug.partition('.')
+        name = self._short(self._resolve(node))
+        return '{}.{}'.format(name, attr) if plugs else name
+
+    def sets(self, *args, **kwargs):
+        if kwargs.get('q') or kwargs.get('query'):
+            return self._members(args[0].lstrip(':')) or None
+        shading_engine = kwargs.get('forceElement') or kwargs.get('fe')
+        if shading_engine is None:
+            raise NotImplementedError('Only "sets -q" and "sets -fe".')
+        # absolute names start with ':', e.g. ':ns:lambert2SG'
+        shading_engine = shading_engine.lstrip('|').lstrip(':')
+        if shading_engine not in self.sg_shapes:
+            raise ValueError('No object matches name: {}'.format(
+                shading_engine))
+        self._record_edit()
+        for item in _flatten(args[0]):
+            node, _, component = item.partition('.')
+            shape = self._mesh_of(self._resolve(node))
+            intervals = None
+            if component:
+                intervals = [_parse_faces(component)]
+            self._force(shape, shading_engine, intervals)
+
+    def _members(self, shading_engine):
+        members = []
+        for shape in self.sg_shapes.get(shading_engine, ()):
+            intervals = self.assignments[shape][shading_engine]
+            if intervals is None:
+                members.append(self._short(shape))
+                continue
+            transform = self._short(shape.rsplit('|', 1)[0])
+            for interval in intervals:
+                members.append('{}.{}'.format(transform,
+                                              _format_faces(interval)))
+        return members
+
+    def _force(self, shape, shading_engine, intervals):
+        current = self.assignments.setdefault(shape, {})
+        if intervals is None:
+            for other in current:
+                self.sg_shapes[other].pop(shape, None)
+            self.assignments[shape] = {shading_engine: None}
+            self.sg_shapes[shading_engine][shape] = None
+            return
+
+        intervals = _merge(intervals)
+        all_faces = [(0, max(self.face_counts.get(shape, 1), 1) - 1)]
+        for other in list(current):
+            if other == shading_engine:
+                continue
+            remaining = _subtract(current[other] or all_faces, intervals)
+            if remaining:
+                current[other] = remaining
+            else:
+                del current[other]
+                self.sg_shapes[other].pop(shape, None)
+        if shading_engine in current:
+            if current[shading_engine] is None:
+                return
+            intervals = _merge(current[shading_engine] + intervals)
+        current[shading_engine] = intervals
+        self.sg_shapes[shading_engine][shape] = None
+
+    def listAttr(self, node, **kwargs):
+        long_name = self._resolve(node)
+        if kwargs.get('usedAsFilename'):
+            return [attr for attr in self.values.get(long_name, {})
+                    if attr.endswith('Name')]
+        dynamic = list(self.attrs.get(long_name, {}))
+        values = list(self.values.get(long_name, {}))
+        if kwargs.get('scalar'):
+            return [attr for attr in values
+                    if isinstance(self.values[long_name][attr],
+                                  (int, float))]
+        return _STATIC_ATTRS + dynamic + values
+
+    def listHistory(self, *args, **kwargs):
+        """
+        Upstream nodes through self.connections.
+        """
+        upstream = {}
+        for src, dsts in self.connections.items():
+            for dst in dsts:
+                upstream.setdefault(dst.split('.')[0], []).append(
+                    src.split('.')[0])
+        result = []
+        stack = [self._resolve(name) for name in _flatten(args[0])]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            result.append(self._short(node))
+            stack.extend(self._resolve(n) for n in upstream.get(node, []))
+        return result or None
+
+    def _points(self, node):
+        points = self.values.get(node, {}).get('points')
+        if points is None:
+            points = [float(i) for i in range(
+                3 * (self.face_counts.get(node, 0) + 2))]
+        return points
+
+    def _uvs(self, node):
+        return [float(i) / 10 for i in range(
+            2 * (self.face_counts.get(node, 0) + 2))]
+
+    def _components(self, names, values, size):
+        """
+        Values of the '<node>.vtx[i]' or '<node>.vtx[*]' components.
+        """
+        result = []
+        for name in _flatten(names):
+            node, component = name.split('.', 1)
+            items = values(self._resolve(node))
+            index = component.split('[')[1].rstrip(']')
+            if index == '*':
+                result.extend(items)
+            else:
+                start = size * int(index)
+                result.extend(items[start:start + size])
+        return result
+
+    @staticmethod
+    def _bounding_box(values, size):
+        return tuple((min(values[axis::size]), max(values[axis::size]))
+                     for axis in range(size))
+
+    def polyEvaluate(self, shape, **kwargs):
+        node = self._resolve(shape)
+        if kwargs.get('boundingBox') or kwargs.get('b'):
+            return self._bounding_box(self._points(node), 3)
+        if kwargs.get('boundingBox2d') or kwargs.get('b2'):
+            return self._bounding_box(self._uvs(node), 2)
+        faces = self.face_counts[node]
+        return {'vertex': len(self._points(node)) // 3, 'face': faces,
+                'edge': faces * 2, 'uvcoord': faces + 2}
+
+    def xform(self, name, **kwargs):
+        if kwargs.get('matrix') or kwargs.get('m'):
+            node = self._resolve(name)
+            return self.values.get(node, {}).get(
+                'matrix', [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+                           0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0])
+        return self._components(name, self._points, 3)
+
+    def polyEditUV(self, name, **kwargs):
+        return self._components(name, self._uvs, 2)
+
+    def keyframe(self, *args, **kwargs):
+        curves = [self._resolve(name) for name in _flatten(args[0])]
+        result = []
+        for curve in curves:
+            for time_value in self.keys.get(curve, []):
+                if kwargs.get('timeChange') or kwargs.get('tc'):
+                    result.append(time_value[0])
+                if kwargs.get('valueChange') or kwargs.get('vc'):
+                    result.append(time_value[1])
+        return result or None
+
+    def setInfinity(self, *args, **kwargs):
+        index = 0 if kwargs.get('preInfinite') or kwargs.get('pri') else 1
+        return [self.infinities.get(self._resolve(curve),
+                                    ('constant', 'constant'))[index]
+                for curve in _flatten(args[0])] or None
+
+    def attributeQuery(self, attr, node='', exists=False, **kwargs):
+        return self._has_attr(self._resolve(node), attr)
+
+    def addAttr(self, *args, **kwargs):
+        attr = kwargs.get('longName') or kwargs.get('ln')
+        for node in _flatten(args[0] if args else self.selection):
+            long_name = self._resolve(node)
+            node_attrs = self.attrs.setdefault(long_name, {})
+            if attr in node_attrs:
+                raise RuntimeError('Found a duplicate attribute "{}"'.format(
+                    attr))
+            node_attrs[attr] = {'value': None, 'locked': False}
+            self._record_edit()
+
+    def _plug(self, plug):
+        node, attr = plug.split('.', 1)
+        long_name = self._resolve(node)
+        if attr in self.attrs.get(long_name, {}):
+            return self.attrs[long_name][attr]
+        values = self.values.setdefault(long_name, {})
+        if attr not in values and attr not in _STATIC_ATTRS:
+            raise ValueError('No object matches name: {}'.format(plug))
+        return {'value': values.get(attr), 'locked': False,
+                'values': values, 'attr': attr}
+
+    def getAttr(self, plug, **kwargs):
+        data = self._plug(plug)
+        if kwargs.get('lock') or kwargs.get('l'):
+            return data['locked']
+        return data['value']
+
+    def setAttr(self, plug, *args, **kwargs):
+        data = self._plug(plug)
+        self._record_edit()
+        if 'lock' in kwargs or 'l' in kwargs:
+            data['locked'] = bool(kwargs.get('lock', kwargs.get('l')))
+            return
+        if data['locked']:
+            raise RuntimeError('The attribute "{}" is locked'.format(plug))
+        value = args[0] if len(args) == 1 else list(args)
+        if 'values' in data:
+            data['values'][data['attr']] = value
+        else:
+            data['value'] = value
+
+    def objExists(self, name):
+        node, _, attr = name.partition('.')
+        if not self._exists(node):
+            return False
+        return not attr or self._has_attr(self._resolve(node), attr)
+
+    def nodeType(self, name, **kwargs):
+        if kwargs.get('isTypeName'):
+            node_type = name
+        else:
+            node_type = self.nodes[self._resolve(name.split('.')[0])]
+        if kwargs.get('inherited') or kwargs.get('i'):
+            return [abstract for abstract, types in _ABSTRACT_TYPES.items()
+                    if node_type in types] + [node_type]
+        return node_type
+
+    def getClassification(self, node_type):
+        return list(_CLASSIFICATIONS.get(node_type, []))
+
+    # ------------------------------------------------------------------
+    # scene, files and references
+    # ------------------------------------------------------------------
+    def select(self, *args, **kwargs):
+        if kwargs.get('clear') or kwargs.get('cl'):
+            self.selection = []
+            return
+        items = _flatten(args[0] if args else [])
+        if kwargs.get('add'):
+            self.selection.extend(items)
+        else:
+            self.selection = items
+
+    def file(self, *args, **kwargs):
+        if kwargs.get('query') or kwargs.get('q'):
+            if kwargs.get('sn') or kwargs.get('sceneName'):
+                return self.scene_name
+            if kwargs.get('reference') or kwargs.get('r'):
+                return list(self.references)
+            raise NotImplementedError('file -q {}'.format(kwargs))
+
+        path = args[0] if args else ''
+        if kwargs.get('exportSelected') or kwargs.get('es'):
+            if self.export_cost:
+                time.sleep(self.export_cost)
+            with open(path, 'w') as f:
+                f.write('// fake maya file\n')
+                for item in self.selection:
+                    f.write('createNode "{}";\n'.format(item))
+            self.written_files.append(path)
+            return path
+        if kwargs.get('loadReference') or kwargs.get('lr'):
+            for reference in self.references.values():
+                if reference['node'] == kwargs.get('loadReference'):
+                    reference['loaded'] = True
+            return
+        if kwargs.get('removeReference') or kwargs.get('rr'):
+            self.references.pop(path, None)
+            return
+        if kwargs.get('reference') or kwargs.get('r'):
+            return self._reference(path, kwargs.get('namespace', ''),
+                                   loaded=not kwargs.get('deferReference'))
+        raise NotImplementedError('file {}'.format(kwargs))
+
+    def createNode(self, node_type, name='', **kwargs):
+        name = name or '{}#'.format(node_type)
+        if '#' in name:
+            index = 1
+            while name.replace('#', str(index)) in self.by_short:
+                index += 1
+            name = name.replace('#', str(index))
+        self.create_node('|' + name, node_type)
+        self._record_edit()
+        return name
+
+    def delete(self, *args, **kwargs):
+        for name in _flatten(args[0]):
+            long_name = self._resolve(name)
+            parent, short = long_name.rsplit('|', 1)
+            del self.nodes[long_name]
+            self.order.remove(long_name)
+            self.children[parent].remove(long_name)
+            self.by_short[short].remove(long_name)
+            if not self.by_short[short]:
+                del self.by_short[short]
+            self.attrs.pop(long_name, None)
+            self._record_edit()
+
+    def _reference(self, path, namespace, loaded=True):
+        namespace = namespace or os.path.splitext(os.path.basename(path))[0]
+        ref_path = path
+        copy_number = sum(1 for ref in self.references
+                          if ref.split('{')[0] == path)
+        if copy_number:
+            ref_path = '{}{{{}}}'.format(path, copy_number)
+        self.references[ref_path] = {'namespace': namespace, 'nodes': [],
+                                     'path': path, 'loaded': loaded,
+                                     'node': '{}RN'.format(namespace)}
+        self._trace('file -r -type "Alembic" -ignoreVersion -gl '
+                    '-mergeNamespacesOnClash false -namespace "{}" '
+                    '-options "v=0;" "{}";'.format(namespace, path),
+                    '// Result: {} //'.format(ref_path))
+        return ref_path
+
+    def referenceQuery(self, ref_path, **kwargs):
+        reference = self.references[ref_path]
+        if kwargs.get('ns') or kwargs.get('namespace'):
+            return ':' + reference['namespace']
+        if kwargs.get('nodes') or kwargs.get('n'):
+            return list(reference['nodes'])
+        if kwargs.get('isLoaded') or kwargs.get('il'):
+            return reference['loaded']
+        if kwargs.get('referenceNode') or kwargs.get('rfn'):
+            return reference['node']
+        if kwargs.get('filename') or kwargs.get('f'):
+            if kwargs.get('withoutCopyNumber') or kwargs.get('wcn'):
+                return reference['path']
+            return ref_path
+        raise NotImplementedError('referenceQuery {}'.format(kwargs))
+
+    def cmdFileOutput(self, **kwargs):
+        if 'open' in kwargs or 'o' in kwargs:
+            self.trace_path = kwargs.get('open', kwargs.get('o'))
+            return 1
+        self.trace_path = ''
+
+    def fileDialog2(self, **kwargs):
+        self.dialogs.append(kwargs)
+        if kwargs.get('fileMode') == 1:
+            path = self.import_path
+        else:
+            path = self.export_path
+        return [path] if path else None
+
+    def loadPlugin(self, name, **kwargs):
+        self.loaded_plugins.add(name)
+        return [name]
+
+    def pluginInfo(self, name, **kwargs):
+        return name in self.loaded_plugins
+
+    def confirmDialog(self, **kwargs):
+        self.dialogs.append(kwargs)
+        return kwargs.get('defaultButton', '')
+
+    def playbackOptions(self, **kwargs):
+        if kwargs.get('min'):
+            return float(self.playback[0])
+        return float(self.playback[1])
+
+    def AlembicExportSelection(self):
+        return _abc_export(self, '-frameRange 1 1 -dataFormat ogawa '
+                                 '-file {}'.format(self.export_path))
+
+    def CreateReference(self):
+        return self._reference(self.import_path, '')
+
+    def refresh(self, suspend=None, **kwargs):
+        if kwargs.get('query') or kwargs.get('q'):
+            return self.refresh_suspended
+        if suspend is not None:
+            self.refresh_suspended = suspend
+
+    def undoInfo(self, **kwargs):
+        if kwargs.get('openChunk'):
+            self.undo_chunk += 1
+            self.undo_queue += 1
+        elif kwargs.get('closeChunk'):
+            self.undo_chunk -= 1
+        elif kwargs.get('q') or kwargs.get('query'):
+            return True
+
+
+def _abc_export(cmds, job_args):
+    path = re.search(r'-file (\S+)', job_args).group(1)
+    cmds._trace('AbcExport -j "{}";'.format(job_args))
+    with open(path, 'w') as f:
+        f.write('fake alembic\n')
+        if cmds.abc_size:
+            f.truncate(cmds.abc_size)
+    cmds.written_files.append(path)
+    return path
+
+
+class FakeMel(object):
+    def __init__(self, cmds):
+        self._cmds = cmds
+
+    def eval(self, command):
+        if command.startswith('AbcExport'):
+            for job in re.findall(r'-j "([^"]*)"', command):
+                _abc_export(self._cmds, job)
+            return
+        raise NotImplementedError(command)
+
+
+class MGlobal(object):
+    messages = []
+    record = False
+
+    @classmethod
+    def displayInfo(cls, msg):
+        if cls.record:
+            cls.messages.append(('info', msg))
+
+    @classmethod
+    def displayWarning(cls, msg):
+        if cls.record:
+            cls.messages.append(('warning', msg))
+
+    @classmethod
+    def displayError(cls, msg):
+        if cls.record:
+            cls.messages.append(('error', msg))
+
+
+# the FakeCmds scene read by the maya.api.OpenMaya stand-in
+_scene = None
+
+
+class MFn(object):
+    kInvalid = 0
+    kMeshPolygonComponent = 550
+
+
+class MObject(object):
+    """
+    A node (`node` is its long name) or a face component (`faces` is the
+    list of face indices).
+    """
+
+    def __init__(self, node=None, faces=None):
+        self.node = node
+        self.faces = faces
+
+    def isNull(self):
+        return self.node is None and self.faces is None
+
+    def hasFn(self, fn):
+        return fn == MFn.kMeshPolygonComponent and self.faces is not None
+
+
+class MDagPath(object):
+    def __init__(self, long_name):
+        self.long_name = long_name
+
+    def fullPathName(self):
+        return self.long_name
+
+    def childCount(self):
+        return len(_scene.children.get(self.long_name, ()))
+
+
+class MSelectionList(object):
+    def __init__(self):
+        # [(long name, MObject of the component)]
+        self.items = []
+        self.nodes = set()
+
+    def add(self, name):
+        long_name = _scene._resolve(name)
+        if long_name not in self.nodes:
+            self.nodes.add(long_name)
+            self.items.append((long_name, None))
+
+    def add_component(self, long_name, faces):
+        self.items.append((long_name, MObject(faces=faces)))
+
+    def length(self):
+        return len(self.items)
+
+    def getDependNode(self, index):
+        return MObject(node=self.items[index][0])
+
+    def getDagPath(self, index):
+        long_name = self.items[index][0]
+        if _scene.nodes[long_name] == 'shadingEngine':
+            raise TypeError('Item is not a DAG path')
+        return MDagPath(long_name)
+
+    def getComponent(self, index):
+        component = self.items[index][1] or MObject()
+        return self.getDagPath(index), component
+
+    def getSelectionStrings(self, index):
+        long_name, component = self.items[index]
+        if component is None:
+            return [long_name]
+        return ['{}.{}'.format(long_name, _format_faces(interval))
+                for interval in _merge((i, i) for i in component.faces)]
+
+
+class MFnDependencyNode(object):
+    def __init__(self, node):
+        self.long_name = node.node
+
+    @property
+    def typeName(self):
+        return _scene.nodes[self.long_name]
+
+    def name(self):
+        return self.long_name.rsplit('|', 1)[-1]
+
+
+class MFnSet(MFnDependencyNode):
+    def getMembers(self, flatten):
+        shading_engine = self.name()
+        members = MSelectionList()
+        for shape in _scene.sg_shapes.get(shading_engine, ()):
+            intervals = _scene.assignments[shape][shading_engine]
+            if intervals is None:
+                members.add(shape)
+                continue
+            members.add_component(shape, [
+                index for start, end in intervals
+                for index in range(start, end + 1)])
+        return members
+
+
+class MFnSingleIndexedComponent(object):
+    def __init__(self, component):
+        self.component = component
+
+    def getElements(self):
+        return list(self.component.faces)
+
+
+class MItDag(object):
+    kDepthFirst = 0
+
+    def __init__(self, *args):
+        self.items = []
+        self.index = 0
+
+    def reset(self, root, traversal_type=kDepthFirst,
+              filter_type=MFn.kInvalid):
+        self.items = _scene._descendants(root.fullPathName())
+        self.index = 0
+
+    def isDone(self):
+        return self.index >= len(self.items)
+
+    def next(self):
+        self.index += 1
+
+    def getPath(self):
+        return MDagPath(self.items[self.index])
+
+    def currentItem(self):
+        return MObject(node=self.items[self.index])
+
+
+def install():
+    """
+    Register the fake modules as maya, maya.cmds, maya.mel, maya.OpenMaya
+    and maya.api.OpenMaya. Returns the FakeCmds instance, call reset() on
+    it to start a new scene.
+    """
+    global _scene
+    if 'maya' in sys.modules and \
+            isinstance(getattr(sys.modules['maya'], 'cmds', None), FakeCmds):
+        return sys.modules['maya'].cmds
+
+    cmds = _scene = FakeCmds()
+    maya = types.ModuleType('maya')
+    mel = FakeMel(cmds)
+    open_maya = types.ModuleType('maya.OpenMaya')
+    open_maya.MGlobal = MGlobal
+    maya.cmds = cmds
+    maya.mel = mel
+    maya.OpenMaya = open_maya
+    api = types.ModuleType('maya.api')
+    api_open_maya = types.ModuleType('maya.api.OpenMaya')
+    for cls in (MFn, MObject, MDagPath, MSelectionList, MFnDependencyNode,
+                MFnSet, MFnSingleIndexedComponent, MItDag):
+        setattr(api_open_maya, cls.__name__, cls)
+    api.OpenMaya = api_open_maya
+    maya.api = api
+    sys.modules['maya'] = maya
+    sys.modules['maya.cmds'] = cmds
+    sys.modules['maya.mel'] = mel
+    sys.modules['maya.OpenMaya'] = open_maya
+    sys.modules['maya.api'] = api
+    sys.modules['maya.api.OpenMaya'] = api_open_maya
+    return cmds
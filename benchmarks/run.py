@@ -0,0 +1,413 @@
+"""
+Benchmarks for the geo_shader_map hot paths on synthetic scenes, run
+against the in-memory maya stand-in of fake_maya.py.
+
+Run with the interpreter Maya uses (mayapy or a plain python of the same
+version), no Maya install is needed:
+
+    python benchmarks/run.py --sizes 1000,10000 --label my-change
+    python benchmarks/run.py --scenarios export_map --baseline master
+
+Results are stored in benchmarks/results/<label>.json and compared with
+the baseline result (the most recent other result by default), scenarios
+slower than --threshold are reported as regressions.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT_DIR = os.path.dirname(_BENCH_DIR)
+_RESULTS_DIR = os.path.join(_BENCH_DIR, 'results')
+
+sys.path.insert(0, _BENCH_DIR)
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import fake_maya  # noqa: E402
+import scene  # noqa: E402
+
+cmds = fake_maya.install()
+
+import session  # noqa: E402
+import scene_query  # noqa: E402
+import shader_map_file  # noqa: E402
+from snapshot import SceneSnapshot  # noqa: E402
+
+# keep the exports of the benchmarks out of the user's asset index
+session.Session.asset_index_path = os.path.join(tempfile.gettempdir(),
+                                                'lilisi_bench_index.sqlite')
+
+_SCENARIOS = []
+
+
+def scenario(func):
+    _SCENARIOS.append(func)
+    return func
+
+
+def _export_map(spec, backend):
+    shapes = scene.build_export_scene(cmds, spec)
+    cmds.select(shapes)
+
+    def run():
+        shading_engines = session._get_shading_engines(selected_geos=shapes)
+        snapshot = SceneSnapshot.build(
+            shading_engines, session._GEO_TYPES,
+            query=scene_query.get(backend, cmds_module=cmds))
+        shading_map = session._get_shading_map(shading_engines, shapes,
+                                               snapshot=snapshot)
+        return session._get_geos_shaders_map(shapes, shading_map,
+                                             snapshot=snapshot)
+
+    if backend != scene_query.CMDS:
+        # the backends read the same scene, their maps must not differ
+        expected = _export_map(spec, scene_query.CMDS)()
+        assert run() == expected, '{} map differs'.format(backend)
+    return run
+
+
+@scenario
+def export_map(spec):
+    """
+    Shading engine discovery, scene snapshot and map building.
+    """
+    return _export_map(spec, scene_query.CMDS)
+
+
+@scenario
+def export_map_openmaya(spec):
+    """
+    export_map with the OpenMaya 2.0 scene query backend, face members read
+    as index arrays.
+    """
+    return _export_map(spec, scene_query.OPENMAYA)
+
+
+@scenario
+def write_attributes(spec):
+    """
+    Writing "assigned_shader" to every shape, first export then re-export
+    of the same scene.
+    """
+    shapes = scene.build_export_scene(cmds, spec)
+    shading_engines = session._get_shading_engines(selected_geos=shapes)
+    shading_map = session._get_shading_map(shading_engines, shapes)
+    geos_shaders_map = session._get_geos_shaders_map(shapes, shading_map)
+
+    def run():
+        for attrs in cmds.attrs.values():
+            attrs.pop(session._SHADER_ATTR, None)
+        for _ in range(2):
+            session._add_shader_attrs(shapes, geos_shaders_map)
+
+    return run
+
+
+@scenario
+def parse_trace_log(spec):
+    """
+    Finding the alembic path in export and import command trace files with
+    one line per shape.
+    """
+    export_log = os.path.join(tempfile.gettempdir(), 'lilisi_bench_export.log')
+    import_log = os.path.join(tempfile.gettempdir(), 'lilisi_bench_import.log')
+    scene.write_trace_log(export_log, spec.shapes, '/tmp/bench/cube.abc')
+    scene.write_trace_log(import_log, spec.shapes, '/tmp/bench/cube.abc',
+                          reference=True)
+
+    def run():
+        assert session._get_abc_file_path(export_log) == '/tmp/bench/cube.abc'
+        session._get_reference_file_path(import_log)
+
+    return run
+
+
+@scenario
+def import_assign_bulk(spec):
+    """
+    Decoding "assigned_shader" and assigning in bulk, one sets edit per
+    shading engine.
+    """
+    shapes = scene.build_import_scene(cmds, spec)
+    return lambda: session._assign_shaders_in_bulk('shd', shapes)
+
+
+@scenario
+def import_assign_map_file(spec):
+    """
+    Reading the shader maps from a "<base>.shadermap" file instead of the
+    attributes and assigning in bulk.
+    """
+    shapes = scene.build_import_scene(cmds, spec)
+    path = os.path.join(tempfile.gettempdir(), 'lilisi_bench.shadermap')
+    shader_maps = session._get_assigned_shader_maps(shapes)
+    shader_map_file.write(path, dict(
+        (shader_map_file.strip_namespaces(shape), shader_map)
+        for shape, shader_map in shader_maps.items()))
+
+    def run():
+        session._assign_shaders_in_bulk(
+            'shd', shapes, shader_maps=session._match_shader_maps(
+                shader_map_file.read(path), shapes, path))
+
+    return run
+
+
+@scenario
+def import_assign_legacy(spec):
+    """
+    One sets edit per shape and face range, as before bulk assignment.
+    """
+    shapes = scene.build_import_scene(cmds, spec)
+    return lambda: session._assign_shader_to_geometry('shd', shapes)
+
+
+@scenario
+def import_reconcile_unchanged(spec):
+    """
+    Reconciling the assignment of an already assigned scene, which only
+    reads the current members of the shading engines.
+    """
+    shapes = scene.build_import_scene(cmds, spec)
+    session._assign_shaders_in_bulk('shd', shapes)
+    shader_maps = session._get_assigned_shader_maps(shapes)
+    return lambda: session._reconcile_shaders('shd', shader_maps)
+
+
+def _export_session(spec, suspend_updates):
+    shapes = scene.build_export_scene(cmds, spec)
+    geo_path = os.path.join(tempfile.gettempdir(), 'lilisi_bench_session.abc')
+
+    def run():
+        session.Session.suspend_updates = suspend_updates
+        try:
+            session.Session.export_to_path(geo_path, roots=['|set'],
+                                           scene_ext='ma',
+                                           shader_attribute=True)
+        finally:
+            session.Session.suspend_updates = True
+        # first export adds the attributes, later ones only set them
+        for attrs in cmds.attrs.values():
+            attrs.pop(session._SHADER_ATTR, None)
+
+    return run
+
+
+@scenario
+def export_session_live(spec):
+    """
+    Session.export_to_path writing "assigned_shader" while the viewport
+    refreshes after every edit, see --redraw-cost.
+    """
+    return _export_session(spec, False)
+
+
+@scenario
+def export_session_suspended(spec):
+    """
+    Session.export_to_path with the refresh suspended and the edits in one
+    undo chunk.
+    """
+    return _export_session(spec, True)
+
+
+def _export_publish(spec, background_workers):
+    shapes = scene.build_export_scene(cmds, spec)
+    geo_path = os.path.join(tempfile.gettempdir(), 'lilisi_bench_publish.abc')
+    publish_dir = os.path.join(tempfile.gettempdir(), 'lilisi_bench_publish')
+
+    def run():
+        if os.path.isdir(publish_dir):
+            shutil.rmtree(publish_dir)
+        session.Session.background_workers = background_workers
+        try:
+            session.Session.export_to_path(geo_path, roots=['|set'],
+                                           scene_ext='ma',
+                                           publish_dir=publish_dir)
+        finally:
+            session.Session.background_workers = 4
+        assert os.path.getsize(os.path.join(
+            publish_dir, os.path.basename(geo_path))) == \
+            os.path.getsize(geo_path)
+
+    return run
+
+
+@scenario
+def export_publish_serial(spec):
+    """
+    Session.export_to_path copying the files to a publish directory on the
+    main thread, see --abc-mb for the size of the abc files and
+    --export-cost for the time of the shader export.
+    """
+    return _export_publish(spec, 0)
+
+
+@scenario
+def export_publish_background(spec):
+    """
+    export_publish_serial with the sidecar writing and the publish copies
+    in background threads, alongside the shader export.
+    """
+    return _export_publish(spec, 4)
+
+
+def _python(code):
+    """
+    Run `code` in a new interpreter, with the package and fake_maya on the
+    path.
+    """
+    def run():
+        subprocess.check_call([sys.executable, '-c', code], env=dict(
+            os.environ, PYTHONPATH=os.pathsep.join(
+                [os.path.join(_ROOT_DIR, 'geo_shader_map'), _BENCH_DIR])))
+
+    return run
+
+
+@scenario
+def startup_session(spec):
+    """
+    New interpreter importing session with Maya loaded, the first import of
+    a shelf button. Independent of the scene size.
+    """
+    return _python('import fake_maya; fake_maya.install(); import session')
+
+
+@scenario
+def startup_worker(spec):
+    """
+    New interpreter importing the Maya-free modules, as a worker processing
+    exported files does. Fails if Maya is imported. Independent of the
+    scene size.
+    """
+    return _python('import sys; import asset_index, face_range, '
+                   'shader_map_file, shading_model, trace_log; '
+                   'assert "maya" not in sys.modules')
+
+
+def _time(run, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        run()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _default_label():
+    try:
+        label = subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'], cwd=_ROOT_DIR)
+        return label.decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+
+
+def _load_baseline(name, label):
+    if name:
+        path = os.path.join(_RESULTS_DIR, '{}.json'.format(name))
+    else:
+        paths = [p for p in glob.glob(os.path.join(_RESULTS_DIR, '*.json'))
+                 if os.path.basename(p) != '{}.json'.format(label)]
+        if not paths:
+            return None
+        path = max(paths, key=os.path.getmtime)
+    if not os.path.isfile(path):
+        print('Baseline "{}" not found.'.format(path))
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _compare(results, baseline, threshold):
+    print('\nCompared with "{}":'.format(baseline['label']))
+    regressions = 0
+    for name, sizes in sorted(results.items()):
+        for size, seconds in sorted(sizes.items(), key=lambda i: int(i[0])):
+            before = baseline['results'].get(name, {}).get(size)
+            if not before:
+                continue
+            ratio = seconds / before
+            flag = ''
+            if ratio > threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print('  {:<24} {:>7} shapes {:>8.3f}s -> {:>8.3f}s  x{:.2f}{}'
+                  .format(name, size, before, seconds, ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated shape counts')
+    parser.add_argument('--scenarios', default='',
+                        help='comma separated scenario names, all if empty')
+    parser.add_argument('--shading-engines', type=int, default=50)
+    parser.add_argument('--face-ratio', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--label', default='')
+    parser.add_argument('--baseline', default='',
+                        help='result label to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as regression')
+    parser.add_argument('--redraw-cost', type=float, default=0.0,
+                        help='milliseconds the viewport takes to redraw '
+                             'after each edit it is not suspended for')
+    parser.add_argument('--abc-mb', type=float, default=0.0,
+                        help='size of the abc files the exports write')
+    parser.add_argument('--export-cost', type=float, default=0.0,
+                        help='milliseconds Maya takes to write each '
+                             'exported scene file')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    selected = [s for s in args.scenarios.split(',') if s]
+    scenarios = [s for s in _SCENARIOS
+                 if not selected or s.__name__ in selected]
+    label = args.label or _default_label()
+    cmds.redraw_cost = args.redraw_cost / 1000.0
+    cmds.abc_size = int(args.abc_mb * (1 << 20))
+    cmds.export_cost = args.export_cost / 1000.0
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(',')]:
+        spec = scene.SceneSpec(shapes=size,
+                               shading_engines=args.shading_engines,
+                               face_ratio=args.face_ratio)
+        for func in scenarios:
+            seconds = _time(func(spec), args.repeat)
+            results.setdefault(func.__name__, {})[str(size)] = seconds
+            print('{:<24} {:>7} shapes {:>8.3f}s'.format(func.__name__, size,
+                                                          seconds))
+
+    report = {'label': label,
+              'date': datetime.datetime.now().isoformat(),
+              'python': platform.python_version(),
+              'results': results}
+    baseline = _load_baseline(args.baseline, label)
+    if not args.no_save:
+        if not os.path.isdir(_RESULTS_DIR):
+            os.makedirs(_RESULTS_DIR)
+        path = os.path.join(_RESULTS_DIR, '{}.json'.format(label))
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print('\nSaved "{}"'.format(path))
+
+    if baseline:
+        return 1 if _compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Synthetic scenes for the benchmarks.
+
+    |set|asset_0000|mesh_000000|mesh_000000Shape
+                   |mesh_000001|mesh_000001Shape
+        |asset_0001|...
+
+Shading engines are assigned round robin. `face_ratio` of the meshes get
+per-face assignments split into `face_ranges` ranges.
+"""
+import json
+import random
+
+
+class SceneSpec(object):
+    def __init__(self, shapes=1000, shading_engines=20, face_ratio=0.3,
+                 faces=96, face_ranges=6, shapes_per_asset=100, seed=0):
+        self.shapes = shapes
+        self.shading_engines = shading_engines
+        self.face_ratio = face_ratio
+        self.faces = faces
+        self.face_ranges = face_ranges
+        self.shapes_per_asset = shapes_per_asset
+        self.seed = seed
+
+    def __repr__(self):
+        return 'SceneSpec(shapes={}, shading_engines={}, face_ratio={})'.format(
+            self.shapes, self.shading_engines, self.face_ratio)
+
+
+def shading_engine_names(spec, namespace=''):
+    prefix = '{}:'.format(namespace) if namespace else ''
+    return ['{}lambert{}SG'.format(prefix, i)
+            for i in range(spec.shading_engines)]
+
+
+def _face_split(spec, rng):
+    """
+    Split the faces of one mesh into `face_ranges` (start, end) ranges.
+    """
+    cuts = sorted(rng.sample(range(1, spec.faces), spec.face_ranges - 1))
+    bounds = [0] + cuts + [spec.faces]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(len(bounds) - 1)]
+
+
+def iter_assignments(spec):
+    """
+    Yield (asset index, mesh index, [(shading engine index, interval or
+    None), ...]) deterministically for the spec.
+    """
+    rng = random.Random(spec.seed)
+    for i in range(spec.shapes):
+        if rng.random() < spec.face_ratio:
+            parts = [(rng.randrange(spec.shading_engines), interval)
+                     for interval in _face_split(spec, rng)]
+        else:
+            parts = [(i % spec.shading_engines, None)]
+        yield i // spec.shapes_per_asset, i, parts
+
+
+def _names(asset, mesh, namespace=''):
+    prefix = '{}:'.format(namespace) if namespace else ''
+    asset_name = '|{}set|{}asset_{:04d}'.format(prefix, prefix, asset)
+    transform = '{}|{}mesh_{:06d}'.format(asset_name, prefix, mesh)
+    return asset_name, transform, '{}|{}mesh_{:06d}Shape'.format(
+        transform, prefix, mesh)
+
+
+def build_export_scene(cmds, spec):
+    """
+    Scene as it is before an export: meshes assigned to shading engines.
+    :return: long names of the mesh shapes
+    """
+    cmds.reset()
+    cmds.scene_name = '/tmp/bench_scene.ma'
+    sgs = shading_engine_names(spec)
+    for sg in sgs:
+        cmds.create_shading_engine(sg)
+    cmds.create_shading_engine('initialShadingGroup')
+    cmds.create_node('|set', 'transform')
+
+    shapes = []
+    created_assets = set()
+    for asset, mesh, parts in iter_assignments(spec):
+        asset_name, transform, shape = _names(asset, mesh)
+        if asset not in created_assets:
+            created_assets.add(asset)
+            cmds.create_node(asset_name, 'transform')
+        cmds.create_node(transform, 'transform')
+        cmds.create_node(shape, 'mesh', face_count=spec.faces)
+        for sg_index, interval in parts:
+            cmds.assign(shape, sgs[sg_index],
+                        None if interval is None else [interval])
+        shapes.append(shape)
+    return shapes
+
+
+def build_import_scene(cmds, spec, namespace='asset', shader_namespace='shd'):
+    """
+    Scene right after referencing a cache and its shaders: namespaced meshes
+    carrying "assigned_shader" attributes, all in initialShadingGroup.
+    :return: long names of the mesh shapes
+    """
+    cmds.reset()
+    for sg in shading_engine_names(spec, namespace=shader_namespace):
+        cmds.create_shading_engine(sg)
+    cmds.create_shading_engine('initialShadingGroup')
+    cmds.create_node('|{}:set'.format(namespace), 'transform')
+
+    sgs = shading_engine_names(spec)
+    shapes = []
+    created_assets = set()
+    for asset, mesh, parts in iter_assignments(spec):
+        asset_name, transform, shape = _names(asset, mesh, namespace)
+        if asset not in created_assets:
+            created_assets.add(asset)
+            cmds.create_node(asset_name, 'transform')
+        cmds.create_node(transform, 'transform')
+        cmds.create_node(shape, 'mesh', face_count=spec.faces)
+        cmds.assign(shape, 'initialShadingGroup')
+        shader_map = {}
+        for sg_index, interval in parts:
+            if interval is None:
+                shader_map[''] = sgs[sg_index]
+            elif interval[0] == interval[1]:
+                shader_map['.f[{}]'.format(interval[0])] = sgs[sg_index]
+            else:
+                shader_map['.f[{}:{}]'.format(*interval)] = sgs[sg_index]
+        cmds.attrs[shape] = {'assigned_shader': {
+            'value': json.dumps(shader_map), 'locked': True}}
+        shapes.append(shape)
+    return shapes
+
+
+def write_trace_log(path, lines, abc_path, reference=False):
+    """
+    Command trace file with `lines` lines of noise and one alembic command
+    near the end, as written by "cmdFileOutput".
+    """
+    with open(path, 'w') as f:
+        for i in range(lines):
+            f.write('setAttr "mesh_{:06d}Shape.assigned_shader" -type '
+                    '"string" "{{\\"\\": \\"lambert1SG\\"}}";\n'.format(i))
+            if i == lines - 10:
+                if reference:
+                    f.write('file -r -type "Alembic" -ignoreVersion -gl '
+                            '-mergeNamespacesOnClash false -namespace "cube" '
+                            '-options "v=0;" "{}";\n'.format(abc_path))
+                    f.write('// Result: {} //\n'.format(abc_path))
+                else:
+                    f.write('AbcExport -j "-frameRange 1 1 -dataFormat ogawa '
+                            '-root |set -file {}";\n'.format(abc_path))
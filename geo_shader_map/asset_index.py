@@ -0,0 +1,232 @@
+"""
+SQLite index of the exports, one row per abc file with the files written
+next to it, so an import finds them with one query instead of probing the
+file system, and the exports using a shading engine or shader file can be
+listed:
+
+    index = AssetIndex('/home/me/.lilisi/asset_index.sqlite')
+    index.record_exports([ExportRecord('/publish/chair.abc', ...)])
+    index.find_exports(['/publish/chair.abc'])
+    --> {'/publish/chair.abc': ExportRecord}
+    index.find_assets(shading_engine='lambert2SG')
+    --> ['/publish/chair.abc', '/publish/table.abc']
+    index.close()
+
+The database is local to the machine, SQLite locking is not reliable on
+network file systems.
+"""
+import os
+import sqlite3
+import time
+
+_VERSION = 1
+
+# variables per statement, SQLite allows 999 by default
+_CHUNK_SIZE = 500
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS exports (
+    geo_path TEXT PRIMARY KEY,
+    geo_mtime REAL,
+    shader_path TEXT,
+    library_map_path TEXT,
+    shader_map_path TEXT,
+    geo_fingerprint TEXT,
+    shader_fingerprint TEXT,
+    start_frame INTEGER,
+    end_frame INTEGER,
+    scene_path TEXT,
+    exported REAL
+);
+CREATE TABLE IF NOT EXISTS shading_engines (
+    geo_path TEXT,
+    shading_engine TEXT,
+    shader_path TEXT
+);
+CREATE INDEX IF NOT EXISTS shading_engines_geo_path
+    ON shading_engines (geo_path);
+CREATE INDEX IF NOT EXISTS shading_engines_shading_engine
+    ON shading_engines (shading_engine);
+CREATE INDEX IF NOT EXISTS shading_engines_shader_path
+    ON shading_engines (shader_path);
+'''
+
+_EXPORT_COLUMNS = ('geo_path', 'geo_mtime', 'shader_path', 'library_map_path',
+                   'shader_map_path', 'geo_fingerprint', 'shader_fingerprint',
+                   'start_frame', 'end_frame', 'scene_path', 'exported')
+
+Error = sqlite3.Error
+
+
+def default_path():
+    """
+    $LILISI_ASSET_INDEX, None if it is not set: the index is only used when
+    asked for.
+    """
+    return os.environ.get('LILISI_ASSET_INDEX') or None
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ExportRecord(object):
+    """
+    One abc file and what was exported with it.
+
+    :param shading_engines: {shading engine: shader file}, the library entry
+                            of the shading engine for library exports
+    :param frame_range: (start, end)
+    """
+
+    def __init__(self, geo_path, geo_mtime=None, shader_path='',
+                 library_map_path='', shader_map_path='',
+                 geo_fingerprint=None, shader_fingerprint=None,
+                 frame_range=None, scene_path='', shading_engines=None,
+                 exported=None):
+        self.geo_path = geo_path
+        self.geo_mtime = geo_mtime
+        self.shader_path = shader_path
+        self.library_map_path = library_map_path
+        self.shader_map_path = shader_map_path
+        self.geo_fingerprint = geo_fingerprint
+        self.shader_fingerprint = shader_fingerprint
+        self.frame_range = frame_range
+        self.scene_path = scene_path
+        self.shading_engines = shading_engines or {}
+        self.exported = exported
+
+    def _row(self):
+        start, end = self.frame_range or (None, None)
+        return (normalize_path(self.geo_path), self.geo_mtime,
+                self.shader_path, self.library_map_path,
+                self.shader_map_path, self.geo_fingerprint,
+                self.shader_fingerprint, start, end, self.scene_path,
+                self.exported or time.time())
+
+    @classmethod
+    def _from_row(cls, row):
+        values = dict(zip(_EXPORT_COLUMNS, row))
+        frame_range = None
+        if values['start_frame'] is not None:
+            frame_range = (values['start_frame'], values['end_frame'])
+        return cls(values['geo_path'], geo_mtime=values['geo_mtime'],
+                   shader_path=values['shader_path'] or '',
+                   library_map_path=values['library_map_path'] or '',
+                   shader_map_path=values['shader_map_path'] or '',
+                   geo_fingerprint=values['geo_fingerprint'],
+                   shader_fingerprint=values['shader_fingerprint'],
+                   frame_range=frame_range,
+                   scene_path=values['scene_path'] or '',
+                   exported=values['exported'])
+
+
+class AssetIndex(object):
+    """
+    See the module docstring. A connection is only used by the thread which
+    opened it.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: database file, default_path() if None
+        """
+        self.path = path or default_path()
+        if not self.path:
+            raise ValueError('No asset index path given and '
+                             '$LILISI_ASSET_INDEX is not set.')
+        self._connection = None
+
+    def _connect(self, create):
+        """
+        :return: the connection, None if the database does not exist and
+                 `create` is False
+        """
+        if self._connection is None:
+            if not os.path.isfile(self.path):
+                if not create:
+                    return None
+                index_dir = os.path.dirname(self.path)
+                if index_dir and not os.path.isdir(index_dir):
+                    os.makedirs(index_dir)
+            self._connection = sqlite3.connect(self.path, timeout=10)
+            version = self._connection.execute(
+                'PRAGMA user_version').fetchone()[0]
+            if version != _VERSION:
+                with self._connection:
+                    self._connection.executescript(_SCHEMA)
+                    self._connection.execute(
+                        'PRAGMA user_version = {}'.format(_VERSION))
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def record_exports(self, records):
+        """
+        Add or replace the rows of `records`, in one transaction.
+        """
+        connection = self._connect(create=True)
+        with connection:
+            for record in records:
+                row = record._row()
+                connection.execute(
+                    'INSERT OR REPLACE INTO exports ({}) VALUES ({})'.format(
+                        ', '.join(_EXPORT_COLUMNS),
+                        ', '.join('?' * len(_EXPORT_COLUMNS))), row)
+                connection.execute(
+                    'DELETE FROM shading_engines WHERE geo_path = ?',
+                    (row[0],))
+                connection.executemany(
+                    'INSERT INTO shading_engines VALUES (?, ?, ?)',
+                    [(row[0], shading_engine, normalize_path(shader_path))
+                     for shading_engine, shader_path in
+                     sorted(record.shading_engines.items())])
+
+    def find_exports(self, geo_paths):
+        """
+        :return: {geo path: ExportRecord} of the recorded `geo_paths`,
+                 without their shading engines
+        """
+        connection = self._connect(create=False)
+        if connection is None:
+            return {}
+        paths = dict((normalize_path(path), path) for path in geo_paths)
+        keys = sorted(paths)
+        records = {}
+        for i in range(0, len(keys), _CHUNK_SIZE):
+            chunk = keys[i:i + _CHUNK_SIZE]
+            rows = connection.execute(
+                'SELECT {} FROM exports WHERE geo_path IN ({})'.format(
+                    ', '.join(_EXPORT_COLUMNS), ', '.join('?' * len(chunk))),
+                chunk)
+            for row in rows:
+                records[paths[row[0]]] = ExportRecord._from_row(row)
+        return records
+
+    def find_assets(self, shading_engine='', shader_path=''):
+        """
+        :param shading_engine: name of the shading engine when exported
+        :param shader_path: shader file or shader library entry
+        :return: sorted abc file paths of the exports using the shading
+                 engine and/or shader file
+        """
+        conditions = []
+        values = []
+        if shading_engine:
+            conditions.append('shading_engine = ?')
+            values.append(shading_engine)
+        if shader_path:
+            conditions.append('shader_path = ?')
+            values.append(normalize_path(shader_path))
+        if not conditions:
+            raise ValueError('Give a shading engine or a shader path.')
+        connection = self._connect(create=False)
+        if connection is None:
+            return []
+        rows = connection.execute(
+            'SELECT DISTINCT geo_path FROM shading_engines WHERE {} '
+            'ORDER BY geo_path'.format(' AND '.join(conditions)), values)
+        return [row[0] for row in rows]
@@ -0,0 +1,278 @@
+"""
+Headless batch export of many scenes.
+
+Every job of the manifest is exported by its own standalone Maya process,
+with at most one process per core running at a time:
+
+    mayapy batch.py jobs.json --workers 8 --timeout 1800 --retries 1
+
+jobs.json:
+    [{"scene": "/assets/chair/chair.ma",
+      "roots": ["|chair"],
+      "output": "/publish/chair/chair.abc",
+      "frame_range_mode": "keyed"},
+     ...]
+
+"roots" is optional, all top level nodes except the default cameras are
+exported without it. "frame_range_mode" is "scene" by default,
+"split_roots" and "incremental" false and "library_dir" empty, see
+session.Session.export_scene. A summary is written to
+"<manifest>.report.json" and the output of each job to
+"<log dir>/<job name>.log".
+
+This module does not import maya, only the worker processes do.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from multiprocessing.pool import ThreadPool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL = 0.5
+
+_DEFAULT_CAMERAS = ('|persp', '|top', '|front', '|side')
+
+
+class BatchException(Exception):
+    pass
+
+
+class Job(object):
+    def __init__(self, scene, output, roots=None, name='',
+                 frame_range_mode='scene', split_roots=False,
+                 library_dir='', incremental=False):
+        self.scene = scene
+        self.output = output
+        self.roots = roots or []
+        self.name = name or os.path.splitext(os.path.basename(output))[0]
+        self.frame_range_mode = frame_range_mode
+        self.split_roots = split_roots
+        self.library_dir = library_dir
+        self.incremental = incremental
+
+    @classmethod
+    def from_dict(cls, data):
+        for key in ('scene', 'output'):
+            if not data.get(key):
+                raise BatchException(
+                    'Job {} has no "{}".'.format(json.dumps(data), key))
+        return cls(data['scene'], data['output'], roots=data.get('roots'),
+                   name=data.get('name', ''),
+                   frame_range_mode=data.get('frame_range_mode', 'scene'),
+                   split_roots=data.get('split_roots', False),
+                   library_dir=data.get('library_dir', ''),
+                   incremental=data.get('incremental', False))
+
+    def to_dict(self):
+        return {'scene': self.scene, 'output': self.output,
+                'roots': self.roots, 'name': self.name,
+                'frame_range_mode': self.frame_range_mode,
+                'split_roots': self.split_roots,
+                'library_dir': self.library_dir,
+                'incremental': self.incremental}
+
+
+def load_manifest(path):
+    """
+    :return: [Job, ...] with unique names
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('jobs', [])
+
+    jobs = []
+    names = set()
+    for item in data:
+        job = Job.from_dict(item)
+        name = job.name
+        index = 1
+        while job.name in names:
+            job.name = '{}_{}'.format(name, index)
+            index += 1
+        names.add(job.name)
+        jobs.append(job)
+    return jobs
+
+
+def find_mayapy():
+    if os.path.basename(sys.executable).lower().startswith('mayapy'):
+        return sys.executable
+    executable = 'mayapy.exe' if sys.platform == 'win32' else 'mayapy'
+    maya_location = os.environ.get('MAYA_LOCATION')
+    if maya_location:
+        return os.path.join(maya_location, 'bin', executable)
+    return executable
+
+
+def _run_process(args, log_path, timeout=None):
+    """
+    :return: (return code, None if the process was killed on timeout,
+              elapsed seconds)
+    """
+    start = time.time()
+    with open(log_path, 'a') as log:
+        process = subprocess.Popen(args, stdout=log, stderr=subprocess.STDOUT)
+        while process.poll() is None:
+            if timeout and time.time() - start > timeout:
+                process.kill()
+                process.wait()
+                return None, time.time() - start
+            time.sleep(_POLL_INTERVAL)
+    return process.returncode, time.time() - start
+
+
+def run_job(job, mayapy='', timeout=None, retries=0, log_dir=''):
+    """
+    Export one job in a new mayapy process, retried up to `retries` times
+    when it fails or times out.
+    :return: summary dict of the job
+    """
+    mayapy = mayapy or find_mayapy()
+    log_dir = log_dir or tempfile.gettempdir()
+    log_path = os.path.join(log_dir, '{}.log'.format(job.name))
+    args = [mayapy, os.path.abspath(__file__), '--worker',
+            json.dumps(job.to_dict())]
+
+    attempts = []
+    status = ''
+    for attempt in range(retries + 1):
+        return_code, elapsed = _run_process(args, log_path, timeout=timeout)
+        if return_code is None:
+            status = 'timeout'
+        elif return_code == 0:
+            status = 'ok'
+        else:
+            status = 'failed'
+        attempts.append({'status': status, 'return_code': return_code,
+                         'wall_time': round(elapsed, 3)})
+        if status == 'ok':
+            break
+        logger.warning('Job "{}" {} after {:.1f}s (attempt {}/{}), see '
+                       '"{}".'.format(job.name, status, elapsed, attempt + 1,
+                                      retries + 1, log_path))
+
+    return {'name': job.name, 'job': job.to_dict(), 'status': status,
+            'attempts': attempts, 'log': log_path}
+
+
+def run_batch(jobs, workers=None, timeout=None, retries=0, mayapy='',
+              log_dir=''):
+    """
+    Run the jobs in a pool of `workers` mayapy processes, one per core by
+    default.
+    :return: summary dict
+    """
+    workers = workers or multiprocessing.cpu_count()
+    log_dir = log_dir or tempfile.mkdtemp(prefix='lilisi_batch_')
+    mayapy = mayapy or find_mayapy()
+    logger.info('Running {} jobs on {} workers with "{}", logs in '
+                '"{}".'.format(len(jobs), workers, mayapy, log_dir))
+
+    start = time.time()
+    results = []
+    pool = ThreadPool(workers)
+    try:
+        pending = [pool.apply_async(run_job, (job,),
+                                    {'mayapy': mayapy, 'timeout': timeout,
+                                     'retries': retries, 'log_dir': log_dir})
+                   for job in jobs]
+        for result in pending:
+            summary = result.get()
+            results.append(summary)
+            logger.info('[{}/{}] {}: {}'.format(len(results), len(jobs),
+                                                summary['name'],
+                                                summary['status']))
+    finally:
+        pool.close()
+        pool.join()
+
+    failed = [r['name'] for r in results if r['status'] != 'ok']
+    return {'total': len(results),
+            'succeeded': len(results) - len(failed),
+            'failed': failed,
+            'wall_time': round(time.time() - start, 3),
+            'log_dir': log_dir,
+            'jobs': results}
+
+
+def _scene_roots(cmds):
+    return [root for root in cmds.ls(assemblies=True, long=True)
+            if root not in _DEFAULT_CAMERAS]
+
+
+def _run_worker(job_data):
+    """
+    Entry point of the mayapy worker process.
+    """
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    try:
+        from maya import cmds
+        import session
+
+        job = Job.from_dict(job_data)
+        logger.info('Opening "{}"'.format(job.scene))
+        cmds.file(job.scene, open=True, force=True)
+        roots = job.roots or _scene_roots(cmds)
+        session.Session.export_to_path(
+            job.output, roots=roots, frame_range_mode=job.frame_range_mode,
+            split_roots=job.split_roots, library_dir=job.library_dir,
+            incremental=job.incremental)
+        logger.info('Exported "{}"'.format(job.output))
+    finally:
+        maya.standalone.uninitialize()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Export the scenes of a manifest with mayapy workers.')
+    parser.add_argument('manifest', nargs='?', help='json list of jobs')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of processes, one per core if 0')
+    parser.add_argument('--timeout', type=float, default=0,
+                        help='seconds before a job is killed, no limit if 0')
+    parser.add_argument('--retries', type=int, default=0)
+    parser.add_argument('--mayapy', default='')
+    parser.add_argument('--log-dir', default='')
+    parser.add_argument('--report', default='',
+                        help='summary json, "<manifest>.report.json" if empty')
+    parser.add_argument('--worker', default='', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        try:
+            _run_worker(json.loads(args.worker))
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+    if not args.manifest:
+        parser.error('manifest is required')
+
+    jobs = load_manifest(args.manifest)
+    summary = run_batch(jobs, workers=args.workers or None,
+                        timeout=args.timeout or None, retries=args.retries,
+                        mayapy=args.mayapy, log_dir=args.log_dir)
+
+    report = args.report or '{}.report.json'.format(
+        os.path.splitext(args.manifest)[0])
+    with open(report, 'w') as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    logger.info('{}/{} jobs succeeded in {}s, report "{}"'.format(
+        summary['succeeded'], summary['total'], summary['wall_time'], report))
+    return 0 if not summary['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,99 @@
 import json
+import math
 
-from maya import cmds
-from maya import mel
+from log import Log, Lazy, LazyModule
+
+cmds = LazyModule('maya.cmds')
+mel = LazyModule('maya.mel')
+
+# frame range modes of Geo_Exporter.find_frame_range
+SCENE_RANGE = 'scene'
+KEYED_RANGE = 'keyed'
+
+# curves evaluated at the current time, driven keys are not
+_TIME_CURVE_TYPES = ['animCurveTA', 'animCurveTL', 'animCurveTT',
+                     'animCurveTU']
+
+# nodes reading the time directly: expressions, caches, simulations
+_TIME_NODE_TYPES = ['time', 'expression']
+
+# parts of the classification of the node types written to shader files,
+# e.g. "shader/surface", "texture/2d", "rendernode/arnold/shader/surface"
+_SHADING_CLASSIFICATIONS = {'shader', 'texture', 'utility', 'rendernode'}
+
+# shading network node types without such a classification
+_SHADING_NODE_TYPES = {'shadingEngine', 'animCurve', 'unitConversion'}
 
 
 class Exporter(object):
-    pass
+
+    @classmethod
+    def walk_upstream(cls, nodes, node_filter=None, expand=None,
+                      skip_conversion_nodes=False):
+        """
+        Walk the connections upstream of `nodes` level by level.
+        :param node_filter: called with a node type, the nodes it rejects
+                            are not followed
+        :param expand: called with the long names of the nodes kept at a
+                       level, the nodes it returns are walked with the next
+                       level, e.g. the DAG ancestors
+        :param skip_conversion_nodes: follow the connections through the
+                                      unit conversion nodes instead of
+                                      walking them
+        :return: ({long name: node type} of the walked nodes,
+                  {long name: node type} of the rejected nodes)
+        """
+        walked = {}
+        rejected = {}
+        level = set(nodes)
+        # one query per level of the graph instead of one per node
+        while level:
+            result = cmds.ls(sorted(level), long=True, showType=True) or []
+            kept = []
+            for node, node_type in zip(result[0::2], result[1::2]):
+                if node in walked or node in rejected:
+                    continue
+                if node_filter is None or node_filter(node_type):
+                    walked[node] = node_type
+                    kept.append(node)
+                else:
+                    rejected[node] = node_type
+            if not kept:
+                break
+            level = set(cmds.listConnections(
+                kept, source=True, destination=False,
+                skipConversionNodes=skip_conversion_nodes) or [])
+            if expand is not None:
+                level.update(expand(kept))
+            level.difference_update(walked)
+        return walked, rejected
 
 
 class Geo_Exporter(Exporter):
 
     @classmethod
-    def export(cls, path='', attributes=None):
+    def export(cls, path='', attributes=None, roots=None, frame_range=None):
+        cls.export_jobs([(path, roots, frame_range)], attributes=attributes)
+
+    @classmethod
+    def export_jobs(cls, jobs, attributes=None):
+        """
+        Write several abc files with a single "AbcExport" call, the timeline
+        is evaluated once for all of them.
+        :param jobs: [(path, roots, frame range), ...], the whole scene if
+                     roots is None and the scene animation range if frame
+                     range is None
+        :param attributes: extra attributes written to every file
+        """
+        # build the export command.  Note, use AbcExport -help in Maya for
+        # more detailed Alembic export help
+        abc_export_cmd = "AbcExport " + " ".join(
+            "-j \"%s\"" % cls._job_args(path, attributes, roots, frame_range)
+            for path, roots, frame_range in jobs)
+        mel.eval(abc_export_cmd)
+
+    @classmethod
+    def _job_args(cls, path, attributes=None, roots=None, frame_range=None):
         # set the alembic args that make the most sense when working with
         # Mari.  These flags
         # will ensure the export of an Alembic file that contains all visible
@@ -26,8 +108,9 @@ class Geo_Exporter(Exporter):
                         ]
 
         # find the animated frame range to use:
-        start_frame, end_frame = cls.find_scene_animation_range()
-        if start_frame and end_frame:
+        start_frame, end_frame = frame_range or \
+            cls.find_scene_animation_range()
+        if start_frame is not None and end_frame is not None:
             alembic_args.append("-fr %d %d" % (start_frame, end_frame))
 
         # add extra attr name to the abc file
@@ -35,13 +118,15 @@ class Geo_Exporter(Exporter):
             for attr in attributes:
                 alembic_args.append('-attr {0}'.format(attr))
 
+        # export only these DAG nodes, the whole scene if None
+        if roots:
+            for root in roots:
+                alembic_args.append('-root {0}'.format(root))
+
         # Set the output path:
         # Note: The AbcExport command expects forward slashes!
         alembic_args.append("-file {}".format(path.replace("\\", "/")))
-        # build the export command.  Note, use AbcExport -help in Maya for
-        # more detailed Alembic export help
-        abc_export_cmd = ("AbcExport -j \"%s\"" % " ".join(alembic_args))
-        mel.eval(abc_export_cmd)
+        return " ".join(alembic_args)
 
     @classmethod
     def find_scene_animation_range(cls):
@@ -64,6 +149,104 @@ class Geo_Exporter(Exporter):
 
         return start, end
 
+    @classmethod
+    def find_frame_range(cls, roots=None, mode=SCENE_RANGE):
+        """
+        :param mode: SCENE_RANGE, the playback range if anything in the scene
+                     is animated, or KEYED_RANGE, the keyed range of the
+                     animation driving `roots` and a single frame if nothing
+                     does
+        :return: (start, end)
+        """
+        if mode == SCENE_RANGE or not roots:
+            return cls.find_scene_animation_range()
+        if mode != KEYED_RANGE:
+            raise ValueError('Unknown frame range mode "{}".'.format(mode))
+
+        frame_range = cls.find_roots_animation_range(roots)
+        if frame_range is None:
+            start = int(cmds.playbackOptions(q=True, min=True))
+            return start, start
+        return frame_range
+
+    @classmethod
+    def find_upstream_nodes(cls, roots):
+        """
+        The DAG nodes under `roots` and every node they are driven by, the
+        DAG ancestors of the nodes included: an animated parent moves its
+        children.
+        :return: long names of the nodes
+        """
+        nodes = cmds.ls(roots, dag=True, long=True) or []
+        nodes.extend(cls._find_ancestors(nodes))
+        return set(cls.walk_upstream(nodes, expand=cls._find_ancestors,
+                                     skip_conversion_nodes=True)[0])
+
+    @staticmethod
+    def _find_ancestors(nodes):
+        """
+        Parents of the DAG nodes up to the world, from their long names.
+        """
+        ancestors = set()
+        for node in nodes:
+            # DG node long names have no "|"
+            parent = node.rsplit('|', 1)[0]
+            while parent and parent not in ancestors:
+                ancestors.add(parent)
+                parent = parent.rsplit('|', 1)[0]
+        return ancestors
+
+    @classmethod
+    def find_animation_curves(cls, roots):
+        """
+        Animation curves driving `roots`, driven keys included.
+        """
+        return cmds.ls(list(cls.find_upstream_nodes(roots)),
+                       type='animCurve') or []
+
+    @classmethod
+    def find_time_nodes(cls, nodes):
+        """
+        Nodes of `nodes` reading the time directly, their output can change
+        at any frame whatever the keys.
+        """
+        return cmds.ls(list(nodes), type=_TIME_NODE_TYPES) or []
+
+    @classmethod
+    def find_roots_animation_range(cls, roots):
+        """
+        Find the keyed frame range of the animation driving `roots`, clipped
+        to the playback range.
+        :return: (start, end), None if `roots` do not change over it
+        """
+        upstream = list(cls.find_upstream_nodes(roots))
+        playback_range = (int(cmds.playbackOptions(q=True, min=True)),
+                          int(cmds.playbackOptions(q=True, max=True)))
+        if cls.find_time_nodes(upstream):
+            return playback_range
+
+        curves = cmds.ls(upstream, type=_TIME_CURVE_TYPES)
+        if not curves:
+            return None
+
+        # cycles and extrapolation keep changing after the last key
+        infinities = (cmds.setInfinity(curves, q=True, preInfinite=True) or
+                      []) + (cmds.setInfinity(curves, q=True,
+                                              postInfinite=True) or [])
+        if any(infinity != 'constant' for infinity in infinities):
+            return playback_range
+
+        # the key times of all the curves in a single query
+        times = cmds.keyframe(curves, query=True, timeChange=True)
+        if not times:
+            return None
+        start = max(int(math.floor(min(times))), playback_range[0])
+        end = min(int(math.ceil(max(times))), playback_range[1])
+        if start > end:
+            # all the keys are outside of the playback range
+            return None
+        return start, end
+
     @classmethod
     def alembic_export(cls):
         return cmds.AlembicExportSelection()
@@ -71,8 +254,66 @@ class Geo_Exporter(Exporter):
 
 class Shader_Exporter(Exporter):
 
+    # {node type: True if it is part of shading networks}
+    _shading_types = {}
+
+    @classmethod
+    def export(cls, path='', scene_type='', shading_engines=None,
+               prune=True):
+        """
+        :param prune: write only the shading networks of `shading_engines`,
+                      see find_shading_network, instead of the shading
+                      engines with all their history
+        """
+        if not prune:
+            cmds.select(shading_engines, ne=True, r=True)
+            return cmds.file(path, exportSelected=True, force=True, sh=True,
+                             pr=True, type=scene_type)
+
+        network, excluded = cls.find_shading_network(shading_engines)
+        cls.report_excluded(excluded, len(network))
+        cmds.select(sorted(network), ne=True, r=True)
+        # the network is selected as a whole, nothing else is followed
+        return cmds.file(path, exportSelected=True, force=True, pr=True,
+                         type=scene_type, constructionHistory=False,
+                         channels=False, expressions=False,
+                         constraints=False, shader=False)
+
+    @classmethod
+    def is_shading_type(cls, node_type):
+        if node_type not in cls._shading_types:
+            parts = set()
+            # e.g. ['drawdb/shader/surface/lambert:shader/surface']
+            for classifications in cmds.getClassification(node_type) or []:
+                for classification in classifications.split(':'):
+                    parts.update(classification.split('/'))
+            inherited = cmds.nodeType(node_type, isTypeName=True,
+                                      inherited=True) or []
+            cls._shading_types[node_type] = bool(
+                parts.intersection(_SHADING_CLASSIFICATIONS) or
+                _SHADING_NODE_TYPES.intersection(inherited))
+        return cls._shading_types[node_type]
+
+    @classmethod
+    def find_shading_network(cls, shading_engines):
+        """
+        Walk upstream of `shading_engines` through the shading node types
+        only, member geometries, group ids and construction history are not
+        followed.
+        :return: ({node: node type} of the network,
+                  {node: node type} of the excluded upstream nodes)
+        """
+        # conversion nodes are kept, they carry the connections
+        return cls.walk_upstream(shading_engines,
+                                 node_filter=cls.is_shading_type)
+
     @classmethod
-    def export(cls, path='', scene_type='', shading_engines=None):
-        cmds.select(shading_engines, ne=True, r=True)
-        return cmds.file(path, exportSelected=True, force=True, sh=True,
-                         pr=True, type=scene_type)
+    def report_excluded(cls, excluded, network_size):
+        counts = {}
+        for node_type in excluded.values():
+            counts[node_type] = counts.get(node_type, 0) + 1
+        Log.info('Exporting {} shading nodes, excluded {} upstream nodes '
+                 '({}).'.format(network_size, len(excluded), ', '.join(
+                     '{} {}'.format(count, node_type)
+                     for node_type, count in sorted(counts.items()))))
+        Log.debug('Excluded from the shader file: {}', Lazy(sorted, excluded))
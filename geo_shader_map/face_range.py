@@ -0,0 +1,271 @@
+"""
+Face component ranges.
+
+Face assignments look like '.f[0:3]' or '|pCube1|pCubeShape1.f[4]'. They
+are parsed into inclusive (start, end) integer intervals which can be merged,
+compared between shading engines and written back as the minimal list of
+component strings. NumPy is used for the bulk operations when it is
+available, it is only imported by the first of them.
+"""
+import re
+
+from log import Log
+
+# numpy module once imported by _get_numpy, False without numpy
+_numpy = None
+
+_FACE_COMPONENT = '.f['
+
+_RANGE_PATTERN = re.compile(r'^f\[(\d+)(?::(\d+))?\]$')
+
+# below this size the pure python path is faster than building arrays
+_NUMPY_MIN_SIZE = 64
+
+
+def split_component(name):
+    """
+    '|pCube1|pCubeShape1.f[0:3]' --> ('|pCube1|pCubeShape1', '.f[0:3]')
+    '|pCube1|pCubeShape1' --> ('|pCube1|pCubeShape1', '')
+    """
+    if _FACE_COMPONENT not in name:
+        return name, ''
+    node, faces = name.rsplit(_FACE_COMPONENT, 1)
+    return node, '{}{}'.format(_FACE_COMPONENT, faces)
+
+
+def parse(component):
+    """
+    '.f[0:3]' --> (0, 3)
+    '.f[4]' --> (4, 4)
+    Return None if the component is not a plain face range, e.g. '.f[*]'.
+    """
+    matched = _RANGE_PATTERN.match(component.rsplit('.', 1)[-1])
+    if not matched:
+        return None
+    start = int(matched.group(1))
+    end = matched.group(2)
+    end = int(end) if end is not None else start
+    if end < start:
+        start, end = end, start
+    return start, end
+
+
+def format_component(interval):
+    """
+    (0, 3) --> '.f[0:3]'
+    (4, 4) --> '.f[4]'
+    """
+    start, end = interval
+    if start == end:
+        return '{}{}]'.format(_FACE_COMPONENT, start)
+    return '{}{}:{}]'.format(_FACE_COMPONENT, start, end)
+
+
+def format_components(intervals):
+    return [format_component(interval) for interval in intervals]
+
+
+def _get_numpy():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy as _numpy
+        except ImportError:
+            _numpy = False
+    return _numpy
+
+
+def merge(intervals):
+    """
+    Sort and merge overlapping and adjacent intervals:
+        [(4, 4), (0, 3), (6, 8), (7, 9)] --> [(0, 4), (6, 9)]
+    """
+    if not intervals:
+        return []
+    if len(intervals) >= _NUMPY_MIN_SIZE and _get_numpy():
+        return _merge_numpy(intervals)
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _merge_numpy(intervals):
+    numpy = _get_numpy()
+    array = numpy.asarray(intervals, dtype=numpy.int64).reshape(-1, 2)
+    array = array[numpy.argsort(array[:, 0], kind='mergesort')]
+    ends = numpy.maximum.accumulate(array[:, 1])
+    # a new interval starts where the start is past the running end + 1
+    breaks = numpy.ones(len(array), dtype=bool)
+    breaks[1:] = array[1:, 0] > ends[:-1] + 1
+    first = numpy.flatnonzero(breaks)
+    last = numpy.append(first[1:] - 1, len(array) - 1)
+    return list(zip(array[first, 0].tolist(), ends[last].tolist()))
+
+
+def from_indices(indices):
+    """
+    Face indices, e.g. from MFnSingleIndexedComponent.getElements(), to
+    merged intervals:
+        [5, 0, 1, 2, 3] --> [(0, 3), (5, 5)]
+    """
+    if not len(indices):
+        return []
+    if len(indices) >= _NUMPY_MIN_SIZE and _get_numpy():
+        numpy = _get_numpy()
+        array = numpy.unique(numpy.asarray(indices, dtype=numpy.int64))
+        breaks = numpy.flatnonzero(numpy.diff(array) != 1)
+        starts = numpy.append(array[0], array[breaks + 1])
+        ends = numpy.append(array[breaks], array[-1])
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    intervals = []
+    for index in sorted(set(indices)):
+        if intervals and index == intervals[-1][1] + 1:
+            intervals[-1] = (intervals[-1][0], index)
+        else:
+            intervals.append((index, index))
+    return intervals
+
+
+def intersect(intervals, other):
+    """
+    Intersection of two merged interval lists.
+    """
+    result = []
+    i = j = 0
+    while i < len(intervals) and j < len(other):
+        start = max(intervals[i][0], other[j][0])
+        end = min(intervals[i][1], other[j][1])
+        if start <= end:
+            result.append((start, end))
+        if intervals[i][1] < other[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtract(intervals, other):
+    """
+    Faces of `intervals` which are not in `other`, both merged.
+    """
+    result = []
+    j = 0
+    for start, end in intervals:
+        while j < len(other) and other[j][1] < start:
+            j += 1
+        k = j
+        while k < len(other) and other[k][0] <= end:
+            if other[k][0] > start:
+                result.append((start, other[k][0] - 1))
+            start = max(start, other[k][1] + 1)
+            k += 1
+        if start <= end:
+            result.append((start, end))
+    return result
+
+
+def count(intervals):
+    return sum(end - start + 1 for start, end in intervals)
+
+
+def resolve_overlaps(claims):
+    """
+    Make the faces of each shading engine exclusive.
+    Later claims win, the same as applying them in order with
+    `cmds.sets(forceElement=...)`.
+
+    :param claims: [(shading engine, [(start, end), ...]), ...]
+    :return: ({shading engine: merged intervals},
+              [(overridden shading engine, winning shading engine,
+                overlapping intervals), ...])
+    """
+    resolved = {}
+    overlaps = []
+    claimed = []
+    owners = []
+    for shader, intervals in reversed(claims):
+        intervals = merge(intervals)
+        for owner, owned in owners:
+            if owner == shader:
+                continue
+            common = intersect(intervals, owned)
+            if common:
+                overlaps.append((shader, owner, common))
+        own = subtract(intervals, claimed)
+        if own:
+            resolved[shader] = merge(resolved.get(shader, []) + own)
+            owners.append((shader, own))
+        claimed = merge(claimed + intervals)
+    return resolved, overlaps
+
+
+def compact_assignments(assignments):
+    """
+    Merge the face assignments of one shape per shading engine and remove
+    faces claimed by two shading engines:
+        [('.f[0:3]', 'lambert2SG'), ('.f[4]', 'lambert2SG'),
+         ('.f[5]', 'blinn1SG')]
+        -->
+        {'.f[0:4]': 'lambert2SG', '.f[5]': 'blinn1SG'}
+
+    Components which are not plain face ranges are kept as they are.
+    :return: (compacted map, overlaps as returned by resolve_overlaps)
+    """
+    face_assignments = []
+    for part, shader in assignments:
+        interval = parse(part) if part else None
+        face_assignments.append((part if interval is None else [interval],
+                                 shader))
+    return compact_face_assignments(face_assignments)
+
+
+def compact_face_assignments(assignments):
+    """
+    compact_assignments() for faces given as interval lists:
+        [([(0, 3), (4, 4)], 'lambert2SG'), ([(5, 5)], 'blinn1SG')]
+        -->
+        {'.f[0:4]': 'lambert2SG', '.f[5]': 'blinn1SG'}
+
+    A component string instead of the intervals is kept as it is.
+    """
+    claims = []
+    by_shader = {}
+    compacted = {}
+    for faces, shader in assignments:
+        if not isinstance(faces, list):
+            compacted[faces] = shader
+            continue
+        if shader not in by_shader:
+            by_shader[shader] = []
+            claims.append((shader, by_shader[shader]))
+        by_shader[shader].extend(faces)
+
+    resolved, overlaps = resolve_overlaps(claims)
+    for shader, intervals in resolved.items():
+        for component in format_components(intervals):
+            compacted[component] = shader
+    return compacted, overlaps
+
+
+def warn_overlaps(shape, overlaps):
+    for shader, owner, intervals in overlaps:
+        Log.warning('Faces {} of "{}" are assigned to both "{}" and "{}", '
+                    'keeping "{}".'.format(' '.join(format_components(
+                        intervals)), shape, shader, owner, owner))
+
+
+def compact_shader_map(shader_map, shape=''):
+    """
+    compact_assignments() for an `assigned_shader` map, the keys are applied
+    in sorted order. Overlaps are reported as warnings.
+    """
+    compacted, overlaps = compact_assignments(sorted(shader_map.items()))
+    warn_overlaps(shape, overlaps)
+    return compacted
@@ -0,0 +1,277 @@
+"""
+Content fingerprints of what an export writes, used to skip writing files
+which would not change.
+
+    shading_network(): the shading networks written by
+                       Shader_Exporter.export, node types, connections,
+                       numeric and file name attribute values.
+    geometry(): exported roots, frame range and attributes,
+                "assigned_shader" maps, mesh topology, bounding boxes,
+                sampled or all points and uvs, transforms and keyframes.
+    file_digest(): content of a file on disk.
+"""
+import hashlib
+import json
+import os
+
+from log import Log
+from exporter import Geo_Exporter, Shader_Exporter
+
+_MANIFEST_VERSION = 1
+
+_BLOCK_SIZE = 1 << 20
+
+# points and uvs of a mesh hashed by geometry() unless `exact`
+_SAMPLE_SIZE = 64
+
+# {file path: (size, modification time, digest)}
+_file_digests = {}
+
+
+def _update(digest, value):
+    digest.update(json.dumps(value, sort_keys=True).encode('utf-8'))
+
+
+def _get_cmds(cmds_module):
+    if cmds_module is None:
+        from maya import cmds as cmds_module
+    return cmds_module
+
+
+def _node_values(node, cmds):
+    attrs = set(cmds.listAttr(node, settable=True, scalar=True) or [])
+    attrs.update(cmds.listAttr(node, usedAsFilename=True) or [])
+    values = []
+    for attr in sorted(attrs):
+        try:
+            values.append((attr, cmds.getAttr('{}.{}'.format(node, attr))))
+        except (RuntimeError, ValueError):
+            # attributes of multi instances or children of arrays can not
+            # always be read by name
+            continue
+    return values
+
+
+def _source_connections(node, network, cmds, long_names):
+    """
+    :param long_names: {name: long name} of the network nodes, names of
+                       the connection plugs are added to it
+    :return: [(destination attribute, source node, source attribute), ...]
+             of the connections from network nodes to `node`
+    """
+    plugs = cmds.listConnections(node, source=True, destination=False,
+                                 connections=True, plugs=True) or []
+    connections = []
+    for destination, source in zip(plugs[0::2], plugs[1::2]):
+        source_node, source_attr = source.split('.', 1)
+        if source_node not in long_names:
+            long_name = (cmds.ls(source_node, long=True) or [''])[0]
+            long_names[source_node] = long_name
+        source_node = long_names[source_node]
+        if source_node in network:
+            connections.append((destination.split('.', 1)[1], source_node,
+                                source_attr))
+    return sorted(connections)
+
+
+def _upstream_order(shading_engines, connections):
+    """
+    Order of the nodes found walking upstream from the shading engines,
+    the sources of a node ordered by destination attribute.
+    """
+    order = []
+    seen = set()
+    level = shading_engines
+    while level:
+        upstream = []
+        for node in level:
+            if node in seen:
+                continue
+            seen.add(node)
+            order.append(node)
+            upstream.extend(source for _, source, _ in connections[node])
+        level = upstream
+    return order
+
+
+def shading_network(shading_engines, cmds_module=None, names=True):
+    """
+    :param names: hash the node names, without them the digest of a
+                  network only depends on its node types, attribute values
+                  and connections and on the shading engine names
+    :return: sha1 hex digest of the shading networks, the nodes written by
+             Shader_Exporter.export
+    """
+    cmds = _get_cmds(cmds_module)
+    network = Shader_Exporter.find_shading_network(shading_engines)[0]
+    long_names = dict((node, node) for node in network)
+    long_names.update((node.rsplit('|', 1)[-1], node) for node in network)
+    connections = dict(
+        (node, _source_connections(node, network, cmds, long_names))
+        for node in network)
+
+    shading_engines = sorted(cmds.ls(shading_engines, long=True) or [])
+    if names:
+        order = sorted(network)
+        labels = dict((node, node) for node in network)
+    else:
+        order = _upstream_order(shading_engines, connections)
+        labels = dict((node, index) for index, node in enumerate(order))
+        labels.update((node, node) for node in shading_engines)
+
+    digest = hashlib.sha1()
+    for node in order:
+        _update(digest, (labels[node], network[node]))
+        _update(digest, [(attr, labels[source], source_attr)
+                         for attr, source, source_attr in connections[node]])
+        _update(digest, _node_values(node, cmds))
+    return digest.hexdigest()
+
+
+def _samples(shape, component, count):
+    """
+    Up to _SAMPLE_SIZE components spread over the `count` ones of the
+    shape, e.g. ['|cube|cubeShape.vtx[0]', '|cube|cubeShape.vtx[3]', ...]
+    """
+    step = max(1, count // _SAMPLE_SIZE)
+    return ['{}.{}[{}]'.format(shape, component, index)
+            for index in range(0, count, step)][:_SAMPLE_SIZE]
+
+
+def _mesh_values(geo_shape, counts, exact, cmds):
+    """
+    :param counts: polyEvaluate counts of the mesh
+    """
+    values = [cmds.polyEvaluate(geo_shape, boundingBox=True),
+              cmds.polyEvaluate(geo_shape, boundingBox2d=True)]
+    if exact:
+        points = '{}.vtx[*]'.format(geo_shape)
+        uvs = '{}.map[*]'.format(geo_shape)
+    else:
+        points = _samples(geo_shape, 'vtx', counts['vertex'])
+        uvs = _samples(geo_shape, 'map', counts['uvcoord'])
+    if points:
+        values.append(cmds.xform(points, query=True, objectSpace=True,
+                                 translation=True))
+    if uvs:
+        values.append(cmds.polyEditUV(uvs, query=True))
+    return values
+
+
+def geometry(geo_shapes, geos_shaders_map, roots=None, frame_range=None,
+             animation_curves=None, attributes=None, upstream_nodes=None,
+             exact=False, cmds_module=None):
+    """
+    The points and uvs of the meshes are read as Python floats, as costly
+    as writing them to the abc file, so only their bounding boxes and a
+    sample of them are hashed unless `exact`: an edit which moves none of
+    the sampled points and keeps the bounding box is not seen.
+
+    :param animation_curves: curves whose keys are hashed, all the curves of
+                             the scene if None
+    :param upstream_nodes: nodes driving the shapes, see
+                           Geo_Exporter.find_upstream_nodes, found from
+                           `roots` or the shapes if None
+    :param exact: hash every point and uv
+    :return: sha1 hex digest of the geometry or None if it can not be
+             fingerprinted (shapes which are not meshes, driven by
+             expressions or the time)
+    """
+    cmds = _get_cmds(cmds_module)
+    if upstream_nodes is None:
+        upstream_nodes = Geo_Exporter.find_upstream_nodes(
+            roots or geo_shapes)
+    time_nodes = Geo_Exporter.find_time_nodes(upstream_nodes)
+    if time_nodes:
+        Log.info('Can not fingerprint the geometry, it is driven by '
+                 '"{}".'.format('", "'.join(sorted(time_nodes))))
+        return None
+
+    digest = hashlib.sha1()
+    _update(digest, [sorted(roots or []), frame_range, attributes or []])
+
+    for geo_shape in sorted(geo_shapes):
+        if cmds.nodeType(geo_shape) != 'mesh':
+            Log.info('Can not fingerprint "{}", it is not a mesh.'.format(
+                geo_shape))
+            return None
+        transform = geo_shape.rsplit('|', 1)[0]
+        _update(digest, [geo_shape, geos_shaders_map.get(geo_shape)])
+        counts = cmds.polyEvaluate(geo_shape, vertex=True, face=True,
+                                   edge=True, uvcoord=True)
+        _update(digest, counts)
+        _update(digest, cmds.xform(transform, query=True, worldSpace=True,
+                                   matrix=True))
+        _update(digest, _mesh_values(geo_shape, counts, exact, cmds))
+
+    if animation_curves is None:
+        animation_curves = cmds.ls(type='animCurve')
+    if animation_curves:
+        _update(digest, cmds.keyframe(animation_curves, query=True,
+                                      timeChange=True, valueChange=True))
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """
+    :return: sha1 hex digest of the file content, cached until the file
+             size or modification time changes
+    """
+    stat = os.stat(path)
+    cached = _file_digests.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime):
+        return cached[2]
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+            digest.update(block)
+    _file_digests[path] = (stat.st_size, stat.st_mtime, digest.hexdigest())
+    return digest.hexdigest()
+
+
+class ExportManifest(object):
+    """
+    Fingerprints of the files written by the last export, stored next to
+    them in "<base>.manifest.json":
+        {"version": 1,
+         "fingerprints": {"geometry": "3f2a...", "shaders": "9b1c..."}}
+    """
+
+    def __init__(self, path, fingerprints=None):
+        self.path = path
+        self.fingerprints = fingerprints or {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.isfile(path):
+            return cls(path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            Log.warning('Ignoring invalid manifest "{}".'.format(path))
+            return cls(path)
+        if data.get('version') != _MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, fingerprints=data.get('fingerprints'))
+
+    def is_current(self, key, fingerprint, file_path):
+        """
+        True if `file_path` exists and was written from the same content.
+        """
+        return bool(fingerprint) and \
+            self.fingerprints.get(key) == fingerprint and \
+            os.path.isfile(file_path)
+
+    def update(self, key, fingerprint):
+        if fingerprint:
+            self.fingerprints[key] = fingerprint
+        else:
+            self.fingerprints.pop(key, None)
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'version': _MANIFEST_VERSION,
+                       'fingerprints': self.fingerprints},
+                      f, indent=2, sort_keys=True)
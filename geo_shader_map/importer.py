@@ -1,5 +1,17 @@
-from maya import cmds
-from log import Log
+import os
+
+from log import Log, LazyModule
+import fingerprint
+
+cmds = LazyModule('maya.cmds')
+
+
+def _normalize_path(path):
+    return os.path.normcase(os.path.realpath(path))
+
+
+def _is_scene_file(path):
+    return path.lower().endswith(('.ma', '.mb'))
 
 
 class Importer(object):
@@ -11,15 +23,117 @@ class Geo_Importer(Importer):
     def alembic_import(cls):
         return cmds.CreateReference()
 
+    @classmethod
+    def reference(cls, path, namespace=''):
+        """
+        :return: reference file path, e.g. ".../cube.abc{1}"
+        """
+        return cmds.file(path, reference=True, type='Alembic',
+                         namespace=namespace, ignoreVersion=True,
+                         groupLocator=True, mergeNamespacesOnClash=False,
+                         options='v=0;', pr=True)
+
+
+class ReferenceIndex(object):
+    """
+    The file references of the scene by file path and, for Maya scene
+    files, by file size. Built once per import pass, the references
+    created during the pass are added to it:
+
+        references = ReferenceIndex()
+        Shader_Importer.import_shader(path, ..., references=references)
+    """
+
+    def __init__(self):
+        # {normalized file path: reference file path}
+        self._by_path = {}
+        # {file size: [(reference file path, file path), ...]}
+        self._by_size = {}
+        for ref_path in cmds.file(query=True, reference=True) or []:
+            self.add(ref_path)
+
+    def add(self, ref_path):
+        """
+        :param ref_path: reference file path, e.g. ".../chair.ma{2}"
+        """
+        # strip the copy number, ".../chair.ma{2}" --> ".../chair.ma"
+        file_path = ref_path.split('{')[0]
+        self._by_path.setdefault(_normalize_path(file_path), ref_path)
+        if not _is_scene_file(file_path):
+            return
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return
+        self._by_size.setdefault(size, []).append((ref_path, file_path))
+
+    def find(self, path):
+        """
+        Find a reference of `path`, by file path first and then by file
+        content. Only Maya scene files are compared by content, abc files
+        are too large to be hashed.
+        :return: reference file path, '' if none
+        """
+        ref_path = self._by_path.get(_normalize_path(path))
+        if ref_path:
+            return ref_path
+        if not _is_scene_file(path):
+            return ''
+        digest = None
+        # only hash files which could be the same
+        for ref_path, file_path in self._by_size.get(
+                os.path.getsize(path), []):
+            digest = digest or fingerprint.file_digest(path)
+            if fingerprint.file_digest(file_path) == digest:
+                return ref_path
+        return ''
+
 
 class Shader_Importer(Importer):
+    @classmethod
+    def find_reference(cls, path, references=None):
+        """
+        Find a reference of `path` in the scene, see ReferenceIndex.find.
+        :param references: ReferenceIndex of the import pass, built from
+                           the scene if None
+        :return: reference file path, e.g. ".../chair.ma{2}", '' if none
+        """
+        if references is None:
+            references = ReferenceIndex()
+        return references.find(path)
+
     @classmethod
     def import_shader(cls, path='', scene_type='', namespace='',
-                      import_reference=False):
+                      import_reference=False, reuse=True, deferred=False,
+                      references=None):
+        """
+        :param reuse: return the namespace of the reference of the same file,
+                      or of a file with the same content, if the scene has
+                      one, it is loaded if needed
+        :param deferred: create the reference unloaded, and do not load a
+                         reused one, see Session.materialize
+        :param references: see find_reference, the new reference is added
+                           to it
+        :return: shader namespace
+        """
+        ref_path = cls.find_reference(path, references=references) \
+            if reuse else ''
+        if ref_path:
+            if not deferred and \
+                    not cmds.referenceQuery(ref_path, isLoaded=True):
+                cmds.file(loadReference=cmds.referenceQuery(
+                    ref_path, referenceNode=True))
+            namespace = cmds.referenceQuery(ref_path, ns=True)
+            Log.info('Reusing shader reference "{}", namespace: {}'.format(
+                ref_path, namespace))
+            return namespace
+
         file_path = cmds.file(path, reference=True, type=scene_type,
                               namespace=namespace, ignoreVersion=True,
                               mergeNamespacesOnClash=False, options='v=0;',
-                              pr=True)
+                              pr=True, deferReference=deferred)
+        if references is not None:
+            references.add(file_path)
         namespace = cmds.referenceQuery(file_path, ns=True)
         Log.info('Shader namespace: {}'.format(namespace))
 
@@ -1,16 +1,266 @@
-from maya.OpenMaya import MGlobal
+import importlib
+import logging
+import time
+
+# maya.OpenMaya.MGlobal, imported on the first displayed message so the
+# modules using Log can be imported without Maya, False outside Maya
+_mglobal = None
+
+_logger = logging.getLogger('geo_shader_map')
+
+
+def _display(method, level, message):
+    """
+    Display `message` with the MGlobal `method` in Maya, log it with
+    `level` to the "geo_shader_map" logger elsewhere.
+    """
+    global _mglobal
+    if _mglobal is None:
+        try:
+            from maya.OpenMaya import MGlobal as _mglobal
+        except ImportError:
+            _mglobal = False
+    if _mglobal:
+        return getattr(_mglobal, method)(message)
+    _logger.log(level, message)
 
 
 class Log(object):
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+
+    # messages below this level are not formatted nor displayed
+    level = INFO
+
     @classmethod
-    def info(cls, msg):
+    def is_enabled(cls, level):
+        return level >= cls.level
+
+    @classmethod
+    def debug(cls, msg, *args):
+        """
+        Only formatted when debug messages are enabled, expensive arguments
+        should be wrapped in Lazy:
+            Log.debug('Shading map:\\n{}', Lazy(pformat, shading_map))
+        """
+        if cls.is_enabled(cls.DEBUG):
+            return _display('displayInfo', logging.DEBUG, _format(msg, args))
+
+    @classmethod
+    def info(cls, msg, *args):
         """log to Maya script editor"""
-        return MGlobal.displayInfo(msg)
+        if cls.is_enabled(cls.INFO):
+            return _display('displayInfo', logging.INFO, _format(msg, args))
 
     @classmethod
-    def warning(cls, msg):
-        return MGlobal.displayWarning(msg)
+    def warning(cls, msg, *args):
+        if cls.is_enabled(cls.WARNING):
+            return _display('displayWarning', logging.WARNING,
+                            _format(msg, args))
 
     @classmethod
-    def error(cls, msg):
-        return MGlobal.displayError(msg)
+    def error(cls, msg, *args):
+        return _display('displayError', logging.ERROR, _format(msg, args))
+
+
+def _format(msg, args):
+    if not args:
+        return msg
+    return msg.format(*args)
+
+
+class Lazy(object):
+    """
+    Defer an expensive message argument until the message is formatted.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self):
+        return str(self._func(*self._args, **self._kwargs))
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+
+class Span(object):
+    """
+    Timing of one stage of a Profiler.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.calls = {}
+        self.objects = 0
+
+    def count_call(self, command):
+        self.calls[command] = self.calls.get(command, 0) + 1
+
+    def report(self):
+        return {'name': self.name,
+                'wall_time': round(self.wall_time, 6),
+                'calls': dict(self.calls),
+                'call_count': sum(self.calls.values()),
+                'objects': self.objects}
+
+
+class Profiler(object):
+    """
+    Per stage wall time, cmds call counts and object counts.
+
+    Usage:
+        profiler = Profiler('export_scene', enabled=True)
+        with profiler:
+            with profiler.span('shading_map') as span:
+                shading_map = _get_shading_map(...)
+                span.objects = len(shading_map)
+        profiler.log_report()
+        profiler.write('/path/cube.profile.json')
+
+    Spans are always timed, cmds calls are only counted (see CountedCommands)
+    while an enabled profiler is active.
+    """
+    active = None
+
+    def __init__(self, name, enabled=False, cprofile=False):
+        self.name = name
+        self.enabled = enabled or cprofile
+        self.spans = []
+        self.wall_time = 0.0
+        self._stack = []
+        self._start = None
+        self._previous = None
+        self._cprofile = None
+        if cprofile:
+            # only imported to profile, like pstats and json for the reports
+            import cProfile
+            self._cprofile = cProfile.Profile()
+
+    def __enter__(self):
+        self._start = time.time()
+        if self.enabled:
+            self._previous = Profiler.active
+            Profiler.active = self
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self.enabled:
+            Profiler.active = self._previous
+        self.wall_time = time.time() - self._start
+        return False
+
+    def span(self, name):
+        return _SpanContext(self, Span(name))
+
+    def count_call(self, command):
+        if self._stack:
+            self._stack[-1].count_call(command)
+
+    def report(self):
+        return {'name': self.name,
+                'wall_time': round(self.wall_time, 6),
+                'stages': [span.report() for span in self.spans]}
+
+    def log_report(self):
+        Log.info('{} took {:.3f}s', self.name, self.wall_time)
+        for span in self.spans:
+            Log.info('  {:<20} {:>9.3f}s {:>7} cmds calls {:>8} objects',
+                     span.name, span.wall_time, sum(span.calls.values()),
+                     span.objects)
+
+    def log_stats(self, limit=20):
+        """
+        Log the slowest calls recorded by cProfile.
+        """
+        if self._cprofile is None:
+            return
+        import pstats
+        try:
+            from StringIO import StringIO
+        except ImportError:
+            from io import StringIO
+        stream = StringIO()
+        stats = pstats.Stats(self._cprofile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(limit)
+        Log.info(stream.getvalue())
+
+    def write(self, path):
+        """
+        Write the report as json, cProfile stats go to "<path>.prof".
+        """
+        import json
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+        Log.info('Wrote profile report "{}"', path)
+        if self._cprofile is not None:
+            stats_path = '{}.prof'.format(path.rsplit('.', 1)[0])
+            self._cprofile.dump_stats(stats_path)
+            Log.info('Wrote cProfile stats "{}"', stats_path)
+
+
+class _SpanContext(object):
+    def __init__(self, profiler, span):
+        self._profiler = profiler
+        self._span = span
+        self._start = None
+
+    def __enter__(self):
+        self._profiler.spans.append(self._span)
+        self._profiler._stack.append(self._span)
+        self._start = time.time()
+        return self._span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._span.wall_time = time.time() - self._start
+        self._profiler._stack.pop()
+        return False
+
+
+class LazyModule(object):
+    """
+    Module imported on the first attribute access, so Maya is only loaded
+    by the code which calls it:
+        cmds = LazyModule('maya.cmds')
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, name)
+
+
+class CountedCommands(object):
+    """
+    Wrap maya.cmds so that every command run while an enabled Profiler is
+    active is counted in its current span:
+        cmds = CountedCommands(maya.cmds)
+    """
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        profiler = Profiler.active
+        if profiler is None or not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            profiler.count_call(name)
+            return attr(*args, **kwargs)
+
+        return counted
@@ -0,0 +1,181 @@
+"""
+Backends answering the scene queries of SceneSnapshot.
+
+    CmdsQuery: maya.cmds, members are parsed from their names, e.g.
+               'pCube1.f[0:3]'.
+    OpenMayaQuery: Maya Python API 2.0, members are read from MFnSet as
+                   dag paths and face index arrays, no name is formatted
+                   or parsed for face components.
+
+Both return the members of a set as (node, faces) pairs, faces being None
+for a whole object member, merged (start, end) intervals for faces and the
+component name, e.g. '.vtx[0:7]', for other components:
+
+    query = scene_query.get('openmaya')
+    query.set_members('lambert2SG')
+    --> [('|pCube1|pCubeShape1', [(0, 3), (5, 5)]), ('|pCube2', None)]
+"""
+import face_range
+
+CMDS = 'cmds'
+OPENMAYA = 'openmaya'
+
+
+class CmdsQuery(object):
+    """
+    `cmds_module` only has to provide `sets` and `ls`, so a fake module can
+    be used outside Maya.
+    """
+
+    def __init__(self, cmds_module=None):
+        if cmds_module is None:
+            from maya import cmds as cmds_module
+        self._cmds = cmds_module
+
+    def set_members(self, shading_engine):
+        members = []
+        for member in self._cmds.sets(shading_engine, q=True) or []:
+            node, part = face_range.split_component(member)
+            if not part:
+                node, dot, part = member.partition('.')
+                members.append((node, dot + part if part else None))
+                continue
+            interval = face_range.parse(part)
+            members.append((node, part if interval is None else [interval]))
+        return members
+
+    def node_types(self, nodes):
+        """
+        :return: [(long name, node type), ...] in the order of `nodes`
+        """
+        result = self._cmds.ls(nodes, long=True, showType=True) or []
+        pairs = list(zip(result[0::2], result[1::2]))
+        if len(pairs) != len(nodes):
+            # The same node was given under two different names, the result
+            # can not be matched by position any more.
+            pairs = [tuple(self._cmds.ls(node, long=True, showType=True)[:2])
+                     for node in nodes]
+        return pairs
+
+    def leaf_shapes(self, roots, shape_types):
+        """
+        :return: [(long name, node type), ...] of the leaf shapes of
+                 `shape_types` below `roots`
+        """
+        leaves = self._cmds.ls(roots, dag=True, leaf=True, long=True,
+                               type=shape_types) or []
+        if not leaves:
+            return []
+        result = self._cmds.ls(leaves, long=True, showType=True) or []
+        return list(zip(result[0::2], result[1::2]))
+
+    def long_name(self, node):
+        return self._cmds.ls(node, long=True)[0]
+
+
+class OpenMayaQuery(object):
+    """
+    `open_maya` is maya.api.OpenMaya or a module providing the same
+    classes.
+    """
+
+    def __init__(self, open_maya=None):
+        if open_maya is None:
+            import maya.api.OpenMaya as open_maya
+        self._om = open_maya
+
+    def _selection(self, names):
+        selection = self._om.MSelectionList()
+        for name in names:
+            selection.add(name)
+        return selection
+
+    def _name_and_type(self, selection, index):
+        node = self._om.MFnDependencyNode(selection.getDependNode(index))
+        try:
+            name = selection.getDagPath(index).fullPathName()
+        except (RuntimeError, TypeError):
+            # not a dag node
+            name = node.name()
+        return name, node.typeName
+
+    def set_members(self, shading_engine):
+        om = self._om
+        shading_set = om.MFnSet(self._selection([shading_engine])
+                                .getDependNode(0))
+        selection = shading_set.getMembers(False)
+        members = []
+        for i in range(selection.length()):
+            try:
+                dag_path, component = selection.getComponent(i)
+            except (RuntimeError, TypeError):
+                # not a dag node
+                members.append((self._name_and_type(selection, i)[0], None))
+                continue
+            name = dag_path.fullPathName()
+            if component.isNull():
+                members.append((name, None))
+            elif component.hasFn(om.MFn.kMeshPolygonComponent):
+                indices = om.MFnSingleIndexedComponent(
+                    component).getElements()
+                members.append((name, face_range.from_indices(indices)))
+            else:
+                for member in selection.getSelectionStrings(i):
+                    members.append((name, '.' + member.partition('.')[2]))
+        return members
+
+    def node_types(self, nodes):
+        """
+        See CmdsQuery.node_types.
+        """
+        selection = self._selection(nodes)
+        if selection.length() != len(nodes):
+            # names of the same node are merged in a selection list
+            return [self._name_and_type(self._selection([node]), 0)
+                    for node in nodes]
+        return [self._name_and_type(selection, i)
+                for i in range(selection.length())]
+
+    def leaf_shapes(self, roots, shape_types):
+        """
+        See CmdsQuery.leaf_shapes.
+        """
+        om = self._om
+        shape_types = set(shape_types)
+        selection = self._selection(roots)
+        leaves = []
+        seen = set()
+        iterator = om.MItDag()
+        for i in range(selection.length()):
+            iterator.reset(selection.getDagPath(i), om.MItDag.kDepthFirst,
+                           om.MFn.kInvalid)
+            while not iterator.isDone():
+                dag_path = iterator.getPath()
+                name = dag_path.fullPathName()
+                if not dag_path.childCount() and name not in seen:
+                    node_type = om.MFnDependencyNode(
+                        iterator.currentItem()).typeName
+                    if node_type in shape_types:
+                        seen.add(name)
+                        leaves.append((name, node_type))
+                iterator.next()
+        return leaves
+
+    def long_name(self, node):
+        return self._name_and_type(self._selection([node]), 0)[0]
+
+
+_BACKENDS = {CMDS: CmdsQuery, OPENMAYA: OpenMayaQuery}
+
+
+def get(name=CMDS, cmds_module=None):
+    """
+    :param name: CMDS or OPENMAYA
+    :param cmds_module: maya.cmds stand-in for the CMDS backend
+    """
+    if name not in _BACKENDS:
+        raise ValueError('Unknown scene query backend "{}", use one of '
+                         '{}.'.format(name, ', '.join(sorted(_BACKENDS))))
+    if name == CMDS:
+        return CmdsQuery(cmds_module=cmds_module)
+    return _BACKENDS[name]()
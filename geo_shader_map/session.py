@@ -1,27 +1,52 @@
+import atexit
 import os
+import shutil
 import tempfile
 import sys
 from pprint import pformat
-import re
 import json
+from contextlib import contextmanager
+
+from log import Log, Lazy, Profiler, CountedCommands, LazyModule
+from importer import Geo_Importer, Shader_Importer, ReferenceIndex
+from exporter import Geo_Exporter, Shader_Exporter, SCENE_RANGE
+from snapshot import SceneSnapshot
+import face_range
+import fingerprint
+from fingerprint import ExportManifest
+import scene_query
+import asset_index
+import shader_library
+import shader_map_file
+from shading_model import ShadingModel, encode_shader_map
+import trace_log
+
+# count cmds calls per stage when profiling, maya.cmds is imported on the
+# first call
+cmds = CountedCommands(LazyModule('maya.cmds'))
 
-from maya import cmds
+# store exported geometry types
+_GEO_TYPES = ('mesh', 'camera', 'nurbsSurface', 'nurbsCurve')
 
-from log import Log
-import importer
+_SHADER_ATTR = 'assigned_shader'
 
-reload(importer)
-import exporter
+# string attribute of the network nodes keeping the shader assignments of
+# the abc references imported with lazy shaders, see Session.materialize
+_INTENT_ATTR = 'lilisi_shader_intent'
 
-reload(exporter)
+# pre render MEL of the render globals materializing the lazy shaders, the
+# module is imported under the name it was installed with
+_RENDER_HOOK = 'python("import {0}; {0}.Session.materialize()")'.format(
+    __name__)
 
-from importer import Geo_Importer, Shader_Importer
-from exporter import Geo_Exporter, Shader_Exporter
+# bytes read and written at once by the publish copies
+_COPY_BLOCK_SIZE = 16 << 20
 
-# store exported geometry types
-_GEO_TYPES = ('mesh', 'camera', 'nurbsSurface', 'nurbsCurve')
+# plugins known to be loaded, see _load_plugin
+_loaded_plugins = set()
 
-_SHADER_ATTR = 'assigned_shader'
+# number of open _scene_edits contexts
+_scene_edits_depth = 0
 
 
 def _get_scene_type(scene_ext):
@@ -36,14 +61,32 @@ def _get_scene_type(scene_ext):
 
 
 def _set_shader_map_path(base_path):
-    return '{}.json'.format(base_path)
+    return '{}.shadermap'.format(base_path)
 
 
 def _get_shader_map_path(base_path):
-    file_path = '{}.json'.format(base_path)
+    file_path = _set_shader_map_path(base_path)
+    if os.path.isfile(file_path):
+        return file_path
+    return ''
+
+
+def _set_profile_path(base_path):
+    return '{}.profile.json'.format(base_path)
+
+
+def _set_manifest_path(base_path):
+    return '{}.manifest.json'.format(base_path)
+
+
+def _set_shader_library_map_path(base_path):
+    return '{}.shaders.json'.format(base_path)
+
+
+def _get_shader_library_map_path(base_path):
+    file_path = _set_shader_library_map_path(base_path)
     if os.path.isfile(file_path):
         return file_path
-    Log.warning('Failed to find shader map path for "{}".'.format(base_path))
     return ''
 
 
@@ -66,98 +109,106 @@ def _get_shader_path(base_path):
         paths = '\n'.join(file_paths)
         msg = "There are two files match with shader file naming, please " \
               "remove the wrong one and then export again:\n{}".format(paths)
-        cmds.confirmDialog(title='Remove one shader file',
-                           message=msg,
-                           button=['Okay'], defaultButton='Okay')
         raise SessionException(msg)
 
     else:
-        Log.warning('Failed to find shader path for "{}".'.format(base_path))
         return ''
 
 
-def _get_assigned_geometries(shading_engine):
+def _get_scene_query():
+    return scene_query.get(Session.query_backend, cmds_module=cmds)
+
+
+def _build_snapshot(shading_engines):
+    return SceneSnapshot.build(shading_engines, _GEO_TYPES,
+                               query=_get_scene_query())
+
+
+def _get_assigned_geometries(shading_engine, snapshot=None):
     """
      ['|pCube1.f[0]'] --> ['|pCube1|pCubeShape1']
     """
+    if snapshot is None:
+        snapshot = _build_snapshot([shading_engine])
     geometry_members = set()
-    members = cmds.sets(shading_engine, q=True)
+    members = snapshot.members.get(shading_engine)
     if not members:
         return geometry_members
 
-    for member in members:
+    for member, faces in members:
         # Situation for '|pCube1.f[0]' --> '|pCube1|pCubeShape1'
-        if '.f[' in member:
-            member = member.split('.')[0]
-            member = \
-                cmds.ls(member, type=_GEO_TYPES, dag=True, lf=True, l=True)[0]
+        if faces is not None:
+            member = snapshot.leaf_shapes(member)[0]
         # Add long name instead of short name
-        geometry_members.add(cmds.ls(member, l=True)[0])
-        Log.info('Geometries of shading engine "{}": {}'.format(shading_engine,
-                                                                ' '.join(
-                                                                    geometry_members)))
+        geometry_members.add(snapshot.long_name(member))
+    Log.debug('Geometries of shading engine "{}": {}', shading_engine,
+              Lazy(' '.join, geometry_members))
     return geometry_members
 
 
-def _get_shading_map(shading_engines, selected_geos):
+def _get_shading_map(shading_engines, selected_geos, snapshot=None):
     """
     :param shading_engines:
-    :param selected_geos:
-    :return:
-     {'lambert3SG': ['|pCube3.f[4]', '|pCube2|pCubeShape2'],
-     'lambert2SG': ['|pCube1|pCubeShape1']}
-    """
-    selected_transforms = cmds.listRelatives(selected_geos, parent=True,
-                                             fullPath=True)
-    # selected_transforms = cmds.ls(selected_transforms, long=True)
-    Log.info('Selected transforms: {}'.format(selected_transforms))
-    shading_map = {}
+    :param selected_geos: long names of the selected geometry shapes
+    :param snapshot: SceneSnapshot of the shading engines, built when None
+    :return: ShadingModel of the members, interned with the selected
+             geometries, e.g. as model.to_shading_map()
+     {'lambert3SG': [('|pCube3|pCubeShape3', [(4, 4)]),
+                     ('|pCube2|pCubeShape2', None)],
+     'lambert2SG': [('|pCube1|pCubeShape1', None)]}
+    """
+    if snapshot is None:
+        snapshot = _build_snapshot(shading_engines)
+    model = ShadingModel()
+    paths = model.paths
+    selected_ids = set(paths.intern(geo) for geo in selected_geos)
+    # selected_geos are long names so their parents are the transforms
+    selected_transforms = set(paths.parent(geo_id) for geo_id in selected_ids)
+    Log.debug('Selected transforms: {}', Lazy(
+        lambda: sorted(paths.path(t) for t in selected_transforms)))
+    # {transform: ids of its selected mesh shapes} for face members and
+    # {member: id, None if no selected shape is below it} for the others
+    face_shapes = {}
+    member_ids = {}
     for shading_engine in shading_engines:
-        members = cmds.sets(shading_engine, q=True)
+        members = snapshot.members.get(shading_engine)
         if not members:
             continue
 
-        sets = []
-        for member in members:
-            if '.f[' in member:
-                # ['|pCube1.f[0]'] --> ['|pCube1|pCubeShape1.f[0]']
-                member_trans, face_sets = member.rsplit('.', 1)
-                Log.info('Member_trans from sg: {}'.format(member_trans))
-                if cmds.ls(member_trans, showType=True)[1] != 'transform':
-                    member_trans = \
-                    cmds.listRelatives(member_trans, p=True, type='transform')[
-                        0]
-                Log.info('Member_trans: {}'.format(member_trans))
-                member_trans_long_name = cmds.ls(member_trans, long=True)[0]
-                if member_trans_long_name in selected_transforms:
-                    member_shapes = \
-                        cmds.ls(member_trans, type='mesh', dag=True,
-                                lf=True, long=True)
-                    Log.info('Member_shapes:{}'.format(member_shapes))
-                    matched = set(member_shapes).intersection(selected_geos)
-                    if matched:
-                        for item in matched:
-                            sets.append('{}.{}'.format(item, face_sets))
+        for member, faces in members:
+            if faces is not None:
+                # ('|pCube1', [(0, 0)]) --> ('|pCube1|pCubeShape1', [(0, 0)])
+                member_trans_long_name = snapshot.transform(member)
+                shape_ids = face_shapes.get(member_trans_long_name)
+                if shape_ids is None:
+                    shape_ids = []
+                    if paths.find(member_trans_long_name) in \
+                            selected_transforms:
+                        shape_ids = [
+                            shape_id for shape_id in (
+                                paths.find(member_shape) for member_shape in
+                                snapshot.leaf_shapes(member_trans_long_name,
+                                                     node_type='mesh'))
+                            if shape_id in selected_ids]
+                    face_shapes[member_trans_long_name] = shape_ids
+                for shape_id in shape_ids:
+                    model.add(shape_id, shading_engine, faces)
 
             else:
-                member = cmds.ls(member, long=True)[0]
-                # Only add if geometry in selected_geos
-                member_shapes = \
-                    cmds.ls(member.split('.')[0], type='mesh', dag=True,
-                            lf=True, long=True)
-                if member_shapes:
-                    Log.info('Member_shapes:{}'.format(member_shapes))
-                    matched = set(member_shapes).intersection(selected_geos)
-                    if matched:
-                        sets.append(member)
-
-        if not sets:
-            continue
-        else:
-            shading_map.update({shading_engine: sets})
-
-    Log.info('Shading map:\n{}'.format(pformat(shading_map)))
-    return shading_map
+                member = snapshot.long_name(member)
+                if member not in member_ids:
+                    # Only add if geometry in selected_geos
+                    member_shapes = snapshot.leaf_shapes(member,
+                                                         node_type='mesh')
+                    member_ids[member] = paths.intern(member) if any(
+                        paths.find(member_shape) in selected_ids
+                        for member_shape in member_shapes) else None
+                if member_ids[member] is not None:
+                    model.add(member_ids[member], shading_engine)
+
+    Log.debug('Shading map:\n{}', Lazy(
+        lambda: pformat(model.to_shading_map())))
+    return model
 
 
 def _get_shading_engines(selected_geos=None):
@@ -177,32 +228,13 @@ def _get_shading_engines(selected_geos=None):
 
 def _get_abc_file_path(cmd_output_file):
     """
-    Find abc file path from Maya command output file.
-    The command output file looks as:
-
-      file -r -type "mayaAscii"  -ignoreVersion -gl -mergeNamespacesOnClash\
-      false -namespace "cube" -options "v=0;" ".../cube.abc";
-      // Result: .../cube.abc{1} //
-
-      AbcExport -j "-frameRange 1 1 -attr asset_name -dataFormat ogawa \
-      -root |camera1 -root |curve1 -root |nurbsSphere1 \
-      -file .../test.abc";
-    """
-    geo_path = ''
-    with open(cmd_output_file, 'r') as f:
-        for line in f:
-            line = line.strip().rstrip('\r\n')
-            Log.info('Line in cmd_output_file: '.format(line))
-            # pattern is different with _get_reference_file_path
-            # one is ' [w/\\].*.abc";' and the other is '[w/\\].*.abc";'
-            matched = re.findall(r' *.*abc";$', line)
-            if matched:
-                geo_path = matched[0].strip().rsplit(' ', 1)[1].replace('";',
-                                                                        '')
-                Log.info('Got geo path: {}'.format(geo_path))
-                break
-
-    if not geo_path:
+    Find abc file path from Maya command output file, see
+    trace_log.find_abc_export_path.
+    """
+    geo_path = trace_log.find_abc_export_path(cmd_output_file)
+    if geo_path:
+        Log.info('Got geo path: {}'.format(geo_path))
+    else:
         Log.warning('Can not find abc file path in trace file "{}"'.format(
             cmd_output_file))
 
@@ -212,38 +244,19 @@ def _get_abc_file_path(cmd_output_file):
 def _get_reference_file_path(cmd_output_file):
     """
     Find reference file path from command output file. It might be "foo.abc{1}".
-    The command output file looks as:
-
-      file -r -type "mayaAscii"  -ignoreVersion -gl -mergeNamespacesOnClash\
-      false -namespace "cube" -options "v=0;" ".../cube.abc";
-      // Result: .../cube.abc{1} //
+    See trace_log.find_reference_path.
 
     :return: e.g. (".../cube.abc", "../cube.abc{1}")
     """
-    geo_path = ''
-    ref_path = ''
-    with open(cmd_output_file, 'r') as f:
-        for line in f:
-            line = line.strip().rstrip('\r\n')
-            Log.info('Line in cmd_output_file: '.format(line))
-            matched = re.findall(r' *.*abc";$', line)
-            if matched:
-                geo_path = matched[0].strip().rsplit(' ', 1)[1].replace('";',
-                                                                        '').replace(
-                    '"', '')
-                Log.info('Got geo path: {}'.format(geo_path))
-                continue
-
-            if geo_path:
-                matched = re.findall(r'// Result: .*[.abc|.abc{d}]', line)
-                if matched:
-                    ref_path = matched[0].replace('// Result: ', '')
-                    Log.info('Got reference file path: {}'.format(ref_path))
-
-    if not geo_path:
+    geo_path, ref_path = trace_log.find_reference_path(cmd_output_file)
+    if geo_path:
+        Log.info('Got geo path: {}'.format(geo_path))
+    else:
         Log.warning('Can not find abc file path in trace file "{}"'.format(
             cmd_output_file))
-    if not ref_path:
+    if ref_path:
+        Log.info('Got reference file path: {}'.format(ref_path))
+    else:
         Log.warning(
             'Can not find reference file path in trace file "{}"'.format(
                 cmd_output_file))
@@ -251,16 +264,101 @@ def _get_reference_file_path(cmd_output_file):
     return geo_path, ref_path
 
 
-def _set_cmd_output_file():
+@contextmanager
+def _cmd_output_file():
     """
-    Save maya command log to a temp file which will be used late to get abc
-    file path.
+    Save maya command log to a temp file while the context is open, it can
+    be used to get the abc file path of dialogs. The file is removed on exit.
     :rtype: str
     :return: log file's path
     """
     cmd_output_file = _get_temp_file(suffix='.log')
-    cmds.cmdFileOutput(open=cmd_output_file)
-    return cmd_output_file
+    descriptor = cmds.cmdFileOutput(open=cmd_output_file)
+    try:
+        yield cmd_output_file
+    finally:
+        cmds.cmdFileOutput(close=descriptor)
+        os.remove(cmd_output_file)
+
+
+@contextmanager
+def _scene_edits(name):
+    """
+    Run the edits of a Session method with the viewport refresh suspended
+    and as a single undo step named `name`. On error the refresh and the
+    selection are restored and the partial edits can be undone at once.
+    A refresh already suspended by the caller stays suspended.
+    Does nothing if Session.suspend_updates is False.
+    """
+    global _scene_edits_depth
+    if not Session.suspend_updates or _scene_edits_depth:
+        yield
+        return
+
+    selection = cmds.ls(sl=True, long=True)
+    _scene_edits_depth += 1
+    cmds.undoInfo(openChunk=True, chunkName=name)
+    suspended = cmds.refresh(query=True, suspend=True)
+    if not suspended:
+        cmds.refresh(suspend=True)
+    try:
+        yield
+    except Exception:
+        if selection:
+            cmds.select(selection, replace=True)
+        else:
+            cmds.select(clear=True)
+        raise
+    finally:
+        if not suspended:
+            cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+        _scene_edits_depth -= 1
+
+
+def _ask_file_path(caption, file_mode):
+    """
+    :param file_mode: 0 to pick a file to write, 1 an existing file
+    :return: the chosen abc file path, '' if the dialog was cancelled
+    """
+    file_paths = cmds.fileDialog2(caption=caption, fileMode=file_mode,
+                                  fileFilter='Alembic (*.abc)',
+                                  dialogStyle=2)
+    if not file_paths:
+        return ''
+    return file_paths[0]
+
+
+def _get_export_roots(nodes):
+    """
+    Transforms to pass as "-root" to AbcExport: shapes are replaced by their
+    parent and nodes below another root are dropped.
+    """
+    roots = set()
+    for node in cmds.ls(nodes, long=True):
+        if cmds.ls(node, shapes=True):
+            node = node.rsplit('|', 1)[0]
+        roots.add(node)
+    return sorted(root for root in roots
+                  if not any(root.startswith(other + '|') for other in roots))
+
+
+def _get_split_geo_paths(geo_path, roots):
+    """
+    One abc file per root next to `geo_path`, e.g. ".../set.abc" and
+    ['|set|chair', '|set|table'] --> ['.../set_chair.abc', '.../set_table.abc']
+    """
+    base_path, ext = os.path.splitext(geo_path)
+    geo_paths = []
+    for root in roots:
+        name = root.rsplit('|', 1)[-1].replace(':', '_')
+        path = '{}_{}{}'.format(base_path, name, ext)
+        index = 1
+        while path in geo_paths:
+            path = '{}_{}{}{}'.format(base_path, name, index, ext)
+            index += 1
+        geo_paths.append(path)
+    return geo_paths
 
 
 def _get_scene_name():
@@ -275,7 +373,14 @@ def _get_scene_name():
 
 
 def _load_plugin(plugin_name):
-    cmds.loadPlugin(plugin_name)
+    """
+    Load the plugin if it is not loaded yet, checked once per session.
+    """
+    if plugin_name in _loaded_plugins:
+        return
+    if not cmds.pluginInfo(plugin_name, query=True, loaded=True):
+        cmds.loadPlugin(plugin_name, quiet=True)
+    _loaded_plugins.add(plugin_name)
 
 
 def _get_operation_system():
@@ -284,10 +389,57 @@ def _get_operation_system():
 
 
 def _get_temp_file(suffix=''):
-    return tempfile.NamedTemporaryFile(suffix=suffix, delete=False).name
+    handle, file_path = tempfile.mkstemp(suffix=suffix)
+    os.close(handle)
+    return file_path
+
+
+def _resolve_mesh(node, snapshot=None):
+    """
+    First mesh shape of a transform or shape, None if it has none.
+    """
+    meshes = []
+    if snapshot is not None:
+        if snapshot.node_type(node) == 'mesh':
+            meshes = [snapshot.long_name(node)]
+        else:
+            meshes = snapshot.leaf_shapes(node, node_type='mesh')
+    if not meshes:
+        meshes = cmds.ls(node, long=True, dag=True, lf=True, type='mesh')
+    return meshes[0] if meshes else None
 
 
-def _get_geos_shaders_map(geo_shapes, shaders_map):
+def _index_shading_map(shading_model, snapshot=None):
+    """
+    Invert the shading model in one pass over its records, by node id:
+        {'lambert2SG': [('|pCube1|pCubeShape1', None),
+                        ('|pCube2|pCubeShape2', [(0, 3)])],
+         'blinn1SG': [('|pCube2|pCubeShape2', [(4, 4)])]}
+        -->
+        {id of '|pCube1|pCubeShape1': [(None, 'lambert2SG')],
+         id of '|pCube2|pCubeShape2': [([(0, 3)], 'lambert2SG'),
+                                       ([(4, 4)], 'blinn1SG')]}
+    """
+    paths = shading_model.paths
+    # {node id: mesh id}, each node is resolved once
+    mesh_cache = {}
+    index = {}
+    for node_id, shader, faces in shading_model.records():
+        if faces is not None:
+            if node_id not in mesh_cache:
+                mesh_name = _resolve_mesh(paths.path(node_id),
+                                          snapshot=snapshot)
+                mesh_cache[node_id] = paths.intern(mesh_name) \
+                    if mesh_name else None
+            mesh_id = mesh_cache[node_id]
+            if mesh_id is not None:
+                index.setdefault(mesh_id, []).append((faces, shader))
+        else:
+            index.setdefault(node_id, []).append((None, shader))
+    return index
+
+
+def _get_geos_shaders_map(geo_shapes, shading_model, snapshot=None):
     """
     Return example:
         {u'|pCube1|pCubeShape1': {'': u'lambert2SG'},
@@ -295,80 +447,721 @@ def _get_geos_shaders_map(geo_shapes, shaders_map):
                               '.f[4]': u'blinn1SG',
                               '.f[5]': u'lambert2SG'},
     :param geo_shapes:
-    :param shaders_map:
+    :param shading_model: ShadingModel, see _get_shading_map
+    :param snapshot: SceneSnapshot used to resolve face members to meshes
     :return: e.g.
     """
+    index = _index_shading_map(shading_model, snapshot=snapshot)
+    paths = shading_model.paths
     geos_shaders_map = {}
     for geo_shape in geo_shapes:
-        geos_shaders_map[geo_shape] = {}
-        for shader, assigned_shapes in shaders_map.iteritems():
-            if geo_shape in assigned_shapes:
-                geos_shaders_map[geo_shape][''] = shader
-                break
-            else:
-                for assigned_shape in assigned_shapes:
-                    if '.f[' in assigned_shape:
-                        tran_name = assigned_shape.split('.')
-                        mesh_name = \
-                            cmds.ls(tran_name[0], long=True, dag=True, lf=True,
-                                    type='mesh')[0]
-                        if geo_shape == mesh_name:
-                            key = '.f[{}'.format(
-                                assigned_shape.rsplit('.f[', 1)[1])
-                            geos_shaders_map[geo_shape][key] = shader
-    Log.info('Geo shader map: {}'.format(pformat(geos_shaders_map)))
+        assignments = index.get(paths.find(geo_shape), [])
+        whole = [shader for faces, shader in assignments if faces is None]
+        if whole:
+            # whole object assignment wins over face assignments
+            geos_shaders_map[geo_shape] = {'': whole[0]}
+            continue
+        # merge adjacent face ranges, e.g. '.f[0:3]', '.f[4]' --> '.f[0:4]'
+        assigned_shaders, overlaps = face_range.compact_face_assignments(
+            assignments)
+        face_range.warn_overlaps(geo_shape, overlaps)
+        geos_shaders_map[geo_shape] = assigned_shaders
+    Log.debug('Geo shader map: {}', Lazy(pformat, geos_shaders_map))
     return geos_shaders_map
 
 
-def _add_shader_attr(geo_shape, geos_shaders_map):
+def _add_shader_attrs(geo_shapes, geos_shaders_map):
     """
-    Add below attrs to geometry shape:
-        {".f[5]": "lambert2SG", ".f[4]": "blinn1SG", ".f[0:3]": "lambert2SG"}
-    :param geo_shape:
-    :param geos_shaders_map:
-    :return:
+    Add below attrs to geometry shapes:
+        {".f[0:3]": "lambert2SG", ".f[4]": "blinn1SG", ".f[5]": "lambert2SG"}
+    The attribute is added at once to the shapes without it and only the
+    values which changed are unlocked, written and locked again.
+    :param geo_shapes: long names of the shapes
+    :param geos_shaders_map: see _get_geos_shaders_map
+    :return: number of written attributes
     """
-    shader_attribute = '{0}.assigned_shader'.format(geo_shape)
-    assigned_shaders = geos_shaders_map.get(geo_shape)
-    assigned_shaders_str = json.dumps(assigned_shaders)
-
-    if _SHADER_ATTR not in cmds.listAttr(geo_shape):
-        cmds.addAttr(geo_shape, shortName=_SHADER_ATTR,
-                     longName=_SHADER_ATTR,
+    plugs = ['{}.{}'.format(geo_shape, _SHADER_ATTR)
+             for geo_shape in geo_shapes]
+    # one query for all shapes instead of one listAttr per shape
+    existing = set(cmds.ls(plugs, long=True) or [])
+    missing = [geo_shape for geo_shape, plug in zip(geo_shapes, plugs)
+               if plug not in existing]
+    if missing:
+        cmds.addAttr(missing, shortName=_SHADER_ATTR, longName=_SHADER_ATTR,
                      dataType='string',
                      storable=True, writable=True, readable=True)
-    else:
-        if cmds.getAttr(shader_attribute, lock=True):
-            cmds.setAttr(shader_attribute, lock=False)
 
-    if cmds.getAttr(shader_attribute) != assigned_shaders_str:
-        cmds.setAttr(shader_attribute, assigned_shaders_str, type='string')
+    written = 0
+    for geo_shape, plug in zip(geo_shapes, plugs):
+        value = encode_shader_map(geos_shaders_map.get(geo_shape))
+        if plug in existing:
+            if cmds.getAttr(plug) == value:
+                continue
+            cmds.setAttr(plug, lock=False)
+        cmds.setAttr(plug, value, type='string')
+        cmds.setAttr(plug, lock=True)
+        written += 1
+    return written
+
+
+def _get_shading_engine_name(shader_namespace, shader):
+    """
+    :param shader_namespace: namespace of the shader reference, or
+                             {shader: namespace} when the shaders come from
+                             several references
+    """
+    if isinstance(shader_namespace, dict):
+        shader_namespace = shader_namespace[shader]
+    return "{0}:{1}".format(shader_namespace, shader)
+
+
+def _write_shader_map_file(geo_path, geo_shapes, roots, geos_shaders_map):
+    """
+    Write the shader maps of the shapes exported to `geo_path`, keyed by
+    their path in the abc file without namespaces.
+    :return: True if the file was written, False if it did not change
+    """
+    shader_maps = {}
+    for geo_shape in geo_shapes:
+        if geo_shape in geos_shaders_map:
+            path = shader_map_file.relative_path(geo_shape, roots or [])
+            shader_maps[shader_map_file.strip_namespaces(path)] = \
+                geos_shaders_map[geo_shape]
+    return shader_map_file.write(
+        _set_shader_map_path(os.path.splitext(geo_path)[0]), shader_maps)
+
 
-    cmds.setAttr(shader_attribute, lock=True)
+def _match_shader_maps(file_shader_maps, geo_shapes, shader_map_path=''):
+    """
+    Match the shapes of a referenced abc file with the content of its
+    shader map file.
+    :return: {'|ns:pCube1|ns:pCubeShape1': {'.f[0:3]': 'lambert2SG'}}
+    """
+    shader_maps = {}
+    for geo_shape in geo_shapes:
+        shader_map = file_shader_maps.get(
+            shader_map_file.strip_namespaces(geo_shape))
+        if shader_map is None:
+            Log.warning('"{}" is not in "{}".'.format(geo_shape,
+                                                      shader_map_path))
+            continue
+        shader_maps[geo_shape] = shader_map
+    return shader_maps
 
 
 def _assign_shader_to_geometry(shader_namespace,
-                               geo_shapes):
+                               geo_shapes, shader_maps=None):
     """
-    :param shader_namespace: namespace of shading group reference
+    :param shader_namespace: see _get_shading_engine_name
+    :param shader_maps: {shape: shader map} read from a shader map file, the
+                        "assigned_shader" attributes are read if None
     :return:
     """
     for geo_shape in geo_shapes:
-        shader_map_str = cmds.getAttr('{}.{}'.format(geo_shape, _SHADER_ATTR))
-        shader_map = json.loads(shader_map_str)
-        Log.info(
-            'Shaders for {}:\n{}'.format(geo_shape, pformat(shader_map)))
-        for part, shader in shader_map.iteritems():
+        if shader_maps is not None:
+            shader_map = shader_maps.get(geo_shape)
+            if shader_map is None:
+                continue
+        else:
+            shader_map_str = cmds.getAttr('{}.{}'.format(geo_shape,
+                                                         _SHADER_ATTR))
+            shader_map = json.loads(shader_map_str)
+        Log.debug('Shaders for {}:\n{}', geo_shape,
+                  Lazy(pformat, shader_map))
+        for part, shader in shader_map.items():
             shape = '{}{}'.format(geo_shape, part)
-            sg = "{0}:{1}".format(shader_namespace, shader)
-            Log.info('Assigning {} to {}'.format(sg, shape))
+            sg = _get_shading_engine_name(shader_namespace, shader)
+            Log.debug('Assigning {} to {}', sg, shape)
             cmds.sets(shape, e=True, forceElement=sg)
 
 
+def _get_assigned_shader_maps(geo_shapes):
+    """
+    Decode the "assigned_shader" attribute of all shapes, shapes without the
+    attribute are skipped.
+    :return: {'|pCube1|pCubeShape1': {'.f[0:3]': 'lambert2SG'}}
+    """
+    plugs = ['{}.{}'.format(geo_shape, _SHADER_ATTR)
+             for geo_shape in geo_shapes]
+    # one query for all shapes instead of one attributeQuery per shape
+    existing = set(cmds.ls(plugs, long=True) or [])
+    shader_maps = {}
+    for geo_shape, plug in zip(geo_shapes, plugs):
+        if plug not in existing:
+            Log.warning('"{}" has no {} attribute.'.format(geo_shape,
+                                                           _SHADER_ATTR))
+            continue
+        shader_maps[geo_shape] = json.loads(cmds.getAttr(plug))
+    return shader_maps
+
+
+def _group_components_by_shader(shader_namespace, shader_maps):
+    """
+    {'|pCube1|pCubeShape1': {'.f[0:3]': 'lambert2SG', '.f[4]': 'blinn1SG'},
+     '|pCube2|pCubeShape2': {'': 'lambert2SG'}}
+    -->
+    {'ns:lambert2SG': ['|pCube1|pCubeShape1.f[0:3]', '|pCube2|pCubeShape2'],
+     'ns:blinn1SG': ['|pCube1|pCubeShape1.f[4]']}
+    """
+    components = {}
+    for geo_shape in sorted(shader_maps):
+        for part, shader in sorted(shader_maps[geo_shape].items()):
+            sg = _get_shading_engine_name(shader_namespace, shader)
+            components.setdefault(sg, []).append(
+                '{}{}'.format(geo_shape, part))
+    return components
+
+
+def _chunks(items, chunk_size=None):
+    if not chunk_size:
+        yield items
+        return
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def _assign_shaders_in_bulk(shader_namespace, geo_shapes, chunk_size=None,
+                            shader_maps=None):
+    """
+    Same result as _assign_shader_to_geometry, but with one "sets" edit per
+    shading engine (or per `chunk_size` components) instead of one per face
+    range.
+    :param shader_namespace: see _get_shading_engine_name
+    :param chunk_size: max number of components per "sets" edit, no limit
+                       if None
+    :param shader_maps: see _assign_shader_to_geometry
+    """
+    if shader_maps is None:
+        shader_maps = _get_assigned_shader_maps(geo_shapes)
+    _assign_components(
+        _group_components_by_shader(shader_namespace, shader_maps),
+        chunk_size=chunk_size)
+
+
+def _get_changed_components(shader_namespace, shader_maps):
+    """
+    Compare the shader maps with the current members of the namespaced
+    shading engines:
+        {'|ns:pCube1|ns:pCubeShape1': {'.f[0:3]': 'lambert2SG',
+                                       '.f[4]': 'blinn1SG'}}
+        and 'ns:lambert2SG' having '|ns:pCube1.f[0:1]'
+        -->
+        {'ns:lambert2SG': ['|ns:pCube1|ns:pCubeShape1.f[2:3]'],
+         'ns:blinn1SG': ['|ns:pCube1|ns:pCubeShape1.f[4]']}
+    :return: {shading engine: [component, ...]} of the components which are
+             not assigned as in `shader_maps`
+    """
+    wanted_maps = {}
+    for geo_shape, shader_map in shader_maps.items():
+        wanted_maps[geo_shape] = dict(
+            (part, _get_shading_engine_name(shader_namespace, shader))
+            for part, shader in shader_map.items())
+
+    shading_engines = set()
+    for wanted_map in wanted_maps.values():
+        shading_engines.update(wanted_map.values())
+    missing = set(sg for sg in shading_engines if not cmds.objExists(sg))
+    if missing:
+        Log.warning('Shading engines {} do not exist.'.format(
+            ', '.join(sorted(missing))))
+    shading_engines = sorted(shading_engines - missing)
+
+    geo_shapes = sorted(wanted_maps)
+    snapshot = _build_snapshot(shading_engines)
+    current_maps = _get_geos_shaders_map(
+        geo_shapes, _get_shading_map(shading_engines, geo_shapes,
+                                     snapshot=snapshot),
+        snapshot=snapshot)
+
+    components = {}
+    for geo_shape in geo_shapes:
+        wanted_map = wanted_maps[geo_shape]
+        current_map = current_maps.get(geo_shape, {})
+        if wanted_map == current_map:
+            continue
+        if '' in wanted_map:
+            if wanted_map[''] not in missing:
+                components.setdefault(wanted_map[''], []).append(geo_shape)
+            continue
+
+        # {shading engine: intervals, None if the whole shape is a member}
+        current_faces = {}
+        for part, sg in current_map.items():
+            interval = face_range.parse(part) if part else None
+            if interval is None or current_faces.get(sg, []) is None:
+                current_faces[sg] = None
+            else:
+                current_faces.setdefault(sg, []).append(interval)
+
+        wanted_faces = {}
+        for part, sg in wanted_map.items():
+            if sg in missing:
+                continue
+            interval = face_range.parse(part)
+            if interval is None:
+                # not a face range, e.g. '.f[*]', always assigned
+                components.setdefault(sg, []).append(
+                    '{}{}'.format(geo_shape, part))
+            else:
+                wanted_faces.setdefault(sg, []).append(interval)
+
+        for sg, intervals in sorted(wanted_faces.items()):
+            assigned = current_faces.get(sg, [])
+            if assigned is None:
+                # faces moved to other shading engines leave the rest in sg
+                continue
+            for interval in face_range.subtract(face_range.merge(intervals),
+                                                face_range.merge(assigned)):
+                components.setdefault(sg, []).append('{}{}'.format(
+                    geo_shape, face_range.format_component(interval)))
+    return components
+
+
+def _reconcile_shaders(shader_namespace, shader_maps, chunk_size=None):
+    """
+    Assign only the components which changed, see _get_changed_components.
+    :return: number of assigned components
+    """
+    components = _get_changed_components(shader_namespace, shader_maps)
+    _assign_components(components, chunk_size=chunk_size)
+    return sum(len(sg_components) for sg_components in components.values())
+
+
+def _assign_components(components, chunk_size=None):
+    """
+    :param components: {shading engine: [component, ...]}, see
+                       _group_components_by_shader
+    """
+    for sg in sorted(components):
+        Log.debug('Assigning {} to {} components', sg, len(components[sg]))
+        for chunk in _chunks(components[sg], chunk_size=chunk_size):
+            cmds.sets(chunk, e=True, forceElement=sg)
+
+
+def _store_shader_intent(geo_ref_path, shader_namespace, shader_maps):
+    """
+    Keep the shader assignments of an abc reference whose shader references
+    are not loaded yet on a network node:
+        {"geo_namespace": ":chair",
+         "shader_namespace": ":chair1",
+         "shader_maps": {"|chair:seat|chair:seatShape": {"": "lambert2SG"}}}
+    :return: network node
+    """
+    node = cmds.createNode('network', name='lilisiShaderIntent#')
+    cmds.addAttr(node, longName=_INTENT_ATTR, dataType='string')
+    cmds.setAttr('{}.{}'.format(node, _INTENT_ATTR), json.dumps({
+        'geo_namespace': cmds.referenceQuery(geo_ref_path, ns=True),
+        'shader_namespace': shader_namespace,
+        'shader_maps': shader_maps}), type='string')
+    return node
+
+
+def _get_intent_namespaces(intent):
+    shader_namespace = intent['shader_namespace']
+    if isinstance(shader_namespace, dict):
+        namespaces = set(shader_namespace.values())
+    else:
+        namespaces = set([shader_namespace])
+    namespaces.add(intent['geo_namespace'])
+    return set(namespace.strip(':') for namespace in namespaces)
+
+
+def _get_shader_intents(namespaces=None):
+    """
+    :param namespaces: namespaces of abc or shader references, all the
+                       intents if None
+    :return: [(network node, intent), ...], see _store_shader_intent
+    """
+    nodes = cmds.ls('*.{}'.format(_INTENT_ATTR), objectsOnly=True) or []
+    wanted = None
+    if namespaces is not None:
+        wanted = set(namespace.strip(':') for namespace in namespaces)
+    intents = []
+    for node in nodes:
+        intent = json.loads(cmds.getAttr('{}.{}'.format(node, _INTENT_ATTR)))
+        if wanted is None or wanted.intersection(
+                _get_intent_namespaces(intent)):
+            intents.append((node, intent))
+    return intents
+
+
+def _load_references(namespaces):
+    """
+    Load the unloaded references of `namespaces`.
+    :return: number of loaded references
+    """
+    loaded = 0
+    for ref_path in cmds.file(query=True, reference=True) or []:
+        if cmds.referenceQuery(ref_path, ns=True).strip(':') not in \
+                namespaces or cmds.referenceQuery(ref_path, isLoaded=True):
+            continue
+        cmds.file(loadReference=cmds.referenceQuery(ref_path,
+                                                    referenceNode=True))
+        loaded += 1
+    return loaded
+
+
 class SessionException(Exception):
     pass
 
 
+class _CacheFiles(object):
+    """
+    The files exported next to an abc file. find() does not use Maya, the
+    files of many abc files can be found and read by concurrent threads.
+
+    :param record: asset_index.ExportRecord of the abc file, the files are
+                   found by probing the file system if None
+    """
+
+    def __init__(self, geo_path, record=None):
+        self.geo_path = geo_path
+        self.record = record
+        self.base_path = os.path.splitext(geo_path)[0]
+        self.library_map_path = ''
+        self.library_map = None
+        self.shader_path = ''
+        self.shader_map_path = ''
+        self.file_shader_maps = None
+        self.error = ''
+
+    def find(self):
+        try:
+            try:
+                geo_mtime = os.path.getmtime(self.geo_path)
+            except OSError:
+                raise SessionException(
+                    'Abc file "{}" does not exist.'.format(self.geo_path))
+            if not self._find_recorded(geo_mtime):
+                self._probe()
+        except (SessionException, IOError, OSError, ValueError) as e:
+            self.error = str(e)
+        return self
+
+    def _find_recorded(self, geo_mtime):
+        """
+        :return: False if the abc file was written after it was recorded or
+                 a recorded file can not be read. The shader file is not
+                 checked, Session._import_shaders reports it if missing.
+        """
+        record = self.record
+        if record is None or record.geo_mtime != geo_mtime:
+            return False
+        try:
+            self._read(record.library_map_path, record.shader_path,
+                       record.shader_map_path)
+        except (IOError, OSError, ValueError):
+            return False
+        return True
+
+    def _probe(self):
+        library_map_path = _get_shader_library_map_path(self.base_path)
+        shader_path = ''
+        if not library_map_path:
+            shader_path = _get_shader_path(self.base_path)
+        self._read(library_map_path, shader_path,
+                   _get_shader_map_path(self.base_path))
+
+    def _read(self, library_map_path, shader_path, shader_map_path):
+        self.library_map_path = library_map_path
+        self.library_map = None
+        if library_map_path:
+            self.library_map = shader_library.load_map(library_map_path)
+        self.shader_path = shader_path
+        self.shader_map_path = shader_map_path
+        self.file_shader_maps = None
+        if shader_map_path:
+            self.file_shader_maps = shader_map_file.read(shader_map_path)
+
+    def get_shader_maps(self, geo_shapes):
+        """
+        :return: shader maps of the referenced shapes, None if they have to
+                 be read from the "assigned_shader" attributes (caches
+                 written before the shader map file)
+        """
+        if self.file_shader_maps is None:
+            return None
+        return _match_shader_maps(self.file_shader_maps, geo_shapes,
+                                  self.shader_map_path)
+
+
+def _find_cache_files(geo_paths, workers=None):
+    """
+    The files of the exports recorded in the asset index are looked up with
+    one query, the others are probed.
+    :param workers: number of threads, one per core if None
+    :return: [_CacheFiles, ...] in the order of `geo_paths`
+    """
+    records = _find_export_records(geo_paths)
+    caches = [_CacheFiles(geo_path, record=records.get(geo_path))
+              for geo_path in geo_paths]
+    if len(caches) < 2:
+        return [cache.find() for cache in caches]
+    # imported when needed, multiprocessing is slow to import
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(lambda cache: cache.find(), caches)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _find_export_records(geo_paths):
+    """
+    :return: {geo path: asset_index.ExportRecord}
+    """
+    if not Session.asset_index_path:
+        return {}
+    index = asset_index.AssetIndex(Session.asset_index_path)
+    try:
+        return index.find_exports(geo_paths)
+    except asset_index.Error as e:
+        Log.warning('Can not read asset index "{}": {}'.format(
+            index.path, e))
+        return {}
+    finally:
+        index.close()
+
+
+def _record_exports(records):
+    """
+    Add the asset_index.ExportRecord of the written abc files to the asset
+    index, a failure is only reported.
+    """
+    if not Session.asset_index_path or not records:
+        return
+    index = asset_index.AssetIndex(Session.asset_index_path)
+    try:
+        index.record_exports(records)
+    except (asset_index.Error, OSError) as e:
+        Log.warning('Can not record the export in asset index "{}": '
+                    '{}'.format(index.path, e))
+    finally:
+        index.close()
+
+
+def _get_export_record(geo_path, scene_ext, shader_files, library_dir='',
+                       frame_range=None, manifest=None):
+    """
+    :param shader_files: {shading engine: shader file} as returned by
+                         Session._export_shaders
+    """
+    base_path = os.path.splitext(geo_path)[0]
+    shader_path = library_map_path = ''
+    if library_dir:
+        library_map_path = _set_shader_library_map_path(base_path)
+    elif shader_files:
+        shader_path = _set_shader_path(base_path, scene_ext)
+    fingerprints = manifest.fingerprints if manifest is not None else {}
+    return asset_index.ExportRecord(
+        geo_path, geo_mtime=os.path.getmtime(geo_path),
+        shader_path=shader_path, library_map_path=library_map_path,
+        shader_map_path=_set_shader_map_path(base_path),
+        geo_fingerprint=fingerprints.get('geometry'),
+        shader_fingerprint=fingerprints.get('shaders'),
+        frame_range=frame_range, scene_path=cmds.file(query=True, sn=True),
+        shading_engines=shader_files)
+
+
+def _publish_file(path, publish_dir):
+    """
+    Copy a written file to `publish_dir`, unless the copy there has the same
+    size and modification time. Runs in _BackgroundTasks, so it does not
+    log.
+    :return: path of the published file
+    """
+    publish_path = os.path.join(publish_dir, os.path.basename(path))
+    if os.path.isfile(publish_path):
+        stat = os.stat(path)
+        publish_stat = os.stat(publish_path)
+        if (stat.st_size, stat.st_mtime) == \
+                (publish_stat.st_size, publish_stat.st_mtime):
+            return publish_path
+    if not os.path.isdir(publish_dir):
+        try:
+            os.makedirs(publish_dir)
+        except OSError:
+            # created by another task meanwhile
+            if not os.path.isdir(publish_dir):
+                raise
+    # large blocks, the GIL is released while each one is read and written
+    with open(path, 'rb') as src, open(publish_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, _COPY_BLOCK_SIZE)
+    shutil.copystat(path, publish_path)
+    return publish_path
+
+
+def _write_shader_map_file_task(geo_path, geo_shapes, roots, geos_shaders_map,
+                                publish_dir=''):
+    _write_shader_map_file(geo_path, geo_shapes, roots, geos_shaders_map)
+    if publish_dir:
+        _publish_file(_set_shader_map_path(os.path.splitext(geo_path)[0]),
+                      publish_dir)
+
+
+def _report_progress(progress, done, total, message):
+    if progress is not None:
+        progress(done, total, message)
+    else:
+        Log.info('[{}/{}] {}', done, total, message)
+
+
+class _GeoJob(object):
+    """
+    One abc file of an export and its shader file.
+    """
+
+    def __init__(self, geo_path, roots):
+        self.geo_path = geo_path
+        self.roots = roots
+        self.geo_shapes = []
+        self.shading_engines = []
+        self.frame_range = None
+        self.manifest = None
+        self.geo_fingerprint = None
+
+    def set_shapes(self, geo_shapes, geos_shaders_map, shading_engines,
+                   split=False):
+        """
+        Keep the shapes under the job roots and, if split, only the shading
+        engines assigned to them.
+        """
+        prefixes = tuple(root + '|' for root in self.roots)
+        self.geo_shapes = [geo_shape for geo_shape in geo_shapes
+                           if geo_shape.startswith(prefixes)]
+        if not split:
+            self.shading_engines = shading_engines
+            return
+        assigned = set()
+        for geo_shape in self.geo_shapes:
+            assigned.update(geos_shaders_map.get(geo_shape, {}).values())
+        self.shading_engines = [shading_engine
+                                for shading_engine in shading_engines
+                                if shading_engine in assigned]
+
+    def update_fingerprint(self, geos_shaders_map,
+                           frame_range_mode=SCENE_RANGE, attributes=None):
+        self.manifest = ExportManifest.load(
+            _set_manifest_path(os.path.splitext(self.geo_path)[0]))
+        upstream = Geo_Exporter.find_upstream_nodes(self.roots)
+        animation_curves = None
+        if frame_range_mode != SCENE_RANGE:
+            animation_curves = cmds.ls(list(upstream), type='animCurve') or []
+        self.geo_fingerprint = fingerprint.geometry(
+            self.geo_shapes, geos_shaders_map, roots=self.roots,
+            frame_range=self.frame_range, animation_curves=animation_curves,
+            attributes=attributes, upstream_nodes=upstream,
+            exact=Session.exact_fingerprints, cmds_module=cmds)
+
+    def is_current(self):
+        if self.manifest is None or not self.manifest.is_current(
+                'geometry', self.geo_fingerprint, self.geo_path):
+            return False
+        Log.info('Skipping "{}", geometry did not change.'.format(
+            self.geo_path))
+        return True
+
+
+# {number of threads: ThreadPool} shared by the exports of the session, a
+# pool takes longer to start than the file work of a small export
+_thread_pools = {}
+
+
+def _close_thread_pools(join=False):
+    """
+    Close the pools, their queued tasks still run.
+    :param join: wait for the tasks and the threads to end
+    """
+    pools = list(_thread_pools.values())
+    _thread_pools.clear()
+    for pool in pools:
+        pool.close()
+        if join:
+            pool.join()
+
+
+atexit.register(_close_thread_pools, join=True)
+
+
+def _get_thread_pool(workers):
+    pool = _thread_pools.get(workers)
+    if pool is None:
+        # a pool of the previous Session.background_workers is not reused
+        _close_thread_pools()
+        # imported when needed, multiprocessing is slow to import
+        from multiprocessing.pool import ThreadPool
+        pool = _thread_pools[workers] = ThreadPool(workers)
+    return pool
+
+
+class _BackgroundTasks(object):
+    """
+    File system work of an export, e.g. writing sidecar files or copying
+    to the publish location, run by worker threads while the main thread
+    keeps calling Maya. The tasks must not call Maya, Log included. Their
+    errors are raised together by join:
+
+        tasks = _BackgroundTasks(workers=4)
+        tasks.submit('copy "a.abc"', shutil.copy2, 'a.abc', '/publish')
+        ... Maya work ...
+        tasks.join()
+    """
+
+    def __init__(self, workers=None):
+        """
+        :param workers: number of threads, the tasks run on submit if 0.
+                        The pool is started by the first task and kept for
+                        the next exports.
+        """
+        self._workers = workers
+        # [(description, AsyncResult or error), ...]
+        self._results = []
+
+    def __len__(self):
+        return len(self._results)
+
+    def submit(self, description, func, *args, **kwargs):
+        if self._workers != 0:
+            pool = _get_thread_pool(self._workers)
+            self._results.append(
+                (description, pool.apply_async(func, args, kwargs)))
+            return
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            self._results.append((description, e))
+        else:
+            self._results.append((description, None))
+
+    def wait(self):
+        """
+        Wait for every task, without raising their errors.
+        """
+        for _, result in self._results:
+            if result is not None and not isinstance(result, Exception):
+                result.wait()
+
+    def join(self):
+        """
+        Wait for every task.
+        :raise SessionException: listing the failed tasks
+        """
+        self.wait()
+        errors = []
+        for description, result in self._results:
+            if isinstance(result, Exception):
+                errors.append('{}: {}'.format(description, result))
+            elif result is not None:
+                try:
+                    result.get()
+                except Exception as e:
+                    errors.append('{}: {}'.format(description, e))
+        if errors:
+            raise SessionException('{} of {} file tasks failed:\n{}'.format(
+                len(errors), len(self._results), '\n'.join(errors)))
+
+
 class Session(object):
     """
     Usage:
@@ -377,46 +1170,425 @@ class Session(object):
         session.Session.import_scene()
     """
 
+    # suspend the viewport refresh and make each export or import a single
+    # undo step, see _scene_edits
+    suspend_updates = True
+
+    # scene_query backend of the shading engine and DAG queries, CMDS or
+    # OPENMAYA
+    query_backend = scene_query.CMDS
+
+    # asset_index database recording the exports and read on import to
+    # find the files of an abc file, disabled if empty, $LILISI_ASSET_INDEX
+    # by default
+    asset_index_path = asset_index.default_path()
+
+    # threads of the file system work of an export (sidecar files,
+    # manifests and publish copies) which runs alongside the Maya writes,
+    # run on the main thread if 0
+    background_workers = 4
+
+    # hash every point and uv of the meshes for the incremental exports
+    # instead of their bounding boxes and a sample, see fingerprint.geometry
+    exact_fingerprints = False
+
+    @staticmethod
+    def export_scene(export_selection=True, profile=False, cprofile=False,
+                     incremental=False, alembic_dialog=True,
+                     frame_range_mode=SCENE_RANGE, split_roots=False,
+                     library_dir='', shader_attribute=False, publish_dir=''):
+        """
+        :param incremental: skip writing the abc and shader files when their
+                            content did not change since the last export
+                            (only the shader file with alembic_dialog), see
+                            fingerprint.ExportManifest
+        :param alembic_dialog: export with Maya's "Export Selection to
+                               Alembic" dialog and its options and find the
+                               chosen file in the command trace, if False
+                               only ask for the file path and export with
+                               the options below
+        :param frame_range_mode: "scene" exports the playback range if
+                                 anything in the scene is animated, "keyed"
+                                 only the keyed range of the animation
+                                 driving the selection and a single frame
+                                 if nothing does, see
+                                 Geo_Exporter.find_frame_range (ignored with
+                                 alembic_dialog)
+        :param split_roots: write one abc and one shader file per selected
+                            root, "<base>_<root name>.abc", with a single
+                            AbcExport call (ignored with alembic_dialog)
+        :param library_dir: write the shading engines to this shared
+                            library, once per network content, and only
+                            "<base>.shaders.json" next to the abc file
+                            instead of a shader file, see shader_library
+        :param shader_attribute: also write the shader maps to the
+                                 "assigned_shader" attribute of every shape
+                                 and to the abc file, for importers which
+                                 do not read "<base>.shadermap" (always
+                                 written with alembic_dialog)
+        :param publish_dir: also copy the abc, shader and shader map files
+                            to this directory, in background threads while
+                            the other files are written
+        :param profile: log the time, cmds call count and object count of
+                        each stage and write them to "<base>.profile.json"
+                        next to the exported abc file
+        :param cprofile: also run cProfile, stats are written to
+                         "<base>.profile.prof"
+        """
+        profiler = Profiler('export_scene', enabled=profile, cprofile=cprofile)
+        with profiler, _scene_edits('export_scene'):
+            geo_path = Session._export_scene(
+                profiler, incremental=incremental,
+                alembic_dialog=alembic_dialog,
+                frame_range_mode=frame_range_mode, split_roots=split_roots,
+                library_dir=library_dir, shader_attribute=shader_attribute,
+                publish_dir=publish_dir)
+
+        if profiler.enabled:
+            profiler.log_report()
+            if geo_path:
+                base_path = os.path.splitext(geo_path)[0]
+                profiler.write(_set_profile_path(base_path))
+
     @staticmethod
-    def export_scene(export_selection=True):
+    def _export_scene(profiler, incremental=False, alembic_dialog=True,
+                      frame_range_mode=SCENE_RANGE, split_roots=False,
+                      library_dir='', shader_attribute=False,
+                      publish_dir=''):
+        """
+        :return: exported abc file path, '' if nothing was exported
+        """
         sels = cmds.ls(sl=True)
 
         selected_geos = cmds.ls(sl=True, dag=True, leaf=True, l=True,
                                 noIntermediate=True, type=_GEO_TYPES)
-        Log.info('Selected geometries: {}'.format(selected_geos))
+        Log.debug('Selected geometries: {}', selected_geos)
         if not selected_geos:
             cmds.confirmDialog(title='Select geometry to export',
                                message="Please select some geometries "
                                        "before exporting",
                                button=['Okay'], defaultButton='Okay')
-            return
+            return ''
 
         scene_name = _get_scene_name()
         if not scene_name:
             Log.info(
                 'Skipping cache export since current scene has not been saved.')
-            return
+            return ''
 
         scene_ext = scene_name.rsplit('.')[1]
         scene_type = _get_scene_type(scene_ext)
 
-        _load_plugin('AbcExport')
-        cmd_output_file = _set_cmd_output_file()
+        if alembic_dialog:
+            geo_path = Session._export_with_dialog(profiler, selected_geos,
+                                                   scene_ext, scene_type,
+                                                   incremental=incremental,
+                                                   library_dir=library_dir,
+                                                   publish_dir=publish_dir)
+        else:
+            geo_path = _ask_file_path('Export Selection to Alembic', 0)
+            if geo_path:
+                Session._export_to_path(profiler, geo_path,
+                                        roots=cmds.ls(sl=True, long=True),
+                                        scene_ext=scene_ext,
+                                        incremental=incremental,
+                                        frame_range_mode=frame_range_mode,
+                                        split_roots=split_roots,
+                                        library_dir=library_dir,
+                                        shader_attribute=shader_attribute,
+                                        publish_dir=publish_dir)
+            else:
+                Log.info('Skipping cache export since no file was chosen.')
+
+        # re select geos after export
+        if sels:
+            cmds.select(sels, r=True)
 
-        shading_engines = _get_shading_engines(selected_geos=selected_geos)
-        shading_map = _get_shading_map(shading_engines, selected_geos)
-        geos_shaders_map = _get_geos_shaders_map(selected_geos, shading_map)
-        # Write "shader" attribute to geometries
-        for geo_shape in selected_geos:
-            _add_shader_attr(geo_shape, geos_shaders_map)
+        return geo_path
 
-        Geo_Exporter.alembic_export()
-        geo_path = _get_abc_file_path(cmd_output_file)
+    @staticmethod
+    def _export_with_dialog(profiler, selected_geos, scene_ext, scene_type,
+                            incremental=False, library_dir='',
+                            publish_dir=''):
+        """
+        Export with "AlembicExportSelection", the abc file path is read from
+        the command trace.
+        """
+        with profiler.span('plugin_load'):
+            _load_plugin('AbcExport')
+
+        shading_engines, geos_shaders_map = Session._write_shader_maps(
+            selected_geos, profiler)
+
+        with profiler.span('alembic'):
+            with _cmd_output_file() as cmd_output_file:
+                Geo_Exporter.alembic_export()
+                geo_path = _get_abc_file_path(cmd_output_file)
 
         if not geo_path:
             Log.info('Skipping shader export since geo path is None.')
-            return
+            return ''
+
+        tasks = _BackgroundTasks(workers=Session.background_workers)
+        tasks.submit('Write the shader map file of "{}"'.format(geo_path),
+                     _write_shader_map_file_task, geo_path, selected_geos,
+                     _get_export_roots(cmds.ls(sl=True, long=True)),
+                     geos_shaders_map, publish_dir=publish_dir)
+        if publish_dir:
+            tasks.submit('Publish "{}"'.format(geo_path), _publish_file,
+                         geo_path, publish_dir)
+
+        try:
+            manifest = None
+            if incremental:
+                manifest = ExportManifest.load(
+                    _set_manifest_path(os.path.splitext(geo_path)[0]))
+            shader_files = Session._export_shaders(
+                geo_path, scene_ext, scene_type, shading_engines, profiler,
+                manifest=manifest, library_dir=library_dir)
+            if manifest is not None:
+                tasks.submit('Save "{}"'.format(manifest.path), manifest.save)
+            record = _get_export_record(
+                geo_path, scene_ext, shader_files, library_dir=library_dir,
+                manifest=manifest)
+            if publish_dir:
+                for path in (record.shader_path, record.library_map_path):
+                    if path:
+                        tasks.submit('Publish "{}"'.format(path),
+                                     _publish_file, path, publish_dir)
+        except Exception:
+            tasks.wait()
+            raise
+        with profiler.span('background_wait') as span:
+            span.objects = len(tasks)
+            tasks.join()
+
+        with profiler.span('asset_index'):
+            _record_exports([record])
+        return geo_path
+
+    @staticmethod
+    def export_to_path(geo_path, roots=None, scene_ext='', profile=False,
+                       cprofile=False, incremental=False,
+                       frame_range_mode=SCENE_RANGE, split_roots=False,
+                       library_dir='', shader_attribute=False, publish_dir=''):
+        """
+        Export without any dialog, e.g. from a batch worker:
+            Session.export_to_path('/publish/chair.abc', roots=['|chair'])
+
+        :param geo_path: abc file to write, the shader file is written next
+                         to it
+        :param roots: DAG nodes to export, the current selection if None
+        :param scene_ext: "ma" or "mb" for the shader file, the current
+                          scene's type if empty
+        :param profile: see export_scene
+        :param cprofile: see export_scene
+        :param incremental: skip writing the abc and shader files when their
+                            content did not change since the last export,
+                            see fingerprint.ExportManifest
+        :param frame_range_mode: see export_scene
+        :param split_roots: see export_scene
+        :param library_dir: see export_scene
+        :param shader_attribute: see export_scene
+        :param publish_dir: see export_scene
+        :return: geo_path, the list of written abc file paths with
+                 split_roots
+        """
+        profiler = Profiler('export_to_path', enabled=profile,
+                            cprofile=cprofile)
+        sels = cmds.ls(sl=True)
+        with profiler, _scene_edits('export_to_path'):
+            try:
+                geo_paths = Session._export_to_path(
+                    profiler, geo_path, roots=roots, scene_ext=scene_ext,
+                    incremental=incremental,
+                    frame_range_mode=frame_range_mode,
+                    split_roots=split_roots, library_dir=library_dir,
+                    shader_attribute=shader_attribute,
+                    publish_dir=publish_dir)
+            finally:
+                # the exports select what they write, re select after them
+                if sels:
+                    cmds.select(sels, r=True)
+                else:
+                    cmds.select(clear=True)
+
+        if profiler.enabled:
+            profiler.log_report()
+            profiler.write(
+                _set_profile_path(os.path.splitext(geo_path)[0]))
+        return geo_paths if split_roots else geo_path
+
+    @staticmethod
+    def _export_to_path(profiler, geo_path, roots=None, scene_ext='',
+                        incremental=False, frame_range_mode=SCENE_RANGE,
+                        split_roots=False, library_dir='',
+                        shader_attribute=False, publish_dir=''):
+        """
+        :return: exported abc file paths
+        """
+        if roots is None:
+            roots = cmds.ls(sl=True, long=True)
+        roots = _get_export_roots(roots)
+        selected_geos = cmds.ls(roots, dag=True, leaf=True, l=True,
+                                noIntermediate=True, type=_GEO_TYPES)
+        if not selected_geos:
+            raise SessionException(
+                'No geometry to export under {}.'.format(roots))
+
+        if not scene_ext:
+            scene_name = cmds.file(query=True, sn=True)
+            scene_ext = scene_name.rsplit('.')[-1] if scene_name else 'ma'
+        scene_type = _get_scene_type(scene_ext)
+
+        geo_dir = os.path.dirname(geo_path)
+        if geo_dir and not os.path.isdir(geo_dir):
+            os.makedirs(geo_dir)
+
+        with profiler.span('plugin_load'):
+            _load_plugin('AbcExport')
+
+        shading_engines, geos_shaders_map = Session._write_shader_maps(
+            selected_geos, profiler, write_attributes=shader_attribute)
+        attributes = [_SHADER_ATTR] if shader_attribute else []
+
+        if split_roots:
+            jobs = [_GeoJob(path, [root]) for root, path in
+                    zip(roots, _get_split_geo_paths(geo_path, roots))]
+        else:
+            jobs = [_GeoJob(geo_path, roots)]
+        for job in jobs:
+            job.set_shapes(selected_geos, geos_shaders_map, shading_engines,
+                           split_roots)
+
+        with profiler.span('frame_range'):
+            for job in jobs:
+                job.frame_range = Geo_Exporter.find_frame_range(
+                    job.roots, frame_range_mode)
+                Log.debug('Frame range of {}: {}', job.roots, job.frame_range)
+
+        if incremental:
+            with profiler.span('geo_fingerprint'):
+                for job in jobs:
+                    job.update_fingerprint(geos_shaders_map, frame_range_mode,
+                                           attributes=attributes)
+
+        tasks = _BackgroundTasks(workers=Session.background_workers)
+        try:
+            records = Session._write_jobs(
+                profiler, tasks, jobs, geos_shaders_map, scene_ext,
+                scene_type, attributes=attributes, library_dir=library_dir,
+                publish_dir=publish_dir)
+        except Exception:
+            tasks.wait()
+            raise
+        with profiler.span('background_wait') as span:
+            span.objects = len(tasks)
+            tasks.join()
+
+        with profiler.span('asset_index'):
+            _record_exports(records)
+        return [job.geo_path for job in jobs]
+
+    @staticmethod
+    def _write_jobs(profiler, tasks, jobs, geos_shaders_map, scene_ext,
+                    scene_type, attributes=None, library_dir='',
+                    publish_dir=''):
+        """
+        Write the abc and shader files of the jobs on the main thread, the
+        sidecar files, manifests and publish copies are submitted to `tasks`
+        as soon as what they need is written.
+        :param tasks: _BackgroundTasks
+        :return: [asset_index.ExportRecord, ...]
+        """
+        for job in jobs:
+            tasks.submit('Write the shader map file of "{}"'.format(
+                job.geo_path), _write_shader_map_file_task, job.geo_path,
+                job.geo_shapes, job.roots, geos_shaders_map,
+                publish_dir=publish_dir)
+
+        stale_jobs = [job for job in jobs if not job.is_current()]
+        if stale_jobs:
+            with profiler.span('alembic') as span:
+                Geo_Exporter.export_jobs(
+                    [(job.geo_path, job.roots, job.frame_range)
+                     for job in stale_jobs],
+                    attributes=attributes)
+                span.objects = len(stale_jobs)
+            for job in stale_jobs:
+                if job.manifest is not None:
+                    job.manifest.update('geometry', job.geo_fingerprint)
+        if publish_dir:
+            # the longest copies, started before the shader export
+            for job in jobs:
+                tasks.submit('Publish "{}"'.format(job.geo_path),
+                             _publish_file, job.geo_path, publish_dir)
+
+        records = []
+        for job in jobs:
+            shader_files = Session._export_shaders(
+                job.geo_path, scene_ext, scene_type, job.shading_engines,
+                profiler, manifest=job.manifest, library_dir=library_dir)
+            if job.manifest is not None:
+                tasks.submit('Save "{}"'.format(job.manifest.path),
+                             job.manifest.save)
+            record = _get_export_record(
+                job.geo_path, scene_ext, shader_files,
+                library_dir=library_dir, frame_range=job.frame_range,
+                manifest=job.manifest)
+            records.append(record)
+            if publish_dir:
+                for path in (record.shader_path, record.library_map_path):
+                    if path:
+                        tasks.submit('Publish "{}"'.format(path),
+                                     _publish_file, path, publish_dir)
+        return records
+
+    @staticmethod
+    def _write_shader_maps(selected_geos, profiler, write_attributes=True):
+        """
+        Build the shader maps of the selected geometries and write their
+        "assigned_shader" attribute if `write_attributes`.
+        :return: (shading engines assigned to the geometries,
+                  geos shaders map)
+        """
+        with profiler.span('shading_engines') as span:
+            shading_engines = _get_shading_engines(selected_geos=selected_geos)
+            span.objects = len(shading_engines)
+
+        with profiler.span('snapshot') as span:
+            snapshot = _build_snapshot(shading_engines)
+            span.objects = len(snapshot.long_names)
+
+        with profiler.span('shading_map') as span:
+            shading_map = _get_shading_map(shading_engines, selected_geos,
+                                           snapshot=snapshot)
+            geos_shaders_map = _get_geos_shaders_map(selected_geos,
+                                                     shading_map,
+                                                     snapshot=snapshot)
+            span.objects = len(geos_shaders_map)
+
+        if write_attributes:
+            with profiler.span('attributes') as span:
+                # Write "shader" attribute to geometries
+                written = _add_shader_attrs(selected_geos, geos_shaders_map)
+                span.objects = len(selected_geos)
+            Log.info('Wrote {} of {} {} attributes.'.format(
+                written, len(selected_geos), _SHADER_ATTR))
+
+        return shading_engines, geos_shaders_map
 
+    @staticmethod
+    def _export_shaders(geo_path, scene_ext, scene_type, shading_engines,
+                        profiler, manifest=None, library_dir=''):
+        """
+        :param manifest: ExportManifest, the shader file is only written when
+                         its fingerprint changed
+        :param library_dir: write the shading engines missing from this
+                            library and the library map instead of the
+                            shader file
+        :return: {shading engine: shader file or library entry}
+        """
         if not os.path.isfile(geo_path):
             raise SessionException(
                 'Geo path "{}" is not a valid file.'.format(geo_path))
@@ -424,52 +1596,497 @@ class Session(object):
         base_path = os.path.splitext(geo_path)[0]
         shader_path = _set_shader_path(base_path, scene_ext)
 
-        if shading_engines:
+        if not shading_engines:
+            return {}
+
+        if library_dir:
+            with profiler.span('shader_library') as span:
+                entries = shader_library.export(library_dir, shading_engines,
+                                                scene_ext, scene_type,
+                                                cmds_module=cmds)
+                shader_library.save_map(
+                    _set_shader_library_map_path(base_path), entries)
+                span.objects = len(entries)
+            return entries
+
+        shader_fingerprint = None
+        if manifest is not None:
+            with profiler.span('shader_fingerprint'):
+                shader_fingerprint = fingerprint.shading_network(
+                    shading_engines, cmds_module=cmds)
+            if manifest.is_current('shaders', shader_fingerprint,
+                                   shader_path):
+                Log.info('Skipping "{}", shaders did not change.'.format(
+                    shader_path))
+                return dict((shading_engine, shader_path)
+                            for shading_engine in shading_engines)
+
+        with profiler.span('shader_export') as span:
             Shader_Exporter.export(path=shader_path,
                                    scene_type=scene_type,
                                    shading_engines=shading_engines)
+            span.objects = len(shading_engines)
 
-        # re select geos after export
-        if sels:
-            cmds.select(sels, r=True)
+        if manifest is not None:
+            manifest.update('shaders', shader_fingerprint)
+        return dict((shading_engine, shader_path)
+                    for shading_engine in shading_engines)
+
+    @staticmethod
+    def import_scene(bulk_assign=True, chunk_size=None, profile=False,
+                     cprofile=False, alembic_dialog=True, reuse_shaders=True,
+                     lazy_shaders=False):
+        """
+        :param alembic_dialog: reference with Maya's "Create Reference"
+                               dialog and its options and find the chosen
+                               file in the command trace, if False only ask
+                               for the file path and reference it in the
+                               namespace of its file name
+        :param bulk_assign: assign with one "sets" edit per shading engine
+        :param chunk_size: max number of components per "sets" edit in bulk
+                           mode, no limit if None
+        :param reuse_shaders: assign the shaders of a reference of the same
+                              shader file, or an identical one, already in
+                              the scene instead of referencing it again
+        :param lazy_shaders: leave the shader references unloaded and keep
+                             the assignments until the shaders are
+                             materialized, see Session.materialize
+        :param profile: log the time, cmds call count and object count of
+                        each stage
+        :param cprofile: also run cProfile and log the slowest calls
+        """
+        profiler = Profiler('import_scene', enabled=profile, cprofile=cprofile)
+        with profiler, _scene_edits('import_scene'):
+            Session._import_scene(profiler, bulk_assign=bulk_assign,
+                                  chunk_size=chunk_size,
+                                  alembic_dialog=alembic_dialog,
+                                  reuse_shaders=reuse_shaders,
+                                  lazy_shaders=lazy_shaders)
+
+        if profiler.enabled:
+            profiler.log_report()
+            profiler.log_stats()
 
     @staticmethod
-    def import_scene():
+    def _import_scene(profiler, bulk_assign=True, chunk_size=None,
+                      alembic_dialog=True, reuse_shaders=True,
+                      lazy_shaders=False):
         sels = cmds.ls(sl=True)
 
-        _load_plugin('AbcImport')
-        cmd_output_file = _set_cmd_output_file()
-        Geo_Importer.alembic_import()
-        geo_path, geo_ref_path = _get_reference_file_path(cmd_output_file)
+        with profiler.span('plugin_load'):
+            _load_plugin('AbcImport')
 
-        base_path = os.path.splitext(geo_path)[0]
-        base_name = os.path.basename(base_path)
+        with profiler.span('alembic'):
+            if alembic_dialog:
+                with _cmd_output_file() as cmd_output_file:
+                    Geo_Importer.alembic_import()
+                    geo_path, geo_ref_path = _get_reference_file_path(
+                        cmd_output_file)
+            else:
+                geo_path = _ask_file_path('Reference Alembic', 1)
+                geo_ref_path = ''
+                if geo_path:
+                    geo_ref_path = Geo_Importer.reference(
+                        geo_path, namespace=os.path.splitext(
+                            os.path.basename(geo_path))[0])
+
+        if not geo_path:
+            Log.info('Skipping import since no abc file was referenced.')
+            if sels:
+                cmds.select(sels, r=True)
+            return
+
+        cache = _find_cache_files([geo_path])[0]
         try:
-            shader_path = _get_shader_path(base_path)
-        except SessionException:
+            if cache.error:
+                raise SessionException(cache.error)
+            with profiler.span('shader_import'):
+                shader_namespace = Session._import_shaders(
+                    cache, reuse_shaders=reuse_shaders,
+                    deferred=lazy_shaders)
+        except SessionException as e:
+            cmds.confirmDialog(title='Failed to import shaders',
+                               message=str(e),
+                               button=['Okay'], defaultButton='Okay')
             # remove geo reference
             cmds.file(geo_ref_path, removeReference=True)
             if sels:
                 cmds.select(sels, r=True)
             return
 
-        if shader_path:
-            scene_ext = shader_path.rsplit('.')[1]
-            scene_type = _get_scene_type(scene_ext)
-            shader_namespace = Shader_Importer.import_shader(path=shader_path,
-                                                             scene_type=scene_type,
-                                                             namespace=base_name)
-
+        if shader_namespace:
             if geo_ref_path:
                 geo_namespace = cmds.referenceQuery(geo_ref_path,
                                                     ns=True)
                 Log.info('Geo namespace: {}'.format(geo_namespace))
 
-                ref_nodes = cmds.referenceQuery(geo_ref_path, nodes=True)
-                geo_shapes = cmds.ls(ref_nodes, dag=True, leaf=True, long=True,
-                                     type='mesh')
-                _assign_shader_to_geometry(shader_namespace, geo_shapes)
+                with profiler.span('assignment') as span:
+                    ref_nodes = cmds.referenceQuery(geo_ref_path, nodes=True)
+                    geo_shapes = cmds.ls(ref_nodes, dag=True, leaf=True,
+                                         long=True, type='mesh')
+                    shader_maps = cache.get_shader_maps(geo_shapes)
+                    if lazy_shaders:
+                        if shader_maps is None:
+                            shader_maps = _get_assigned_shader_maps(
+                                geo_shapes)
+                        _store_shader_intent(geo_ref_path, shader_namespace,
+                                             shader_maps)
+                        Session.install_render_hook()
+                    elif bulk_assign:
+                        _assign_shaders_in_bulk(shader_namespace, geo_shapes,
+                                                chunk_size=chunk_size,
+                                                shader_maps=shader_maps)
+                    else:
+                        _assign_shader_to_geometry(shader_namespace,
+                                                   geo_shapes,
+                                                   shader_maps=shader_maps)
+                    span.objects = len(geo_shapes)
 
         # re-select geos after export
         if sels:
             cmds.select(sels, r=True)
+
+    @staticmethod
+    def _import_shaders(cache, reuse_shaders=True, deferred=False,
+                        references=None):
+        """
+        Reference the shader file of an abc file, or its shader library
+        entries if it was exported with a library.
+        :param cache: _CacheFiles of the abc file
+        :param deferred: leave the shader references unloaded
+        :param references: importer.ReferenceIndex of the import pass, one
+                           is built for the shaders of `cache` if None
+        :return: shader namespace, {shader: namespace} with a library, '' if
+                 there are no shaders
+        """
+        if references is None and reuse_shaders:
+            references = ReferenceIndex()
+        if cache.library_map is not None:
+            namespaces = {}
+            shader_namespace = {}
+            for shader, path in sorted(cache.library_map.items()):
+                if path not in namespaces:
+                    if not os.path.isfile(path):
+                        raise SessionException(
+                            'Shader library file "{}" of "{}" is '
+                            'missing.'.format(path, cache.library_map_path))
+                    namespaces[path] = Shader_Importer.import_shader(
+                        path=path,
+                        scene_type=_get_scene_type(path.rsplit('.', 1)[1]),
+                        namespace=shader_library.namespace(path),
+                        reuse=reuse_shaders, deferred=deferred,
+                        references=references)
+                shader_namespace[shader] = namespaces[path]
+            return shader_namespace
+
+        if not cache.shader_path:
+            Log.warning('Failed to find shader path for "{}".'.format(
+                cache.base_path))
+            return ''
+        if not os.path.isfile(cache.shader_path):
+            raise SessionException(
+                'Shader file "{}" of "{}" is missing.'.format(
+                    cache.shader_path, cache.geo_path))
+        scene_ext = cache.shader_path.rsplit('.')[1]
+        return Shader_Importer.import_shader(
+            path=cache.shader_path, scene_type=_get_scene_type(scene_ext),
+            namespace=os.path.basename(cache.base_path), reuse=reuse_shaders,
+            deferred=deferred, references=references)
+
+    @staticmethod
+    def import_paths(geo_paths, bulk_assign=True, chunk_size=None,
+                     reuse_shaders=True, workers=None, progress=None,
+                     lazy_shaders=False, profile=False, cprofile=False):
+        """
+        Reference many abc files and their shaders without any dialog:
+            Session.import_paths(glob.glob('/shot/caches/*.abc'))
+
+        The files next to the abc files are found and read by `workers`
+        threads, then all the abc files are referenced, then their shaders,
+        and all the shapes are assigned in one pass.
+        :param bulk_assign: see import_scene
+        :param chunk_size: see import_scene
+        :param reuse_shaders: see import_scene
+        :param workers: threads finding the files, one per core if None
+        :param progress: called with (done, total, message) after each step,
+                         the steps are logged if None
+        :param lazy_shaders: see import_scene
+        :param profile: see import_scene
+        :param cprofile: see import_scene
+        :return: {abc file path: reference file path} of the imported files
+        """
+        profiler = Profiler('import_paths', enabled=profile,
+                            cprofile=cprofile)
+        with profiler, _scene_edits('import_paths'):
+            geo_ref_paths = Session._import_paths(
+                profiler, geo_paths, bulk_assign=bulk_assign,
+                chunk_size=chunk_size, reuse_shaders=reuse_shaders,
+                workers=workers, progress=progress, lazy_shaders=lazy_shaders)
+
+        if profiler.enabled:
+            profiler.log_report()
+            profiler.log_stats()
+        return geo_ref_paths
+
+    @staticmethod
+    def _import_paths(profiler, geo_paths, bulk_assign=True, chunk_size=None,
+                      reuse_shaders=True, workers=None, progress=None,
+                      lazy_shaders=False):
+        # finding, referencing and shader import of each file, assignment
+        total = 3 * len(geo_paths) + 1
+        done = 0
+
+        with profiler.span('find_files') as span:
+            caches = _find_cache_files(geo_paths, workers=workers)
+            span.objects = len(caches)
+        for cache in caches:
+            done += 1
+            if cache.error:
+                Log.warning('Skipping "{}": {}'.format(cache.geo_path,
+                                                       cache.error))
+            _report_progress(progress, done, total,
+                             'Found files of "{}"'.format(cache.geo_path))
+        caches = [cache for cache in caches if not cache.error]
+
+        with profiler.span('plugin_load'):
+            _load_plugin('AbcImport')
+
+        geo_ref_paths = {}
+        with profiler.span('alembic') as span:
+            for cache in caches:
+                done += 1
+                try:
+                    geo_ref_paths[cache.geo_path] = Geo_Importer.reference(
+                        cache.geo_path,
+                        namespace=os.path.basename(cache.base_path))
+                except RuntimeError as e:
+                    Log.warning('Failed to reference "{}": {}'.format(
+                        cache.geo_path, e))
+                _report_progress(progress, done, total,
+                                 'Referenced "{}"'.format(cache.geo_path))
+            span.objects = len(geo_ref_paths)
+        caches = [cache for cache in caches
+                  if cache.geo_path in geo_ref_paths]
+
+        shader_namespaces = {}
+        with profiler.span('shader_import') as span:
+            references = ReferenceIndex() if reuse_shaders else None
+            for cache in caches:
+                done += 1
+                try:
+                    shader_namespaces[cache.geo_path] = \
+                        Session._import_shaders(cache,
+                                                reuse_shaders=reuse_shaders,
+                                                deferred=lazy_shaders,
+                                                references=references)
+                except SessionException as e:
+                    Log.warning('Skipping shaders of "{}": {}'.format(
+                        cache.geo_path, e))
+                _report_progress(progress, done, total,
+                                 'Imported shaders of "{}"'.format(
+                                     cache.geo_path))
+            span.objects = len(caches)
+
+        with profiler.span('assignment') as span:
+            # the components of all the files, one "sets" edit per shading
+            # engine in bulk mode
+            components = {}
+            for cache in caches:
+                shader_namespace = shader_namespaces.get(cache.geo_path)
+                if not shader_namespace:
+                    continue
+                ref_nodes = cmds.referenceQuery(
+                    geo_ref_paths[cache.geo_path], nodes=True)
+                geo_shapes = cmds.ls(ref_nodes, dag=True, leaf=True,
+                                     long=True, type='mesh')
+                shader_maps = cache.get_shader_maps(geo_shapes)
+                span.objects += len(geo_shapes)
+                if lazy_shaders:
+                    if shader_maps is None:
+                        shader_maps = _get_assigned_shader_maps(geo_shapes)
+                    _store_shader_intent(geo_ref_paths[cache.geo_path],
+                                         shader_namespace, shader_maps)
+                    continue
+                if not bulk_assign:
+                    _assign_shader_to_geometry(shader_namespace, geo_shapes,
+                                               shader_maps=shader_maps)
+                    continue
+                if shader_maps is None:
+                    shader_maps = _get_assigned_shader_maps(geo_shapes)
+                for sg, sg_components in _group_components_by_shader(
+                        shader_namespace, shader_maps).items():
+                    components.setdefault(sg, []).extend(sg_components)
+            _assign_components(components, chunk_size=chunk_size)
+        if lazy_shaders and shader_namespaces:
+            Session.install_render_hook()
+        _report_progress(progress, total, total, 'Assigned shaders')
+
+        return geo_ref_paths
+
+    @staticmethod
+    def reconcile(geo_ref_paths=None, chunk_size=None, workers=None,
+                  profile=False, cprofile=False):
+        """
+        Assign the shaders of referenced abc files again after a cache or
+        shader file was reloaded or updated. Only the components whose
+        shading engine differs from the shader maps are assigned, the cost
+        depends on what changed instead of the size of the assets.
+        :param geo_ref_paths: reference file paths of abc files, e.g.
+                              ".../cube.abc{1}", all the loaded abc
+                              references if None
+        :param chunk_size: see import_scene
+        :param workers: see import_paths
+        :param profile: see import_scene
+        :param cprofile: see import_scene
+        :return: number of assigned components
+        """
+        profiler = Profiler('reconcile', enabled=profile, cprofile=cprofile)
+        with profiler, _scene_edits('reconcile'):
+            assigned = Session._reconcile(profiler,
+                                          geo_ref_paths=geo_ref_paths,
+                                          chunk_size=chunk_size,
+                                          workers=workers)
+
+        if profiler.enabled:
+            profiler.log_report()
+            profiler.log_stats()
+        return assigned
+
+    @staticmethod
+    def _reconcile(profiler, geo_ref_paths=None, chunk_size=None,
+                   workers=None):
+        if geo_ref_paths is None:
+            geo_ref_paths = [
+                ref_path for ref_path in
+                cmds.file(query=True, reference=True) or []
+                if ref_path.split('{')[0].lower().endswith('.abc') and
+                cmds.referenceQuery(ref_path, isLoaded=True)]
+
+        with profiler.span('find_files') as span:
+            caches = _find_cache_files(
+                [ref_path.split('{')[0] for ref_path in geo_ref_paths],
+                workers=workers)
+            span.objects = len(caches)
+
+        shader_namespaces = {}
+        with profiler.span('shader_import'):
+            references = ReferenceIndex()
+            for ref_path, cache in zip(geo_ref_paths, caches):
+                try:
+                    if cache.error:
+                        raise SessionException(cache.error)
+                    # the shaders are already referenced, unless the shader
+                    # file changed
+                    shader_namespaces[ref_path] = Session._import_shaders(
+                        cache, reuse_shaders=True, references=references)
+                except SessionException as e:
+                    Log.warning('Skipping "{}": {}'.format(ref_path, e))
+
+        assigned = 0
+        with profiler.span('reconcile') as span:
+            for ref_path, cache in zip(geo_ref_paths, caches):
+                shader_namespace = shader_namespaces.get(ref_path)
+                if not shader_namespace:
+                    continue
+                ref_nodes = cmds.referenceQuery(ref_path, nodes=True)
+                geo_shapes = cmds.ls(ref_nodes, dag=True, leaf=True,
+                                     long=True, type='mesh')
+                shader_maps = cache.get_shader_maps(geo_shapes)
+                if shader_maps is None:
+                    shader_maps = _get_assigned_shader_maps(geo_shapes)
+                assigned += _reconcile_shaders(shader_namespace, shader_maps,
+                                               chunk_size=chunk_size)
+                span.objects += len(geo_shapes)
+
+        Log.info('Reconciled {} abc references, assigned {} '
+                 'components.'.format(len(shader_namespaces), assigned))
+        return assigned
+
+    @staticmethod
+    def materialize(namespaces=None, chunk_size=None, profile=False,
+                    cprofile=False):
+        """
+        Load the shader references of abc files imported with lazy_shaders
+        and assign their shaders:
+            Session.materialize(['chair', 'table'])
+        :param namespaces: namespaces of the abc or shader references, all
+                           the lazily imported ones if None
+        :param chunk_size: see import_scene
+        :param profile: see import_scene
+        :param cprofile: see import_scene
+        :return: number of materialized abc references
+        """
+        profiler = Profiler('materialize', enabled=profile, cprofile=cprofile)
+        with profiler, _scene_edits('materialize'):
+            count = Session._materialize(profiler, namespaces=namespaces,
+                                         chunk_size=chunk_size)
+
+        if profiler.enabled:
+            profiler.log_report()
+            profiler.log_stats()
+        return count
+
+    @staticmethod
+    def _materialize(profiler, namespaces=None, chunk_size=None):
+        with profiler.span('find_intents') as span:
+            intents = _get_shader_intents(namespaces)
+            span.objects = len(intents)
+        if not intents:
+            return 0
+
+        with profiler.span('load_references') as span:
+            shader_namespaces = set()
+            for _, intent in intents:
+                shader_namespaces.update(_get_intent_namespaces(intent))
+            span.objects = _load_references(shader_namespaces)
+
+        with profiler.span('assignment') as span:
+            components = {}
+            for _, intent in intents:
+                shader_maps = intent['shader_maps']
+                # the abc reference may have been removed or changed since
+                existing = set(cmds.ls(sorted(shader_maps), long=True) or [])
+                for sg, sg_components in _group_components_by_shader(
+                        intent['shader_namespace'],
+                        dict((geo_shape, shader_map) for geo_shape, shader_map
+                             in shader_maps.items()
+                             if geo_shape in existing)).items():
+                    components.setdefault(sg, []).extend(sg_components)
+                span.objects += len(existing)
+            _assign_components(components, chunk_size=chunk_size)
+
+        cmds.delete([node for node, _ in intents])
+        Log.info('Materialized the shaders of {} abc references.'.format(
+            len(intents)))
+        return len(intents)
+
+    @staticmethod
+    def install_render_hook():
+        """
+        Materialize the lazy shaders before rendering, from the pre render
+        MEL of the render globals which is saved with the scene.
+        """
+        plug = 'defaultRenderGlobals.preMel'
+        pre_mel = cmds.getAttr(plug) or ''
+        if _RENDER_HOOK in pre_mel:
+            return
+        pre_mel = pre_mel.strip().rstrip(';')
+        cmds.setAttr(plug, '{}; {}'.format(pre_mel, _RENDER_HOOK)
+                     if pre_mel else _RENDER_HOOK, type='string')
+
+    @staticmethod
+    def find_assets(shading_engine='', shader_path=''):
+        """
+        Exports recorded in the asset index using a shading engine or a
+        shader file:
+            Session.find_assets(shading_engine='lambert2SG')
+        :return: sorted abc file paths
+        """
+        if not Session.asset_index_path:
+            raise SessionException('The asset index is disabled.')
+        index = asset_index.AssetIndex(Session.asset_index_path)
+        try:
+            return index.find_assets(shading_engine=shading_engine,
+                                     shader_path=shader_path)
+        finally:
+            index.close()
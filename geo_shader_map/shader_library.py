@@ -0,0 +1,95 @@
+"""
+Content-addressed store of shading networks shared by many exports.
+
+Every shading engine is written once to "<library>/<digest>.<ext>", digest
+being fingerprint.shading_network() of the shading engine alone without
+the names of its upstream nodes, and an export only writes the library map
+"<base>.shaders.json" next to its abc file:
+
+    {"version": 1,
+     "shading_engines": {"lambert2SG": "/library/3f2a....ma",
+                         "blinn1SG": "/library/9b1c....ma"}}
+"""
+import json
+import os
+
+from log import Log
+from exporter import Shader_Exporter
+import fingerprint
+
+_VERSION = 1
+
+
+def export(library_dir, shading_engines, scene_ext, scene_type,
+           cmds_module=None):
+    """
+    Write the shading engines missing from the library.
+    :return: {shading engine: library file path}
+    """
+    if not os.path.isdir(library_dir):
+        os.makedirs(library_dir)
+
+    entries = {}
+    written = 0
+    for shading_engine in shading_engines:
+        # the same network under other node names is the same entry
+        digest = fingerprint.shading_network([shading_engine],
+                                             cmds_module=cmds_module,
+                                             names=False)
+        path = os.path.join(library_dir, '{}.{}'.format(digest, scene_ext))
+        if not os.path.isfile(path):
+            _write_entry(path, shading_engine, scene_type)
+            written += 1
+        entries[shading_engine] = path
+    Log.info('Wrote {} of {} shading engines to "{}".'.format(
+        written, len(entries), library_dir))
+    return entries
+
+
+def _write_entry(path, shading_engine, scene_type):
+    # write to a temporary file first, other exports may read or write the
+    # same entry at the same time
+    base_path, ext = os.path.splitext(path)
+    temp_path = '{}.{}{}'.format(base_path, os.getpid(), ext)
+    Shader_Exporter.export(path=temp_path, scene_type=scene_type,
+                           shading_engines=[shading_engine])
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # written by another export meanwhile, rename does not replace
+        # existing files on Windows
+        os.remove(temp_path)
+
+
+def save_map(path, entries):
+    """
+    :return: True if the file was written, False if it did not change
+    """
+    data = json.dumps({'version': _VERSION, 'shading_engines': entries},
+                      indent=2, sort_keys=True)
+    if os.path.isfile(path):
+        with open(path) as f:
+            if f.read() == data:
+                return False
+    with open(path, 'w') as f:
+        f.write(data)
+    return True
+
+
+def load_map(path):
+    """
+    :return: {shading engine: library file path}
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != _VERSION:
+        raise ValueError('Unsupported shader library map "{}".'.format(path))
+    return data['shading_engines']
+
+
+def namespace(path):
+    """
+    Namespace of a library entry, e.g. "/library/3f2a....ma" -->
+    "shd_3f2a1c0b9e7d".
+    """
+    return 'shd_{}'.format(os.path.basename(path)[:12])
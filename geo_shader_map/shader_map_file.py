@@ -0,0 +1,142 @@
+"""
+Binary sidecar "<base>.shadermap" holding the shader map of every exported
+shape, read with a single mapping of the file on import instead of one
+"assigned_shader" attribute per shape.
+
+Little-endian layout:
+
+    header    magic "LSMP", version, string count, record count, 4 x u32
+    offsets   string count + 1 x u32, offsets of the strings in the blob
+    strings   utf-8 blob of the shape paths and shader names, each once
+    records   record count x (shape, shader, first face, last face) i32,
+              sorted by shape
+
+The first face is WHOLE for a whole object assignment and OTHER for a
+component which is not a face range, the last face then being the string
+index of the component. Shape paths are relative to the abc file, e.g.
+"|chair|seat|seatShape" for "|set|chair|seat|seatShape" exported with the
+root "|set|chair".
+"""
+import mmap
+import os
+import struct
+
+import face_range
+
+_MAGIC = b'LSMP'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIII')
+
+WHOLE = -1
+OTHER = -2
+
+
+def _intern(strings, index, value):
+    if value not in index:
+        index[value] = len(strings)
+        strings.append(value)
+    return index[value]
+
+
+def write(path, geos_shaders_map):
+    """
+    :param geos_shaders_map: {shape path: {component: shader}}, see
+                             session._get_geos_shaders_map
+    :return: True if the file was written, False if it did not change
+    """
+    strings = []
+    index = {}
+    records = []
+    for shape in sorted(geos_shaders_map):
+        shape_id = _intern(strings, index, shape)
+        for part, shader in sorted(geos_shaders_map[shape].items()):
+            shader_id = _intern(strings, index, shader)
+            if not part:
+                interval = (WHOLE, 0)
+            else:
+                interval = face_range.parse(part) or \
+                    (OTHER, _intern(strings, index, part))
+            records.extend((shape_id, shader_id) + tuple(interval))
+
+    blobs = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+
+    data = b''.join([
+        _HEADER.pack(_MAGIC, _VERSION, len(strings), len(records) // 4),
+        struct.pack('<{}I'.format(len(offsets)), *offsets),
+        b''.join(blobs),
+        struct.pack('<{}i'.format(len(records)), *records)])
+    if os.path.isfile(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def read(path):
+    """
+    :return: {shape path: {component: shader}}
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise ValueError('Empty shader map file "{}".'.format(path))
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _decode(buf, path)
+    finally:
+        buf.close()
+
+
+def _decode(buf, path):
+    if len(buf) < _HEADER.size:
+        raise ValueError('Invalid shader map file "{}".'.format(path))
+    magic, version, string_count, record_count = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError('Unsupported shader map file "{}".'.format(path))
+
+    position = _HEADER.size
+    offsets = struct.unpack_from('<{}I'.format(string_count + 1), buf,
+                                 position)
+    position += 4 * (string_count + 1)
+    blob = buf[position:position + offsets[-1]]
+    strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+               for i in range(string_count)]
+    position += offsets[-1]
+    records = struct.unpack_from('<{}i'.format(4 * record_count), buf,
+                                 position)
+
+    geos_shaders_map = {}
+    for i in range(0, len(records), 4):
+        shape_id, shader_id, start, end = records[i:i + 4]
+        if start == WHOLE:
+            part = ''
+        elif start == OTHER:
+            part = strings[end]
+        else:
+            part = face_range.format_component((start, end))
+        geos_shaders_map.setdefault(strings[shape_id], {})[part] = \
+            strings[shader_id]
+    return geos_shaders_map
+
+
+def relative_path(shape, roots):
+    """
+    Path of `shape` in an abc file exported with `roots`:
+        '|set|chair|seat|seatShape', ['|set|chair'] -->
+        '|chair|seat|seatShape'
+    """
+    for root in roots:
+        if shape.startswith(root + '|'):
+            return shape[len(root.rsplit('|', 1)[0]):]
+    return shape
+
+
+def strip_namespaces(path):
+    """
+    '|chair:set|chair:seat|chair:seatShape' --> '|set|seat|seatShape'
+    """
+    return '|'.join(name.rsplit(':', 1)[-1] for name in path.split('|'))
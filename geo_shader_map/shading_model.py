@@ -0,0 +1,274 @@
+"""
+Compact in-memory shading map.
+
+DAG paths are interned in a PathTable, a trie storing each node once as
+(parent id, short name), so a long name shared by thousands of face
+assignments is kept once and compared as an integer. The assignments of a
+ShadingModel are four parallel arrays of (node, shader, first face, last
+face) records, the same layout as the records of shader_map_file:
+
+    model = ShadingModel()
+    node = model.paths.intern('|pCube1|pCubeShape1')
+    model.add(node, 'lambert2SG', [(0, 3), (5, 5)])
+    model.to_shading_map()
+    --> {'lambert2SG': [('|pCube1|pCubeShape1', [(0, 3), (5, 5)])]}
+
+The models convert to and from the shading maps of session and the
+"assigned_shader" maps:
+
+    ShadingModel.from_shader_maps({'|pCube1|pCubeShape1': {'': 'blinn1SG'}})
+    ShadingModel.from_json({'|pCube1|pCubeShape1': '{"": "blinn1SG"}'})
+"""
+import json
+from array import array
+from json.encoder import encode_basestring_ascii
+
+import face_range
+from shader_map_file import OTHER, WHOLE
+
+ROOT = 0
+
+
+def encode_shader_map(shader_map):
+    """
+    Same as json.dumps(shader_map, sort_keys=True), the sorted keys keep the
+    value of an unchanged map the same. Python 2 json only uses its C
+    encoder without sort_keys.
+    """
+    if shader_map is None:
+        return 'null'
+    return '{{{}}}'.format(', '.join(
+        '{}: {}'.format(encode_basestring_ascii(part),
+                        encode_basestring_ascii(shader))
+        for part, shader in sorted(shader_map.items())))
+
+
+class PathTable(object):
+    """
+    Intern table of DAG paths, ids are given in insertion order and ROOT is
+    the id of the world. The interned long names are also kept, the strings
+    given to intern are not copied, so a lookup of a name already interned
+    is a single dict access either way.
+
+        paths = PathTable()
+        paths.intern('|pCube1|pCubeShape1')
+        --> 2
+        paths.find('|pCube1')
+        --> 1
+        paths.parent(2)
+        --> 1
+        paths.path(2)
+        --> '|pCube1|pCubeShape1'
+    """
+    __slots__ = ('_parents', '_names', '_ids', '_by_path', '_paths')
+
+    def __init__(self):
+        self._parents = array('i', [-1])
+        self._names = ['']
+        # {(parent id, short name): id}
+        self._ids = {}
+        # {interned long name: id} and {id: interned long name}
+        self._by_path = {}
+        self._paths = {}
+
+    def __len__(self):
+        return len(self._names) - 1
+
+    def intern(self, long_name):
+        node_id = self._by_path.get(long_name)
+        if node_id is not None:
+            return node_id
+        node_id = ROOT
+        ids = self._ids
+        names = self._names
+        for name in long_name.split('|')[1:]:
+            key = (node_id, name)
+            child_id = ids.get(key)
+            if child_id is None:
+                child_id = ids[key] = len(names)
+                self._parents.append(node_id)
+                names.append(name)
+            node_id = child_id
+        self._by_path[long_name] = node_id
+        self._paths[node_id] = long_name
+        return node_id
+
+    def find(self, long_name):
+        """
+        :return: id of an interned path, None if it was not interned
+        """
+        node_id = self._by_path.get(long_name)
+        if node_id is not None:
+            return node_id
+        node_id = ROOT
+        ids = self._ids
+        for name in long_name.split('|')[1:]:
+            node_id = ids.get((node_id, name))
+            if node_id is None:
+                return None
+        return node_id
+
+    def parent(self, node_id):
+        return self._parents[node_id]
+
+    def name(self, node_id):
+        return self._names[node_id]
+
+    def path(self, node_id):
+        long_name = self._paths.get(node_id)
+        if long_name is not None:
+            return long_name
+        names = []
+        while node_id > ROOT:
+            names.append(self._names[node_id])
+            node_id = self._parents[node_id]
+        names.append('')
+        return '|'.join(reversed(names))
+
+
+class ShadingModel(object):
+    """
+    Face assignments of DAG nodes, see the module docstring. `shaders` and
+    `components` are the string tables of the shader names and of the
+    components which are not face ranges, e.g. '.vtx[0:7]'.
+    """
+    __slots__ = ('paths', 'shaders', 'components', '_shader_ids',
+                 '_component_ids', '_nodes', '_shader_indices', '_starts',
+                 '_ends')
+
+    def __init__(self, paths=None):
+        self.paths = PathTable() if paths is None else paths
+        self.shaders = []
+        self.components = []
+        self._shader_ids = {}
+        self._component_ids = {}
+        self._nodes = array('i')
+        self._shader_indices = array('i')
+        self._starts = array('i')
+        self._ends = array('i')
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @staticmethod
+    def _intern(strings, ids, value):
+        if value not in ids:
+            ids[value] = len(strings)
+            strings.append(value)
+        return ids[value]
+
+    def add(self, node_id, shader, faces=None):
+        """
+        :param node_id: id of the node in `paths`
+        :param faces: None for the whole node, (start, end) intervals or a
+                      component name, see scene_query
+        """
+        shader_id = self._shader_ids.get(shader)
+        if shader_id is None:
+            shader_id = self._intern(self.shaders, self._shader_ids, shader)
+        if faces is None:
+            faces = [(WHOLE, 0)]
+        elif not isinstance(faces, list):
+            faces = [(OTHER, self._intern(
+                self.components, self._component_ids, faces))]
+        for start, end in faces:
+            self._nodes.append(node_id)
+            self._shader_indices.append(shader_id)
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def records(self):
+        """
+        Yield (node id, shader, faces) once per added node and shader, faces
+        as given to add.
+        """
+        shaders = self.shaders
+        # face intervals of the same node and shader are added in a row
+        faces = None
+        for node_id, shader_id, start, end in zip(
+                self._nodes, self._shader_indices, self._starts, self._ends):
+            if start >= 0 and faces is not None and \
+                    node_id == faces_node and shader_id == faces_shader:
+                faces.append((start, end))
+                continue
+            if faces is not None:
+                yield faces_node, shaders[faces_shader], faces
+                faces = None
+            if start == WHOLE:
+                yield node_id, shaders[shader_id], None
+            elif start == OTHER:
+                yield node_id, shaders[shader_id], self.components[end]
+            else:
+                faces_node, faces_shader, faces = node_id, shader_id, \
+                    [(start, end)]
+        if faces is not None:
+            yield faces_node, shaders[faces_shader], faces
+
+    def to_shading_map(self):
+        """
+        :return: {shader: [(long name, faces), ...]}, see
+                 session._get_shading_map
+        """
+        shading_map = {}
+        for node_id, shader, faces in self.records():
+            shading_map.setdefault(shader, []).append(
+                (self.paths.path(node_id), faces))
+        return shading_map
+
+    @classmethod
+    def from_shading_map(cls, shading_map, paths=None):
+        model = cls(paths=paths)
+        for shader, members in shading_map.items():
+            for member, faces in members:
+                model.add(model.paths.intern(member), shader, faces)
+        return model
+
+    def to_shader_maps(self):
+        """
+        :return: {long name: {component: shader}}, the "assigned_shader"
+                 maps of the nodes, face intervals are not merged
+        """
+        shader_maps = {}
+        for node_id, shader, faces in self.records():
+            shader_map = shader_maps.setdefault(self.paths.path(node_id), {})
+            if faces is None:
+                shader_map[''] = shader
+            elif isinstance(faces, list):
+                for interval in faces:
+                    shader_map[face_range.format_component(interval)] = \
+                        shader
+            else:
+                shader_map[faces] = shader
+        return shader_maps
+
+    @classmethod
+    def from_shader_maps(cls, shader_maps, paths=None):
+        model = cls(paths=paths)
+        for geo_shape, shader_map in sorted(shader_maps.items()):
+            node_id = model.paths.intern(geo_shape)
+            for part, shader in sorted((shader_map or {}).items()):
+                interval = face_range.parse(part) if part else None
+                if not part:
+                    model.add(node_id, shader)
+                elif interval is None:
+                    model.add(node_id, shader, part)
+                else:
+                    model.add(node_id, shader, [interval])
+        return model
+
+    def to_json(self):
+        """
+        :return: {long name: "assigned_shader" attribute value}
+        """
+        return dict((geo_shape, encode_shader_map(shader_map))
+                    for geo_shape, shader_map in
+                    self.to_shader_maps().items())
+
+    @classmethod
+    def from_json(cls, values, paths=None):
+        """
+        :param values: {long name: "assigned_shader" attribute value}
+        """
+        return cls.from_shader_maps(
+            dict((geo_shape, json.loads(value))
+                 for geo_shape, value in values.items() if value), paths=paths)
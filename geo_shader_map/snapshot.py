@@ -0,0 +1,132 @@
+from log import Log
+from scene_query import CmdsQuery
+
+
+def _parent_path(long_name):
+    """
+    '|pCube1|pCubeShape1' --> '|pCube1'
+    """
+    return long_name.rsplit('|', 1)[0]
+
+
+def _path_prefixes(long_name):
+    """
+    '|a|b|c' --> ['|a', '|a|b', '|a|b|c']
+    """
+    parts = long_name.split('|')[1:]
+    return ['|' + '|'.join(parts[:i + 1]) for i in range(len(parts))]
+
+
+class SceneSnapshot(object):
+    """
+    In-memory index of the scene data needed to build shading maps.
+
+    Set memberships, long names, node types and leaf shapes are collected
+    with a handful of bulk queries, every later lookup is a dict access.
+    The queries are run by `query`, see scene_query, a CmdsQuery of
+    `cmds_module` by default.
+
+    Usage:
+        snapshot = SceneSnapshot.build(['lambert2SG'], ('mesh',))
+        snapshot.members['lambert2SG']
+        --> [('pCube1', [(0, 3)]), ('pCubeShape2', None)]
+        snapshot.transform('pCube1')
+        --> '|pCube1'
+        snapshot.leaf_shapes('|pCube1', node_type='mesh')
+        --> ['|pCube1|pCubeShape1']
+    """
+
+    def __init__(self, cmds_module=None, query=None):
+        if query is None:
+            query = CmdsQuery(cmds_module=cmds_module)
+        self._query = query
+        # {shading engine: [(node, faces), ...]}, see scene_query
+        self.members = {}
+        # {node name as returned by sets: long name}
+        self.long_names = {}
+        # {long name: node type}
+        self.node_types = {}
+        # {long name: [leaf shape long name, ...]}
+        self.leaves = {}
+
+    @classmethod
+    def build(cls, shading_engines, shape_types, cmds_module=None,
+              query=None):
+        snapshot = cls(cmds_module=cmds_module, query=query)
+        snapshot.collect(shading_engines, shape_types)
+        return snapshot
+
+    def collect(self, shading_engines, shape_types):
+        nodes = []
+        seen = set()
+        for shading_engine in shading_engines:
+            members = self._query.set_members(shading_engine)
+            self.members[shading_engine] = members
+            for node, _ in members:
+                if node not in seen:
+                    seen.add(node)
+                    nodes.append(node)
+
+        if not nodes:
+            return
+
+        self._collect_long_names(nodes)
+        member_long_names = set(self.long_names.values())
+        transforms = sorted(set(self.transform(node) for node in nodes))
+        self.long_names.update((t, t) for t in transforms)
+        self._collect_leaves(transforms,
+                             member_long_names.union(transforms),
+                             shape_types)
+        Log.info('Scene snapshot: {} shading engines, {} nodes, '
+                 '{} transforms.'.format(len(self.members), len(nodes),
+                                         len(transforms)))
+
+    def _collect_long_names(self, nodes):
+        pairs = self._query.node_types(nodes)
+        for node, (long_name, node_type) in zip(nodes, pairs):
+            self.long_names[node] = long_name
+            self.long_names[long_name] = long_name
+            self.node_types[long_name] = node_type
+
+    def _collect_leaves(self, roots, owners, shape_types):
+        """
+        Register every leaf shape below `roots` under each of its ancestors
+        (and itself) which is part of `owners`.
+        """
+        for leaf, node_type in self._query.leaf_shapes(roots, shape_types):
+            self.node_types[leaf] = node_type
+            self.long_names[leaf] = leaf
+            for prefix in _path_prefixes(leaf):
+                if prefix in owners:
+                    self.leaves.setdefault(prefix, []).append(leaf)
+
+    def long_name(self, node):
+        long_name = self.long_names.get(node)
+        if long_name is None:
+            long_name = self._query.long_name(node)
+            self.long_names[node] = long_name
+        return long_name
+
+    def node_type(self, node):
+        return self.node_types.get(self.long_name(node))
+
+    def transform(self, node):
+        """
+        Long name of the node if it is a transform, otherwise the long name of
+        its parent.
+        """
+        long_name = self.long_name(node)
+        if self.node_types.get(long_name) == 'transform':
+            return long_name
+        return _parent_path(long_name)
+
+    def leaf_shapes(self, node, node_type=None):
+        """
+        Same as cmds.ls(node, dag=True, leaf=True, long=True, type=node_type)
+        for the nodes collected in the snapshot.
+        """
+        leaves = self.leaves.get(self.long_name(node), [])
+        if node_type is None:
+            return list(leaves)
+        return [leaf for leaf in leaves
+                if self.node_types.get(leaf) == node_type]
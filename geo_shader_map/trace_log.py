@@ -0,0 +1,79 @@
+"""
+Parser for Maya command trace files written by "cmdFileOutput".
+
+The files are read backwards block by block and parsing stops at the last
+match, so the cost depends on how far from the end the command is, not on
+the size of the file. The lines look as:
+
+    AbcExport -j "-frameRange 1 1 -dataFormat ogawa -root |cube \
+    -file .../cube.abc";
+
+    file -r -type "Alembic"  -ignoreVersion -gl -mergeNamespacesOnClash \
+    false -namespace "cube" -options "v=0;" ".../cube.abc";
+    // Result: .../cube.abc{1} //
+"""
+import io
+import os
+import re
+
+_BLOCK_SIZE = 1 << 16
+
+_ABC_EXPORT_PATTERN = re.compile(
+    r'^AbcExport .*-file \\?"?(?P<path>[^"\\]+?\.abc)\\?"?"?;?$')
+
+_REFERENCE_PATTERN = re.compile(r'^file .*"(?P<path>[^"]+\.abc)";$')
+
+_RESULT_PATTERN = re.compile(
+    r'^// Result: (?P<path>.+\.abc(?:\{\d+\})?) //$')
+
+
+def iter_lines_reversed(path, block_size=_BLOCK_SIZE):
+    """
+    Yield the stripped lines of a text file from the last to the first.
+    """
+    with io.open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b'\n')
+            # the first line may continue in the previous block
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line.decode('utf-8', 'replace').strip()
+        yield remainder.decode('utf-8', 'replace').strip()
+
+
+def find_abc_export_path(path):
+    """
+    :return: file path of the last "AbcExport" command, '' if there is none
+    """
+    for line in iter_lines_reversed(path):
+        matched = _ABC_EXPORT_PATTERN.match(line)
+        if matched:
+            return matched.group('path')
+    return ''
+
+
+def find_reference_path(path):
+    """
+    :return: (file path, reference file path) of the last alembic file
+             reference, e.g. (".../cube.abc", ".../cube.abc{1}"), the
+             reference file path is '' when Maya did not print a result
+    """
+    ref_path = ''
+    for line in iter_lines_reversed(path):
+        matched = _RESULT_PATTERN.match(line)
+        if matched:
+            ref_path = matched.group('path')
+            continue
+        matched = _REFERENCE_PATTERN.match(line)
+        if matched:
+            geo_path = matched.group('path')
+            if ref_path and ref_path.split('{')[0] != geo_path:
+                ref_path = ''
+            return geo_path, ref_path
+    return '', ''
@@ -14,9 +14,12 @@ def onMayaDroppedPythonFile(*args, **kwargs):
     if not os.path.isdir(geo_dir):
         os.makedirs(geo_dir)
 
-    for f in (
-    '__init__.py', 'exporter.py', 'importer.py', 'log.py', 'session.py'):
-        src_file = os.path.join(src, 'geo_shader_map', f)
+    # every module of the package, new ones included
+    src_geo_dir = os.path.join(src, 'geo_shader_map')
+    for f in sorted(os.listdir(src_geo_dir)):
+        if not f.endswith('.py'):
+            continue
+        src_file = os.path.join(src_geo_dir, f)
         dst_file = os.path.join(geo_dir, f)
         logger.info('Copying {} to {}'.format(src_file, dst_file))
         shutil.copy(src_file, dst_file)
@@ -0,0 +1,187 @@
+"""
+Asset index database and its use by the import to find the files of an
+abc file, against a temporary database.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import fake_maya  # noqa: E402
+
+fake_maya.install()
+
+import asset_index  # noqa: E402
+import session  # noqa: E402
+import shader_map_file  # noqa: E402
+
+
+class TestAssetIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'index', 'assets.sqlite')
+        self.index = asset_index.AssetIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.dir)
+
+    def _record(self, name, shading_engines=None, **kwargs):
+        return asset_index.ExportRecord(
+            os.path.join(self.dir, '{}.abc'.format(name)), geo_mtime=1.5,
+            shader_path=os.path.join(self.dir, '{}.ma'.format(name)),
+            shading_engines=shading_engines or {}, **kwargs)
+
+    def test_no_path(self):
+        environ = os.environ.pop('LILISI_ASSET_INDEX', None)
+        try:
+            self.assertIsNone(asset_index.default_path())
+            self.assertRaises(ValueError, asset_index.AssetIndex)
+        finally:
+            if environ is not None:
+                os.environ['LILISI_ASSET_INDEX'] = environ
+
+    def test_schema(self):
+        # nothing is created by a lookup
+        self.assertEqual(self.index.find_exports(['/a.abc']), {})
+        self.assertEqual(self.index.find_assets(shading_engine='a'), [])
+        self.assertFalse(os.path.exists(self.path))
+
+        self.index.record_exports([])
+        connection = sqlite3.connect(self.path)
+        try:
+            tables = set(row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"))
+            version = connection.execute(
+                'PRAGMA user_version').fetchone()[0]
+        finally:
+            connection.close()
+        self.assertEqual(tables, {'exports', 'shading_engines'})
+        self.assertEqual(version, asset_index._VERSION)
+
+    def test_round_trip(self):
+        record = self._record('chair', frame_range=(1, 24),
+                              shader_map_path='/x/chair.shadermap',
+                              geo_fingerprint='3f2a', scene_path='/s.ma')
+        self.index.record_exports([record, self._record('table')])
+        # a new connection reads what the other one wrote
+        self.index.close()
+        records = asset_index.AssetIndex(self.path).find_exports(
+            [record.geo_path, os.path.join(self.dir, 'missing.abc')])
+        self.assertEqual(sorted(records), [record.geo_path])
+        found = records[record.geo_path]
+        for attr in ['geo_mtime', 'shader_path', 'library_map_path',
+                     'shader_map_path', 'geo_fingerprint',
+                     'shader_fingerprint', 'frame_range', 'scene_path']:
+            self.assertEqual(getattr(found, attr), getattr(record, attr))
+        self.assertIsNotNone(found.exported)
+
+    def test_replace(self):
+        self.index.record_exports([self._record('chair')])
+        record = self._record('chair', geo_fingerprint='9b1c')
+        record.geo_mtime = 2.5
+        self.index.record_exports([record])
+        found = self.index.find_exports([record.geo_path])[record.geo_path]
+        self.assertEqual((found.geo_mtime, found.geo_fingerprint),
+                         (2.5, '9b1c'))
+
+    def test_find_assets(self):
+        chair = self._record('chair', {'woodSG': '/lib/wood.ma',
+                                       'metalSG': '/lib/metal.ma'})
+        table = self._record('table', {'woodSG': '/lib/wood.ma'})
+        self.index.record_exports([chair, table])
+        paths = [asset_index.normalize_path(record.geo_path)
+                 for record in (chair, table)]
+        self.assertEqual(self.index.find_assets(shading_engine='woodSG'),
+                         paths)
+        self.assertEqual(self.index.find_assets(shader_path='/lib/metal.ma'),
+                         paths[:1])
+        self.assertEqual(self.index.find_assets(
+            shading_engine='woodSG', shader_path='/lib/metal.ma'), [])
+        self.assertRaises(ValueError, self.index.find_assets)
+
+        # the shading engines of a recorded abc file are replaced
+        self.index.record_exports([self._record('chair',
+                                                {'metalSG': '/lib/a.ma'})])
+        self.assertEqual(self.index.find_assets(shading_engine='woodSG'),
+                         paths[1:])
+
+
+class TestRecordedFiles(unittest.TestCase):
+    """
+    The import uses the recorded files of an abc file only while the abc
+    file is the one which was recorded.
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index_path = session.Session.asset_index_path
+        session.Session.asset_index_path = os.path.join(self.dir,
+                                                        'assets.sqlite')
+        self.geo_path = os.path.join(self.dir, 'chair.abc')
+        self.recorded_path = os.path.join(self.dir, 'recorded.shadermap')
+        for path in [self.geo_path, os.path.join(self.dir, 'chair.ma')]:
+            open(path, 'w').close()
+        shader_map_file.write(os.path.join(self.dir, 'chair.shadermap'),
+                              {'|chair|seatShape': {'': 'probedSG'}})
+        shader_map_file.write(self.recorded_path,
+                              {'|chair|seatShape': {'': 'recordedSG'}})
+
+    def tearDown(self):
+        session.Session.asset_index_path = self.index_path
+        shutil.rmtree(self.dir)
+
+    def _record(self, geo_mtime):
+        index = asset_index.AssetIndex(session.Session.asset_index_path)
+        try:
+            index.record_exports([asset_index.ExportRecord(
+                self.geo_path, geo_mtime=geo_mtime,
+                shader_path=os.path.join(self.dir, 'recorded.ma'),
+                shader_map_path=self.recorded_path)])
+        finally:
+            index.close()
+
+    def _find(self):
+        cache = session._find_cache_files([self.geo_path])[0]
+        self.assertEqual(cache.error, '')
+        return cache
+
+    def test_current_record(self):
+        self._record(os.path.getmtime(self.geo_path))
+        cache = self._find()
+        self.assertEqual(cache.shader_map_path, self.recorded_path)
+        self.assertEqual(cache.file_shader_maps,
+                         {'|chair|seatShape': {'': 'recordedSG'}})
+
+    def test_stale_record(self):
+        self._record(os.path.getmtime(self.geo_path) - 10)
+        cache = self._find()
+        self.assertEqual(cache.shader_path,
+                         os.path.join(self.dir, 'chair.ma'))
+        self.assertEqual(cache.file_shader_maps,
+                         {'|chair|seatShape': {'': 'probedSG'}})
+
+    def test_unreadable_record(self):
+        self._record(os.path.getmtime(self.geo_path))
+        os.remove(self.recorded_path)
+        self.assertEqual(self._find().file_shader_maps,
+                         {'|chair|seatShape': {'': 'probedSG'}})
+
+    def test_disabled(self):
+        self._record(os.path.getmtime(self.geo_path))
+        session.Session.asset_index_path = None
+        self.assertEqual(self._find().file_shader_maps,
+                         {'|chair|seatShape': {'': 'probedSG'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Batch manifests, retries, timeouts and reports, with a stand-in for mayapy
+which runs the Python of the tests instead of exporting.
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import batch  # noqa: E402
+
+# called as "mayapy batch.py --worker <job json>", the job name selects
+# what it does, "flaky" fails the first time
+_MAYAPY = '''#!{executable}
+import json
+import os
+import sys
+import time
+
+job = json.loads(sys.argv[3])
+print('worker ' + job['name'])
+if job['name'] == 'fail':
+    sys.exit(1)
+if job['name'] == 'hang':
+    time.sleep(30)
+if job['name'] == 'flaky':
+    flag = job['output'] + '.failed'
+    if not os.path.exists(flag):
+        open(flag, 'w').close()
+        sys.exit(3)
+'''
+
+
+@unittest.skipIf(sys.platform == 'win32', 'the mayapy stand-in is a script')
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.mayapy = os.path.join(self.dir, 'mayapy')
+        with open(self.mayapy, 'w') as f:
+            f.write(_MAYAPY.format(executable=sys.executable))
+        os.chmod(self.mayapy, os.stat(self.mayapy).st_mode | stat.S_IEXEC)
+        self.log_dir = os.path.join(self.dir, 'logs')
+        os.mkdir(self.log_dir)
+        self.poll_interval = batch._POLL_INTERVAL
+        batch._POLL_INTERVAL = 0.05
+
+    def tearDown(self):
+        batch._POLL_INTERVAL = self.poll_interval
+        shutil.rmtree(self.dir)
+
+    def _write_manifest(self, data):
+        path = os.path.join(self.dir, 'jobs.json')
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        return path
+
+    def _job(self, name):
+        return batch.Job('/assets/{}.ma'.format(name),
+                         os.path.join(self.dir, '{}.abc'.format(name)))
+
+    def test_load_manifest(self):
+        jobs = batch.load_manifest(self._write_manifest(
+            [{'scene': '/a/chair.ma', 'output': '/p/chair.abc',
+              'roots': ['|chair'], 'frame_range_mode': 'keyed',
+              'incremental': True},
+             {'scene': '/b/chair.ma', 'output': '/q/chair.abc'},
+             {'scene': '/c/chair.ma', 'output': '/r/chair.abc'}]))
+        self.assertEqual([job.name for job in jobs],
+                         ['chair', 'chair_1', 'chair_2'])
+        self.assertEqual(jobs[0].to_dict(), {
+            'scene': '/a/chair.ma', 'output': '/p/chair.abc',
+            'roots': ['|chair'], 'name': 'chair',
+            'frame_range_mode': 'keyed', 'split_roots': False,
+            'library_dir': '', 'incremental': True})
+        self.assertEqual(jobs[1].roots, [])
+        self.assertEqual(jobs[1].frame_range_mode, 'scene')
+
+        jobs = batch.load_manifest(self._write_manifest(
+            {'jobs': [{'scene': '/a.ma', 'output': '/a.abc', 'name': 'x'}]}))
+        self.assertEqual([job.name for job in jobs], ['x'])
+
+        path = self._write_manifest([{'scene': '/a.ma'}])
+        self.assertRaises(batch.BatchException, batch.load_manifest, path)
+
+    def test_run_job(self):
+        summary = batch.run_job(self._job('chair'), mayapy=self.mayapy,
+                                log_dir=self.log_dir)
+        self.assertEqual(summary['status'], 'ok')
+        self.assertEqual([a['return_code'] for a in summary['attempts']],
+                         [0])
+        with open(summary['log']) as f:
+            self.assertEqual(f.read(), 'worker chair\n')
+
+    def test_retries(self):
+        summary = batch.run_job(self._job('fail'), mayapy=self.mayapy,
+                                retries=2, log_dir=self.log_dir)
+        self.assertEqual(summary['status'], 'failed')
+        self.assertEqual([a['return_code'] for a in summary['attempts']],
+                         [1, 1, 1])
+
+        summary = batch.run_job(self._job('flaky'), mayapy=self.mayapy,
+                                retries=2, log_dir=self.log_dir)
+        self.assertEqual(summary['status'], 'ok')
+        self.assertEqual([a['status'] for a in summary['attempts']],
+                         ['failed', 'ok'])
+        self.assertEqual(summary['attempts'][0]['return_code'], 3)
+
+    def test_timeout(self):
+        summary = batch.run_job(self._job('hang'), mayapy=self.mayapy,
+                                timeout=0.5, retries=1, log_dir=self.log_dir)
+        self.assertEqual(summary['status'], 'timeout')
+        self.assertEqual(len(summary['attempts']), 2)
+        for attempt in summary['attempts']:
+            self.assertIsNone(attempt['return_code'])
+            self.assertLess(attempt['wall_time'], 10)
+
+    def test_main(self):
+        manifest = self._write_manifest([
+            self._job(name).to_dict()
+            for name in ['chair', 'fail', 'hang', 'flaky']])
+        return_code = batch.main(
+            [manifest, '--workers', '4', '--timeout', '0.5', '--retries',
+             '1', '--mayapy', self.mayapy, '--log-dir', self.log_dir])
+        self.assertEqual(return_code, 1)
+
+        with open(os.path.join(self.dir, 'jobs.report.json')) as f:
+            report = json.load(f)
+        self.assertEqual(report['total'], 4)
+        self.assertEqual(report['succeeded'], 2)
+        self.assertEqual(sorted(report['failed']), ['fail', 'hang'])
+        self.assertEqual(report['log_dir'], self.log_dir)
+        statuses = dict((job['name'], [a['status'] for a in job['attempts']])
+                        for job in report['jobs'])
+        self.assertEqual(statuses, {'chair': ['ok'],
+                                    'fail': ['failed', 'failed'],
+                                    'hang': ['timeout', 'timeout'],
+                                    'flaky': ['failed', 'ok']})
+
+        report_path = os.path.join(self.dir, 'report.json')
+        self.assertEqual(batch.main(
+            [manifest, '--timeout', '0.5', '--mayapy', self.mayapy,
+             '--log-dir', self.log_dir, '--report', report_path]), 1)
+        self.assertTrue(os.path.isfile(report_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Face ranges parsed, merged and written back to components.
+
+    python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import face_range  # noqa: E402
+
+
+def _faces(intervals):
+    return set(face for start, end in intervals
+               for face in range(start, end + 1))
+
+
+def _random_intervals(rng, size, faces=1000):
+    intervals = []
+    for _ in range(size):
+        start = rng.randrange(faces)
+        intervals.append((start, start + rng.randrange(8)))
+    return intervals
+
+
+class TestComponents(unittest.TestCase):
+
+    def test_format_parse(self):
+        for interval in [(0, 0), (0, 3), (4, 4), (17, 1023)]:
+            component = face_range.format_component(interval)
+            self.assertEqual(face_range.parse(component), interval)
+        self.assertEqual(face_range.format_components([(0, 3), (5, 5)]),
+                         ['.f[0:3]', '.f[5]'])
+
+    def test_parse(self):
+        self.assertEqual(face_range.parse('|pCube1|pCubeShape1.f[4]'),
+                         (4, 4))
+        self.assertEqual(face_range.parse('.f[7:2]'), (2, 7))
+        for component in ['.f[*]', '.vtx[0:7]', '.f[1:*]', '']:
+            self.assertIsNone(face_range.parse(component))
+
+    def test_split_component(self):
+        for node in ['|pCube1|pCubeShape1', 'ns:pCube1']:
+            for component in ['.f[0:3]', '.f[4]', '']:
+                self.assertEqual(
+                    face_range.split_component(node + component),
+                    (node, component))
+
+
+class TestIntervals(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def test_merge(self):
+        self.assertEqual(
+            face_range.merge([(4, 4), (0, 3), (6, 8), (7, 9)]),
+            [(0, 4), (6, 9)])
+        self.assertEqual(face_range.merge([]), [])
+
+    def _check_merged(self, intervals, merged):
+        self.assertEqual(_faces(merged), _faces(intervals))
+        for (_, end), (start, _) in zip(merged, merged[1:]):
+            # sorted, not overlapping and not adjacent
+            self.assertGreater(start, end + 1)
+
+    def test_merge_large(self):
+        # above the size NumPy is used at when it is installed
+        intervals = _random_intervals(self.rng, 500)
+        merged = face_range.merge(intervals)
+        self._check_merged(intervals, merged)
+
+        numpy = face_range._numpy
+        face_range._numpy = False
+        try:
+            self.assertEqual(face_range.merge(intervals), merged)
+        finally:
+            face_range._numpy = numpy
+
+    def test_from_indices(self):
+        self.assertEqual(face_range.from_indices([5, 0, 1, 2, 3]),
+                         [(0, 3), (5, 5)])
+        self.assertEqual(face_range.from_indices([]), [])
+        indices = [self.rng.randrange(1000) for _ in range(500)]
+        intervals = face_range.from_indices(indices)
+        self._check_merged([(index, index) for index in indices],
+                           intervals)
+
+    def test_intersect_subtract(self):
+        intervals = face_range.merge(_random_intervals(self.rng, 50))
+        other = face_range.merge(_random_intervals(self.rng, 50))
+        self.assertEqual(
+            _faces(face_range.intersect(intervals, other)),
+            _faces(intervals) & _faces(other))
+        self.assertEqual(
+            _faces(face_range.subtract(intervals, other)),
+            _faces(intervals) - _faces(other))
+        self.assertEqual(
+            face_range.count(intervals), len(_faces(intervals)))
+
+
+class TestCompact(unittest.TestCase):
+
+    def test_compact_shader_map(self):
+        shader_map = {'.f[0:3]': 'lambert2SG', '.f[4]': 'lambert2SG',
+                      '.f[5]': 'blinn1SG', '.vtx[0:7]': 'blinn1SG'}
+        self.assertEqual(face_range.compact_shader_map(shader_map),
+                         {'.f[0:4]': 'lambert2SG', '.f[5]': 'blinn1SG',
+                          '.vtx[0:7]': 'blinn1SG'})
+
+    def test_overlaps(self):
+        # later claims win, as the "sets -forceElement" edits in order
+        resolved, overlaps = face_range.resolve_overlaps(
+            [('lambert2SG', [(0, 9)]), ('blinn1SG', [(5, 12)])])
+        self.assertEqual(resolved, {'lambert2SG': [(0, 4)],
+                                    'blinn1SG': [(5, 12)]})
+        self.assertEqual(overlaps, [('lambert2SG', 'blinn1SG', [(5, 9)])])
+
+    def test_round_trip(self):
+        rng = random.Random(1)
+        shaders = ['lambert{}SG'.format(i) for i in range(4)]
+        claims = [(rng.choice(shaders), _random_intervals(rng, 5, faces=100))
+                  for _ in range(20)]
+        # the faces of a shading engine are claimed together, in the order
+        # of its first claim, and later ones win
+        order = []
+        for shader, _ in claims:
+            if shader not in order:
+                order.append(shader)
+        owners = {}
+        for shader in order:
+            owners.update((face, shader) for face in _faces(
+                [interval for claimer, intervals in claims
+                 if claimer == shader for interval in intervals]))
+
+        compacted, _ = face_range.compact_face_assignments(
+            [(intervals, shader) for shader, intervals in claims])
+        compacted_owners = {}
+        for component, shader in compacted.items():
+            faces = _faces([face_range.parse(component)])
+            self.assertFalse(faces & set(compacted_owners))
+            compacted_owners.update((face, shader) for face in faces)
+        self.assertEqual(compacted_owners, owners)
+
+
+if __name__ == '__main__':
+    unittest.main()
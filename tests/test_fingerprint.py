@@ -0,0 +1,203 @@
+"""
+Geometry and shading network fingerprints and the incremental export which
+skips the files whose fingerprint did not change, on the maya stand-in of
+benchmarks/fake_maya.py.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import fake_maya  # noqa: E402
+import scene  # noqa: E402
+
+cmds = fake_maya.install()
+
+import fingerprint  # noqa: E402
+import session  # noqa: E402
+
+
+def _build_network(shading_engine, prefix, diffuse=0.5):
+    """
+    <prefix>_p2d -> <prefix>_file -> <prefix>_mat -> shading_engine
+    """
+    mat, file_node, p2d = ['|{}_{}'.format(prefix, name)
+                           for name in ['mat', 'file', 'p2d']]
+    cmds.create_node(mat, 'lambert')
+    cmds.create_node(file_node, 'file')
+    cmds.create_node(p2d, 'place2dTexture')
+    cmds.values[mat] = {'diffuse': diffuse}
+    cmds.connect(mat + '.outColor', '|{}.surfaceShader'.format(shading_engine))
+    cmds.connect(file_node + '.outColor', mat + '.color')
+    cmds.connect(p2d + '.outUV', file_node + '.uvCoord')
+    return mat
+
+
+class TestGeometry(unittest.TestCase):
+
+    def setUp(self):
+        self.shapes = scene.build_export_scene(
+            cmds, scene.SceneSpec(shapes=4, shading_engines=2, faces=8,
+                                  face_ranges=2, shapes_per_asset=2))
+
+    def _digest(self, exact=False):
+        return fingerprint.geometry(self.shapes, {}, roots=['|set'],
+                                    exact=exact, cmds_module=cmds)
+
+    def test_unchanged(self):
+        for exact in [False, True]:
+            self.assertEqual(self._digest(exact), self._digest(exact))
+
+    def test_points(self):
+        for exact in [False, True]:
+            digest = self._digest(exact)
+            points = cmds.xform(self.shapes[1] + '.vtx[*]', query=True,
+                                objectSpace=True, translation=True)
+            points[0] += 1.0
+            cmds.values[self.shapes[1]] = {'points': points}
+            self.assertNotEqual(self._digest(exact), digest)
+
+    def test_sampled_points(self):
+        # a point between the samples inside the bounding box is only seen
+        # by the exact fingerprint
+        cmds.face_counts[self.shapes[0]] = 200
+        points = cmds.xform(self.shapes[0] + '.vtx[*]', query=True,
+                            objectSpace=True, translation=True)
+        digests = self._digest(), self._digest(exact=True)
+        points[4] += 0.5
+        cmds.values[self.shapes[0]] = {'points': points}
+        self.assertEqual(self._digest(), digests[0])
+        self.assertNotEqual(self._digest(exact=True), digests[1])
+
+    def test_topology(self):
+        digest = self._digest()
+        cmds.face_counts[self.shapes[2]] += 1
+        self.assertNotEqual(self._digest(), digest)
+
+    def test_transform(self):
+        digest = self._digest()
+        transform = self.shapes[3].rsplit('|', 1)[0]
+        cmds.values[transform] = {'matrix': [2.0, 0.0, 0.0, 0.0,
+                                             0.0, 1.0, 0.0, 0.0,
+                                             0.0, 0.0, 1.0, 0.0,
+                                             0.0, 0.0, 0.0, 1.0]}
+        self.assertNotEqual(self._digest(), digest)
+
+    def test_shader_map(self):
+        digest = fingerprint.geometry(
+            self.shapes, {self.shapes[0]: {'': 'lambert0SG'}},
+            roots=['|set'], cmds_module=cmds)
+        self.assertNotEqual(self._digest(), digest)
+
+    def test_time_driven(self):
+        cmds.create_node('|time1', 'time')
+        cmds.connect('|time1.outTime',
+                     self.shapes[0].rsplit('|', 1)[0] + '.translateX')
+        self.assertIsNone(self._digest())
+
+
+class TestShadingNetwork(unittest.TestCase):
+
+    def setUp(self):
+        cmds.reset()
+        cmds.create_shading_engine('aSG')
+        self.mat = _build_network('aSG', 'a')
+
+    def _digest(self, names):
+        return fingerprint.shading_network(['aSG'], cmds_module=cmds,
+                                           names=names)
+
+    def test_unchanged(self):
+        for names in [True, False]:
+            self.assertEqual(self._digest(names), self._digest(names))
+
+    def test_value(self):
+        digests = self._digest(True), self._digest(False)
+        cmds.values[self.mat]['diffuse'] = 0.7
+        self.assertNotEqual(self._digest(True), digests[0])
+        self.assertNotEqual(self._digest(False), digests[1])
+
+    def test_connection(self):
+        digests = self._digest(True), self._digest(False)
+        cmds.connect('|a_p2d.outUV', self.mat + '.ambientColor')
+        self.assertNotEqual(self._digest(True), digests[0])
+        self.assertNotEqual(self._digest(False), digests[1])
+
+    def test_history_ignored(self):
+        digest = self._digest(True)
+        cmds.create_node('|cube', 'transform')
+        cmds.create_node('|cube|cubeShape', 'mesh', face_count=6)
+        cmds.create_node('|tweak1', 'tweak')
+        cmds.create_node('|groupId1', 'groupId')
+        cmds.connect('|tweak1.outputGeometry', '|cube|cubeShape.inMesh')
+        cmds.connect('|groupId1.message', '|aSG.groupNodes')
+        cmds.assign('|cube|cubeShape', 'aSG')
+        self.assertEqual(self._digest(True), digest)
+
+    def test_renamed(self):
+        digests = self._digest(True), self._digest(False)
+        cmds.reset()
+        cmds.create_shading_engine('aSG')
+        _build_network('aSG', 'renamed')
+        self.assertNotEqual(self._digest(True), digests[0])
+        self.assertEqual(self._digest(False), digests[1])
+
+
+class TestIncrementalExport(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.geo_path = os.path.join(self.dir, 'set.abc')
+        self.shader_path = os.path.join(self.dir, 'set.ma')
+        self.shapes = scene.build_export_scene(
+            cmds, scene.SceneSpec(shapes=6, shading_engines=2, faces=8,
+                                  face_ranges=2, shapes_per_asset=3))
+        self.mat = _build_network('lambert0SG', 'wood')
+        self._export()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _export(self):
+        """
+        :return: paths of the files written by an incremental export
+        """
+        written = len(cmds.written_files)
+        session.Session.export_to_path(self.geo_path, roots=['|set'],
+                                       scene_ext='ma', incremental=True)
+        return cmds.written_files[written:]
+
+    def test_unchanged(self):
+        self.assertEqual(self._export(), [])
+
+    def test_geometry_changed(self):
+        cmds.face_counts[self.shapes[0]] += 1
+        self.assertEqual(self._export(), [self.geo_path])
+        self.assertEqual(self._export(), [])
+
+    def test_shaders_changed(self):
+        cmds.values[self.mat]['diffuse'] = 0.7
+        self.assertEqual(self._export(), [self.shader_path])
+        self.assertEqual(self._export(), [])
+
+    def test_missing_file(self):
+        os.remove(self.shader_path)
+        self.assertEqual(self._export(), [self.shader_path])
+
+    def test_not_incremental(self):
+        written = len(cmds.written_files)
+        session.Session.export_to_path(self.geo_path, roots=['|set'],
+                                       scene_ext='ma')
+        self.assertEqual(sorted(cmds.written_files[written:]),
+                         [self.geo_path, self.shader_path])
+
+
+if __name__ == '__main__':
+    unittest.main()
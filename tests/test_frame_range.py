@@ -0,0 +1,99 @@
+"""
+Nodes driving the exported roots and the keyed frame range found from
+them, on the maya stand-in of benchmarks/fake_maya.py.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import fake_maya  # noqa: E402
+import scene  # noqa: E402
+
+cmds = fake_maya.install()
+
+from exporter import Geo_Exporter, KEYED_RANGE, SCENE_RANGE  # noqa: E402
+
+
+class TestFrameRange(unittest.TestCase):
+
+    def setUp(self):
+        shapes = scene.build_export_scene(
+            cmds, scene.SceneSpec(shapes=4, shading_engines=2,
+                                  shapes_per_asset=2))
+        cmds.playback = (1, 100)
+        # '|set|asset_0000'
+        self.root = shapes[0].rsplit('|', 2)[0]
+        self.transform = shapes[0].rsplit('|', 1)[0]
+
+    def _keyed_range(self):
+        return Geo_Exporter.find_frame_range([self.root], mode=KEYED_RANGE)
+
+    def test_upstream_nodes(self):
+        nodes = Geo_Exporter.find_upstream_nodes([self.root])
+        self.assertIn(self.transform, nodes)
+        self.assertIn(self.transform + '|mesh_000000Shape', nodes)
+        # ancestors, but not the siblings of the root
+        self.assertIn('|set', nodes)
+        self.assertNotIn('|set|asset_0001', nodes)
+
+    def test_static_root(self):
+        self.assertEqual(self._keyed_range(), (1, 1))
+        self.assertEqual(
+            Geo_Exporter.find_frame_range([self.root], mode=SCENE_RANGE),
+            (1, 1))
+        # animation of an other root is not followed in keyed mode
+        cmds.animate('|set|asset_0001', 'translateX', [(5, 0), (20, 1)])
+        self.assertEqual(self._keyed_range(), (1, 1))
+        self.assertEqual(
+            Geo_Exporter.find_frame_range([self.root], mode=SCENE_RANGE),
+            (1, 100))
+
+    def test_animated_parent(self):
+        curve = cmds.animate('|set', 'translateX', [(5, 0), (20, 1)])
+        self.assertIn(curve, Geo_Exporter.find_upstream_nodes([self.root]))
+        self.assertEqual(Geo_Exporter.find_animation_curves([self.root]),
+                         cmds.ls(curve))
+        self.assertEqual(self._keyed_range(), (5, 20))
+
+    def test_driver_parent(self):
+        # the root follows a control whose parent is animated
+        cmds.create_node('|rig', 'transform')
+        cmds.create_node('|rig|ctrl', 'transform')
+        cmds.connect('|rig|ctrl.translateX', self.transform + '.translateX')
+        curve = cmds.animate('|rig', 'rotateY', [(12, 0), (30.5, 90)],
+                             curve_type='animCurveTA')
+        nodes = Geo_Exporter.find_upstream_nodes([self.root])
+        self.assertTrue(set(['|rig|ctrl', '|rig', curve]).issubset(nodes))
+        self.assertEqual(self._keyed_range(), (12, 31))
+
+    def test_clipped_to_playback(self):
+        cmds.playback = (10, 50)
+        cmds.animate(self.transform, 'translateY', [(-5, 0), (80, 1)])
+        self.assertEqual(self._keyed_range(), (10, 50))
+
+        cmds.playback = (100, 120)
+        self.assertEqual(self._keyed_range(), (100, 100))
+
+    def test_infinity(self):
+        cmds.animate(self.transform, 'translateY', [(5, 0), (20, 1)],
+                     infinity='cycle')
+        self.assertEqual(self._keyed_range(), (1, 100))
+
+    def test_time_node(self):
+        cmds.create_node('|time1', 'time')
+        cmds.connect('|time1.outTime', self.transform + '.translateZ')
+        self.assertEqual(self._keyed_range(), (1, 100))
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, Geo_Exporter.find_frame_range,
+                          [self.root], mode='shot')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+The scene query backends find the same members, node types and leaf shapes
+on the maya stand-in of benchmarks/fake_maya.py.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import face_range  # noqa: E402
+import fake_maya  # noqa: E402
+import scene  # noqa: E402
+import scene_query  # noqa: E402
+
+
+class TestSceneQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.cmds = fake_maya.install()
+        self.spec = scene.SceneSpec(shapes=40, shading_engines=4,
+                                    face_ratio=0.5, shapes_per_asset=10)
+        self.shapes = scene.build_export_scene(self.cmds, self.spec)
+        self.cmds_query = scene_query.get(scene_query.CMDS,
+                                          cmds_module=self.cmds)
+        self.open_maya_query = scene_query.get(scene_query.OPENMAYA)
+
+    def test_backends(self):
+        self.assertIsInstance(self.cmds_query, scene_query.CmdsQuery)
+        self.assertIsInstance(self.open_maya_query,
+                              scene_query.OpenMayaQuery)
+        self.assertRaises(ValueError, scene_query.get, 'mel')
+
+    @staticmethod
+    def _shape_members(query, members):
+        """
+        :return: {shape long name: merged faces or None}, cmds names the
+                 transform of a face member and one member per face range
+        """
+        shape_members = {}
+        for node, faces in members:
+            for shape, _ in query.leaf_shapes([query.long_name(node)],
+                                              ['mesh']):
+                if faces is None:
+                    shape_members[shape] = None
+                else:
+                    shape_members[shape] = face_range.merge(
+                        shape_members.get(shape, []) + faces)
+        return shape_members
+
+    def test_set_members(self):
+        for shading_engine in scene.shading_engine_names(self.spec):
+            members = self._shape_members(
+                self.open_maya_query,
+                self.open_maya_query.set_members(shading_engine))
+            self.assertTrue(members)
+            self.assertEqual(self._shape_members(
+                self.cmds_query,
+                self.cmds_query.set_members(shading_engine)), members)
+
+    def test_set_members_faces(self):
+        self.cmds.reset()
+        self.cmds.create_node('|cube', 'transform')
+        self.cmds.create_node('|cube|cubeShape', 'mesh', face_count=10)
+        self.cmds.create_shading_engine('lambert2SG')
+        self.cmds.create_shading_engine('blinn1SG')
+        self.cmds.assign('|cube|cubeShape', 'lambert2SG', [(0, 3), (5, 5)])
+        self.cmds.assign('|cube|cubeShape', 'blinn1SG', [(4, 4), (6, 9)])
+        self.assertEqual(self.cmds_query.set_members('lambert2SG'),
+                         [('cube', [(0, 3)]), ('cube', [(5, 5)])])
+        self.assertEqual(self.open_maya_query.set_members('lambert2SG'),
+                         [('|cube|cubeShape', [(0, 3), (5, 5)])])
+        for query in (self.cmds_query, self.open_maya_query):
+            self.assertEqual(
+                self._shape_members(query, query.set_members('blinn1SG')),
+                {'|cube|cubeShape': [(4, 4), (6, 9)]})
+
+    def test_node_types(self):
+        nodes = [shape.rsplit('|', 1)[1] for shape in self.shapes[:5]]
+        nodes += [self.shapes[5], self.shapes[5].rsplit('|', 1)[0], '|set']
+        expected = [(self.cmds_query.long_name(node),
+                     self.cmds.nodeType(node)) for node in nodes]
+        self.assertEqual(self.cmds_query.node_types(nodes), expected)
+        self.assertEqual(self.open_maya_query.node_types(nodes), expected)
+
+    def test_node_types_same_node(self):
+        # the same node under its short and long names
+        nodes = [self.shapes[0], self.shapes[0].rsplit('|', 1)[1]]
+        expected = [(self.shapes[0], 'mesh')] * 2
+        self.assertEqual(self.cmds_query.node_types(nodes), expected)
+        self.assertEqual(self.open_maya_query.node_types(nodes), expected)
+
+    def test_leaf_shapes(self):
+        roots = ['|set|asset_0001', '|set|asset_0003']
+        expected = [(shape, 'mesh') for shape in self.shapes
+                    if shape.startswith(tuple(root + '|'
+                                              for root in roots))]
+        self.assertEqual(len(expected), 20)
+        self.assertEqual(
+            sorted(self.cmds_query.leaf_shapes(roots, ['mesh'])), expected)
+        self.assertEqual(
+            sorted(self.open_maya_query.leaf_shapes(roots, ['mesh'])),
+            expected)
+
+    def test_leaf_shapes_types(self):
+        self.assertEqual(self.cmds_query.leaf_shapes(['|set'], ['camera']),
+                         [])
+        self.assertEqual(
+            self.open_maya_query.leaf_shapes(['|set'], ['camera']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
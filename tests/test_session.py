@@ -0,0 +1,170 @@
+"""
+Bulk shader assignment on import, the scene edits, the export dialogs and
+the background file tasks of the Session methods, on the maya stand-in of
+benchmarks/fake_maya.py.
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import fake_maya  # noqa: E402
+import scene  # noqa: E402
+
+cmds = fake_maya.install()
+
+import session  # noqa: E402
+
+
+class TestBulkAssign(unittest.TestCase):
+
+    def setUp(self):
+        self.spec = scene.SceneSpec(shapes=30, shading_engines=3,
+                                    face_ratio=0.5, shapes_per_asset=10)
+        self.shapes = scene.build_import_scene(cmds, self.spec)
+
+    def _set_shader_map(self, shape, shader_map):
+        cmds.attrs[shape] = {session._SHADER_ATTR: {
+            'value': json.dumps(shader_map), 'locked': True}}
+
+    def test_assigned_shader_maps(self):
+        shader_maps = session._get_assigned_shader_maps(self.shapes)
+        self.assertEqual(sorted(shader_maps), sorted(self.shapes))
+        for shape in self.shapes:
+            self.assertEqual(
+                shader_maps[shape],
+                json.loads(cmds.attrs[shape][session._SHADER_ATTR]['value']))
+
+    def test_assigned_shader_maps_long_names(self):
+        # a shape whose short name is unique and one sharing it
+        cmds.create_node('|asset:other', 'transform')
+        cmds.create_node('|asset:other|asset:mesh_000000Shape', 'mesh',
+                         face_count=4)
+        self._set_shader_map('|asset:other|asset:mesh_000000Shape',
+                             {'': 'lambert1SG'})
+        del cmds.attrs[self.shapes[2]]
+        shapes = self.shapes[:3] + ['|asset:other|asset:mesh_000000Shape']
+        self.assertEqual(
+            sorted(session._get_assigned_shader_maps(shapes)),
+            sorted(shapes[:2] + shapes[3:]))
+
+    def test_assign_in_bulk(self):
+        shader_maps = session._get_assigned_shader_maps(self.shapes)
+        for chunk_size in [None, 2]:
+            self.shapes = scene.build_import_scene(cmds, self.spec)
+            session._assign_shaders_in_bulk('shd', self.shapes,
+                                            chunk_size=chunk_size)
+            self.assertFalse(
+                session._get_changed_components('shd', shader_maps))
+
+    def test_assign_legacy(self):
+        # one "sets" edit per component, as before the bulk assignment
+        shader_maps = session._get_assigned_shader_maps(self.shapes)
+        session._assign_shader_to_geometry('shd', self.shapes)
+        self.assertFalse(
+            session._get_changed_components('shd', shader_maps))
+
+        self.shapes = scene.build_import_scene(cmds, self.spec)
+        session._assign_shader_to_geometry('shd', self.shapes,
+                                           shader_maps=shader_maps)
+        self.assertFalse(
+            session._get_changed_components('shd', shader_maps))
+
+
+class TestSceneEdits(unittest.TestCase):
+
+    def setUp(self):
+        cmds.reset()
+
+    def test_refresh_restored(self):
+        for suspended in [False, True]:
+            cmds.refresh(suspend=suspended)
+            with session._scene_edits('test'):
+                self.assertTrue(cmds.refresh_suspended)
+            self.assertEqual(cmds.refresh_suspended, suspended)
+
+    def test_error(self):
+        cmds.create_node('|cube', 'transform')
+        cmds.select('|cube', replace=True)
+        with self.assertRaises(ValueError):
+            with session._scene_edits('test'):
+                cmds.select(clear=True)
+                raise ValueError()
+        self.assertFalse(cmds.refresh_suspended)
+        self.assertEqual(cmds.ls(sl=True, long=True), ['|cube'])
+        self.assertEqual(cmds.undo_chunk, 0)
+
+
+class TestExportScene(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.shapes = scene.build_export_scene(
+            cmds, scene.SceneSpec(shapes=4, shading_engines=2))
+        cmds.export_path = os.path.join(self.dir, 'set.abc')
+        cmds.select('|set', replace=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _file_dialogs(self):
+        return [dialog for dialog in cmds.dialogs if 'fileMode' in dialog]
+
+    def test_alembic_dialog(self):
+        # Maya's dialog by default, the path is found in the trace
+        session.Session.export_scene()
+        self.assertEqual(self._file_dialogs(), [])
+        self.assertEqual(cmds.written_files,
+                         [cmds.export_path,
+                          os.path.join(self.dir, 'set.ma')])
+
+    def test_file_path(self):
+        session.Session.export_scene(alembic_dialog=False)
+        self.assertEqual(len(self._file_dialogs()), 1)
+        self.assertEqual(sorted(cmds.written_files),
+                         [cmds.export_path,
+                          os.path.join(self.dir, 'set.ma')])
+
+
+class TestBackgroundTasks(unittest.TestCase):
+
+    def tearDown(self):
+        session._close_thread_pools(join=True)
+
+    def test_pool_size(self):
+        results = []
+        tasks = session._BackgroundTasks(workers=2)
+        tasks.submit('append 1', results.append, 1)
+        pool = session._thread_pools[2]
+        # a new size closes the pool of the previous one, its queued tasks
+        # still run
+        other_tasks = session._BackgroundTasks(workers=3)
+        other_tasks.submit('append 2', results.append, 2)
+        self.assertEqual(list(session._thread_pools), [3])
+        tasks.join()
+        other_tasks.join()
+        pool.join()
+        self.assertEqual(sorted(results), [1, 2])
+
+    def test_close(self):
+        tasks = session._BackgroundTasks(workers=2)
+        tasks.submit('fail', int, 'x')
+        pool = session._thread_pools[2]
+        session._close_thread_pools(join=True)
+        self.assertEqual(session._thread_pools, {})
+        self.assertRaises(session.SessionException, tasks.join)
+        # a closed pool asserts on Python 2
+        self.assertRaises((AssertionError, ValueError), pool.apply_async,
+                          int)
+
+
+if __name__ == '__main__':
+    unittest.main()
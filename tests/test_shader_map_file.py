@@ -0,0 +1,83 @@
+"""
+Shader maps written to the binary sidecar file and read back.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import shader_map_file  # noqa: E402
+
+
+class TestShaderMapFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'chair.shadermap')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        geos_shaders_map = {
+            '|chair|seat|seatShape': {'': 'lambert2SG'},
+            '|chair|back|backShape': {'.f[0:3]': 'lambert2SG',
+                                      '.f[4]': 'blinn1SG',
+                                      '.vtx[0:7]': 'blinn1SG'},
+            u'|chair|leg\xe9|leg\xe9Shape': {'.f[12:95]': u'ns:m\xe9tal'},
+        }
+        self.assertTrue(shader_map_file.write(self.path, geos_shaders_map))
+        self.assertEqual(shader_map_file.read(self.path), geos_shaders_map)
+
+    def test_round_trip_large(self):
+        geos_shaders_map = dict(
+            ('|set|mesh{0}|mesh{0}Shape'.format(i),
+             {'.f[0:{}]'.format(i + 1): 'lambert{}SG'.format(i % 7),
+              '.f[{}]'.format(i + 2): 'blinn1SG'})
+            for i in range(2000))
+        shader_map_file.write(self.path, geos_shaders_map)
+        self.assertEqual(shader_map_file.read(self.path), geos_shaders_map)
+
+    def test_single_face(self):
+        # face ranges are read back in the form format_component writes
+        shader_map_file.write(self.path,
+                              {'|cube|cubeShape': {'.f[3:3]': 'blinn1SG'}})
+        self.assertEqual(shader_map_file.read(self.path),
+                         {'|cube|cubeShape': {'.f[3]': 'blinn1SG'}})
+
+    def test_unchanged(self):
+        geos_shaders_map = {'|cube|cubeShape': {'': 'lambert2SG'}}
+        self.assertTrue(shader_map_file.write(self.path, geos_shaders_map))
+        self.assertFalse(shader_map_file.write(self.path, geos_shaders_map))
+        geos_shaders_map['|cube|cubeShape'][''] = 'blinn1SG'
+        self.assertTrue(shader_map_file.write(self.path, geos_shaders_map))
+        self.assertEqual(shader_map_file.read(self.path), geos_shaders_map)
+
+    def test_empty_map(self):
+        shader_map_file.write(self.path, {})
+        self.assertEqual(shader_map_file.read(self.path), {})
+
+    def test_invalid(self):
+        for data in [b'', b'LSMP', b'XXXX' + b'\0' * 12]:
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            self.assertRaises(ValueError, shader_map_file.read, self.path)
+
+    def test_relative_path(self):
+        self.assertEqual(shader_map_file.relative_path(
+            '|set|chair|seat|seatShape', ['|set|chair']),
+            '|chair|seat|seatShape')
+        self.assertEqual(shader_map_file.relative_path(
+            '|other|seatShape', ['|set|chair']), '|other|seatShape')
+        self.assertEqual(shader_map_file.strip_namespaces(
+            '|chair:set|chair:seat|chair:seatShape'), '|set|seat|seatShape')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Interned DAG paths and the conversions of the ShadingModel between shading
+maps, "assigned_shader" maps and their JSON values.
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import face_range  # noqa: E402
+import shading_model  # noqa: E402
+from shading_model import PathTable, ShadingModel  # noqa: E402
+
+_SHADING_MAP = {
+    'lambert2SG': [('|chair|seat|seatShape', None),
+                   ('|chair|back|backShape', [(0, 3), (6, 6)])],
+    'blinn1SG': [('|chair|back|backShape', [(4, 5)]),
+                 ('|chair|back|backShape', '.vtx[0:7]')],
+    'ns:metalSG': [('|ns:table|ns:leg|ns:legShape', None)],
+}
+
+
+def _merged(shading_map):
+    """
+    :return: {(shader, long name): merged faces, None or the components},
+             the face intervals of a node may be split over several members
+    """
+    merged = {}
+    for shader, members in shading_map.items():
+        for member, faces in members:
+            key = (shader, member)
+            if isinstance(faces, list):
+                merged[key] = face_range.merge(merged.get(key, []) + faces)
+            elif faces is None:
+                merged[key] = None
+            else:
+                merged.setdefault((shader, member, 'components'),
+                                  set()).add(faces)
+    return merged
+
+
+class TestPathTable(unittest.TestCase):
+
+    def setUp(self):
+        self.paths = PathTable()
+
+    def test_intern(self):
+        seat = self.paths.intern('|chair|seat|seatShape')
+        self.assertEqual(self.paths.intern('|chair|seat|seatShape'), seat)
+        self.assertEqual(len(self.paths), 3)
+        self.assertEqual(self.paths.find('|chair|seat'),
+                         self.paths.parent(seat))
+        self.assertEqual(self.paths.name(seat), 'seatShape')
+        self.assertEqual(self.paths.path(seat), '|chair|seat|seatShape')
+        self.assertEqual(self.paths.parent(self.paths.find('|chair')),
+                         shading_model.ROOT)
+        self.assertIsNone(self.paths.find('|chair|back'))
+        self.assertIsNone(self.paths.find('|table'))
+
+    def test_shared_prefix(self):
+        # the common ancestors are stored once
+        ids = [self.paths.intern('|set|chair|{0}|{0}Shape'.format(name))
+               for name in ['seat', 'back', 'leg']]
+        self.assertEqual(len(self.paths), 2 + 3 * 2)
+        self.assertEqual(len(set(self.paths.parent(self.paths.parent(i))
+                                 for i in ids)), 1)
+        # a path which is a prefix of an interned one
+        chair = self.paths.intern('|set|chair')
+        self.assertEqual(self.paths.find('|set|chair'), chair)
+        self.assertEqual(len(self.paths), 8)
+        # a name which is a prefix of an other name is not an ancestor
+        seats = self.paths.intern('|set|chair|seats')
+        self.assertNotEqual(seats, self.paths.find('|set|chair|seat'))
+        self.assertEqual(self.paths.path(seats), '|set|chair|seats')
+
+    def test_namespaces(self):
+        shapes = ['|a:chair|a:seat|a:seatShape',
+                  '|b:chair|b:seat|b:seatShape',
+                  '|a:chair|b:seat|b:seatShape',
+                  u'|a:chair|a:si\xe8ge|a:si\xe8geShape']
+        ids = [self.paths.intern(shape) for shape in shapes]
+        self.assertEqual(len(set(ids)), len(shapes))
+        # '|a:chair' is shared, 'a:seat' and 'b:seat' are not
+        grandparents = [self.paths.parent(self.paths.parent(node_id))
+                        for node_id in ids]
+        self.assertEqual(grandparents[0], grandparents[2])
+        self.assertNotEqual(grandparents[0], grandparents[1])
+        self.assertNotEqual(self.paths.parent(ids[0]),
+                            self.paths.parent(ids[2]))
+        # long names rebuilt from the table, not the interned strings
+        for node_id, shape in zip(ids, shapes):
+            self.paths._paths.pop(node_id)
+            self.assertEqual(self.paths.path(node_id), shape)
+            self.assertEqual(self.paths.find(shape), node_id)
+
+    def test_path_of_ancestor(self):
+        shape = self.paths.intern('|chair|seat|seatShape')
+        self.assertEqual(self.paths.path(self.paths.parent(shape)),
+                         '|chair|seat')
+        self.assertEqual(self.paths.path(shading_model.ROOT), '')
+
+
+class TestShadingModel(unittest.TestCase):
+
+    def test_shading_map(self):
+        model = ShadingModel.from_shading_map(_SHADING_MAP)
+        self.assertEqual(len(model), 6)
+        self.assertEqual(_merged(model.to_shading_map()),
+                         _merged(_SHADING_MAP))
+
+    def test_shader_maps(self):
+        model = ShadingModel.from_shading_map(_SHADING_MAP)
+        shader_maps = model.to_shader_maps()
+        self.assertEqual(shader_maps, {
+            '|chair|seat|seatShape': {'': 'lambert2SG'},
+            '|chair|back|backShape': {'.f[0:3]': 'lambert2SG',
+                                      '.f[6]': 'lambert2SG',
+                                      '.f[4:5]': 'blinn1SG',
+                                      '.vtx[0:7]': 'blinn1SG'},
+            '|ns:table|ns:leg|ns:legShape': {'': 'ns:metalSG'}})
+        self.assertEqual(
+            ShadingModel.from_shader_maps(shader_maps).to_shader_maps(),
+            shader_maps)
+
+    def test_json(self):
+        model = ShadingModel.from_shading_map(_SHADING_MAP)
+        values = model.to_json()
+        for geo_shape, value in values.items():
+            self.assertEqual(json.loads(value),
+                             model.to_shader_maps()[geo_shape])
+        round_trip = ShadingModel.from_json(values)
+        self.assertEqual(round_trip.to_json(), values)
+        self.assertEqual(_merged(round_trip.to_shading_map()),
+                         _merged(_SHADING_MAP))
+
+    def test_json_empty_values(self):
+        model = ShadingModel.from_json({'|cube|cubeShape': '',
+                                        '|ball|ballShape': '{}'})
+        self.assertEqual(len(model), 0)
+        self.assertEqual(model.to_json(), {})
+
+    def test_shared_paths(self):
+        paths = PathTable()
+        seat = paths.intern('|chair|seat|seatShape')
+        model = ShadingModel.from_shading_map(_SHADING_MAP, paths=paths)
+        self.assertIs(model.paths, paths)
+        self.assertEqual(model.paths.find('|chair|seat|seatShape'), seat)
+
+
+class TestEncodeShaderMap(unittest.TestCase):
+
+    def test_json_dumps(self):
+        for shader_map in [
+                None, {}, {'': 'lambert2SG'},
+                {'.f[4]': 'blinn1SG', '.f[0:3]': 'lambert2SG',
+                 '.vtx[0:7]': 'ns:blinn1SG', '': 'initialShadingGroup'},
+                {u'.f[0]': u'm\xe9tal"SG\\'}]:
+            self.assertEqual(shading_model.encode_shader_map(shader_map),
+                             json.dumps(shader_map, sort_keys=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
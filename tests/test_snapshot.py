@@ -0,0 +1,158 @@
+"""
+Shading maps and assigned geometries resolved through the SceneSnapshot
+match the ones of one cmds query per member, on the benchmark scene of the
+maya stand-in of benchmarks/fake_maya.py.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import fake_maya  # noqa: E402
+import scene  # noqa: E402
+
+cmds = fake_maya.install()
+
+import face_range  # noqa: E402
+import scene_query  # noqa: E402
+import session  # noqa: E402
+
+
+def _member_transform(node):
+    transform = cmds.ls(node, long=True)[0]
+    if cmds.nodeType(transform) != 'transform':
+        transform = cmds.listRelatives(transform, parent=True,
+                                       fullPath=True)[0]
+    return transform
+
+
+def _cmds_shading_map(shading_engines, selected_geos):
+    """
+    The shading map queried member by member, as before the snapshot.
+    :return: {shading engine: {long name: merged faces or None}}
+    """
+    shading_map = {}
+    for shading_engine in shading_engines:
+        for member in cmds.sets(shading_engine, query=True) or []:
+            node, _, component = member.partition('.')
+            members = shading_map.setdefault(shading_engine, {})
+            if component:
+                faces = [face_range.parse(member)]
+                for shape in cmds.ls(_member_transform(node), type='mesh',
+                                     dag=True, leaf=True, long=True):
+                    if shape in selected_geos:
+                        members[shape] = face_range.merge(
+                            members.get(shape, []) + faces)
+            else:
+                long_name = cmds.ls(node, long=True)[0]
+                shapes = cmds.ls(long_name, type='mesh', dag=True,
+                                 leaf=True, long=True)
+                if set(shapes).intersection(selected_geos):
+                    members[long_name] = None
+    return dict((shading_engine, members)
+                for shading_engine, members in shading_map.items()
+                if members)
+
+
+def _cmds_assigned_geometries(shading_engine):
+    geometries = set()
+    for member in cmds.sets(shading_engine, query=True) or []:
+        node, _, component = member.partition('.')
+        if component:
+            node = cmds.ls(node, type=session._GEO_TYPES, dag=True,
+                           leaf=True, long=True)[0]
+        geometries.add(cmds.ls(node, long=True)[0])
+    return geometries
+
+
+def _merged(shading_map):
+    """
+    {shading engine: [(long name, faces), ...]} -->
+    {shading engine: {long name: merged faces or None}}
+    """
+    merged = {}
+    for shading_engine, members in shading_map.items():
+        for member, faces in members:
+            members = merged.setdefault(shading_engine, {})
+            if faces is None:
+                members[member] = None
+            else:
+                members[member] = face_range.merge(
+                    members.get(member, []) + faces)
+    return merged
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.spec = scene.SceneSpec(shapes=40, shading_engines=4,
+                                    face_ratio=0.5, shapes_per_asset=10)
+        self.shapes = scene.build_export_scene(cmds, self.spec)
+        self.shading_engines = scene.shading_engine_names(self.spec)
+        self.backend = session.Session.query_backend
+
+    def tearDown(self):
+        session.Session.query_backend = self.backend
+
+    def _add_instances(self):
+        """
+        '|set|chair' instanced under two groups: the same short names on
+        both paths, one instance assigned whole, the other per face.
+        """
+        shapes = []
+        for group in ['|set|left', '|set|right']:
+            cmds.create_node(group, 'transform')
+            cmds.create_node(group + '|chair', 'transform')
+            shapes.append(cmds.create_node(group + '|chair|chairShape',
+                                           'mesh', face_count=12))
+        cmds.assign(shapes[0], self.shading_engines[0])
+        cmds.assign(shapes[1], self.shading_engines[1], [(0, 3), (8, 9)])
+        cmds.assign(shapes[1], self.shading_engines[2], [(4, 7)])
+        cmds.assign(shapes[1], self.shading_engines[3], [(10, 11)])
+        self.shapes.extend(shapes)
+        return shapes
+
+    def _check(self, selected_geos):
+        expected = _cmds_shading_map(self.shading_engines, selected_geos)
+        self.assertTrue(expected)
+        for backend in [scene_query.CMDS, scene_query.OPENMAYA]:
+            session.Session.query_backend = backend
+            snapshot = session._build_snapshot(self.shading_engines)
+            model = session._get_shading_map(self.shading_engines,
+                                             selected_geos, snapshot=snapshot)
+            self.assertEqual(_merged(model.to_shading_map()), expected)
+            for shading_engine in self.shading_engines:
+                self.assertEqual(
+                    session._get_assigned_geometries(shading_engine,
+                                                     snapshot=snapshot),
+                    _cmds_assigned_geometries(shading_engine))
+
+    def test_whole_and_faces(self):
+        self._check(self.shapes)
+
+    def test_selected(self):
+        self._check(self.shapes[::3])
+
+    def test_instances(self):
+        shapes = self._add_instances()
+        self._check(self.shapes)
+        self._check(shapes[1:])
+
+    def test_built_when_missing(self):
+        self._add_instances()
+        self.assertEqual(
+            _merged(session._get_shading_map(self.shading_engines,
+                                             self.shapes).to_shading_map()),
+            _cmds_shading_map(self.shading_engines, self.shapes))
+        self.assertEqual(
+            session._get_assigned_geometries(self.shading_engines[1]),
+            _cmds_assigned_geometries(self.shading_engines[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Commands written to trace files the way "cmdFileOutput" does and found
+back by reading the files from the end.
+
+    python -m unittest discover tests
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT_DIR, 'geo_shader_map'))
+
+import trace_log  # noqa: E402
+
+_NOISE = u'setAttr "mesh_{:06d}Shape.assigned_shader" -type "string" ' \
+    u'"{{\\"\\": \\"lambert1SG\\"}}";'
+
+
+def _export_command(abc_path):
+    return u'AbcExport -j "-frameRange 1 1 -dataFormat ogawa -root |set ' \
+        u'-file {}";'.format(abc_path)
+
+
+def _reference_command(abc_path):
+    return u'file -r -type "Alembic"  -ignoreVersion -gl ' \
+        u'-mergeNamespacesOnClash false -namespace "cube" -options "v=0;" ' \
+        u'"{}";'.format(abc_path)
+
+
+class TestTraceLog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'trace.mel')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _write(self, lines, noise=0, newline=u'\n'):
+        """
+        Write `lines` followed by `noise` lines of other commands.
+        """
+        lines = list(lines) + [_NOISE.format(i) for i in range(noise)]
+        with io.open(self.path, 'w', encoding='utf-8', newline='') as f:
+            f.write(newline.join(lines) + newline)
+        return lines
+
+    def test_lines_reversed(self):
+        lines = self._write([u'caf\xe9 {}'.format(i) * (i % 7)
+                             for i in range(500)])
+        for block_size in [1, 2, 7, 64, 1 << 16]:
+            result = list(trace_log.iter_lines_reversed(
+                self.path, block_size=block_size))
+            # the empty line after the last newline comes first
+            self.assertEqual(result, [u''] + lines[::-1])
+
+    def test_lines_reversed_crlf(self):
+        lines = self._write([u'a', u'', u'b c'], newline=u'\r\n')
+        self.assertEqual(
+            list(trace_log.iter_lines_reversed(self.path, block_size=3)),
+            [u''] + lines[::-1])
+
+    def test_abc_export_path(self):
+        for abc_path in [u'/tmp/cube.abc', u'C:/shot/caches/cube.abc',
+                         u'/tmp/caf\xe9/cube.abc']:
+            self._write([_export_command(u'/tmp/old.abc'),
+                         _export_command(abc_path)], noise=200)
+            self.assertEqual(trace_log.find_abc_export_path(self.path),
+                             abc_path)
+
+    def test_abc_export_path_quoted(self):
+        self._write([u'AbcExport -j "-root |set -file \\"/tmp/a b.abc\\"";'])
+        self.assertEqual(trace_log.find_abc_export_path(self.path),
+                         u'/tmp/a b.abc')
+
+    def test_abc_export_path_missing(self):
+        self._write([], noise=50)
+        self.assertEqual(trace_log.find_abc_export_path(self.path), '')
+
+    def test_reference_path(self):
+        abc_path = u'/tmp/caches/cube.abc'
+        self._write([_reference_command(u'/tmp/old.abc'),
+                     u'// Result: /tmp/old.abc //',
+                     _reference_command(abc_path),
+                     u'// Result: {}{{1}} //'.format(abc_path)], noise=200)
+        self.assertEqual(trace_log.find_reference_path(self.path),
+                         (abc_path, abc_path + u'{1}'))
+
+    def test_reference_path_without_result(self):
+        abc_path = u'/tmp/caches/cube.abc'
+        self._write([u'// Result: /tmp/old.abc{2} //',
+                     _reference_command(abc_path)], noise=10)
+        self.assertEqual(trace_log.find_reference_path(self.path),
+                         (abc_path, u''))
+
+    def test_reference_path_missing(self):
+        self._write([_export_command(u'/tmp/cube.abc')], noise=10)
+        self.assertEqual(trace_log.find_reference_path(self.path),
+                         ('', ''))
+
+
+if __name__ == '__main__':
+    unittest.main()